@@ -213,6 +213,13 @@ class ComicManagerWindow(Adw.ApplicationWindow):
             except Exception as mig_e:
                 print(f"Migración window_state: {mig_e}")
 
+            # Migración: columnas agregadas registradas en helpers/db_migrations.py
+            try:
+                from helpers.db_migrations import ensure_schema
+                ensure_schema(engine)
+            except Exception as mig_e:
+                print(f"Migración de esquema: {mig_e}")
+
             # Cargar configuración
             self.config = self.setup_repository.obtener_o_crear_configuracion()
             
@@ -1851,7 +1858,8 @@ class ComicManagerWindow(Adw.ApplicationWindow):
                 comic_title,
                 self,
                 scroll_threshold=self.config.scroll_threshold,
-                scroll_cooldown=self.config.scroll_cooldown
+                scroll_cooldown=self.config.scroll_cooldown,
+                comic_id=comic.id_comicbook
             )
 
             if reader:
@@ -14,7 +14,12 @@ from sqlalchemy.orm import sessionmaker
 from entidades.comicbook_model import Comicbook
 from entidades.comicbook_info_cover_model import ComicbookInfoCover
 from entidades.comicbook_info_model import ComicbookInfo
-from helpers.embedding_generator import get_embedding_generator
+from helpers.embedding_generator import (
+    get_active_model_id, get_embedding_generator, release_embedding_generator, warm_up_embedding_generator
+)
+from helpers.embedding_codec import decode_embedding, encode_embedding
+from helpers.cover_index import get_cover_index
+from helpers.filename_prior import HybridCoverMatcher
 
 
 import json
@@ -53,8 +58,10 @@ class AIClassificationWindow(Adw.Window):
         self.skipped_count = 0
         self.trashed_count = 0
         self.emb_gen = None
-        self.candidate_embeddings = []
-        self.cover_to_info = {}
+        self.cover_index = None
+        self.cover_matcher = None
+        self.model_id = None
+        self.pending_embeddings = set()  # ids de comics que todavía necesitan CLIP
         self.current_matches = []
 
         # Layout principal
@@ -277,24 +284,15 @@ class AIClassificationWindow(Adw.Window):
         try:
             GLib.idle_add(self.status_label.set_text, "📊 Cargando embeddings de covers...")
 
-            # Cargar todos los embeddings de covers (sin cargar CLIP)
-            covers_con_embedding = self.session.query(ComicbookInfoCover).filter(
-                ComicbookInfoCover.embedding != None,
-                ComicbookInfoCover.embedding != ''
-            ).all()
+            # Índice de covers compartido (sin cargar CLIP): solo lee las covers nuevas
+            # y solo las del modelo actual, para comparar vectores compatibles
+            self._use_model(get_active_model_id())
 
-            if len(covers_con_embedding) == 0:
+            if len(self.cover_index) == 0:
                 GLib.idle_add(self._show_error, "No hay covers con embeddings. Ejecuta 'Generar Embeddings' primero.")
                 return
 
-            # Crear índice convirtiendo JSON a numpy sin necesitar el modelo CLIP
-            self.cover_to_info = {cover.id_cover: cover.id_comicbook_info for cover in covers_con_embedding}
-            self.candidate_embeddings = [
-                (cover.id_cover, np.array(json.loads(cover.embedding)))
-                for cover in covers_con_embedding
-            ]
-
-            GLib.idle_add(self.status_label.set_text, f"✅ {len(covers_con_embedding)} covers cargadas")
+            GLib.idle_add(self.status_label.set_text, f"✅ {len(self.cover_index)} covers cargadas")
 
             # Obtener los comics pre-seleccionados por el usuario
             self.comics_to_classify = self.session.query(Comicbook).filter(
@@ -307,6 +305,16 @@ class AIClassificationWindow(Adw.Window):
                 GLib.idle_add(self._show_error, "No hay comics seleccionados para clasificar!")
                 return
 
+            # Comics sin embedding del modelo actual: si hay, precargar CLIP en segundo
+            # plano mientras se muestra el primero (se libera solo al quedar inactivo)
+            self.pending_embeddings = {
+                comic.id_comicbook for comic in self.comics_to_classify
+                if not comic.embedding or comic.embedding_model != self.model_id
+            }
+            if self.pending_embeddings:
+                print(f"⏳ Precargando CLIP para {len(self.pending_embeddings)} comics sin embedding")
+                warm_up_embedding_generator()
+
             GLib.idle_add(self.status_label.set_text, f"📚 {len(self.comics_to_classify)} comics para clasificar")
             GLib.idle_add(self.update_stats)
             GLib.idle_add(self.show_current_comic)
@@ -350,18 +358,26 @@ class AIClassificationWindow(Adw.Window):
         thread.daemon = True
         thread.start()
 
+    def _use_model(self, model_id):
+        """Índice de covers y matcher para los embeddings de model_id"""
+        self.model_id = model_id
+        self.cover_index = get_cover_index(self.session, model_id)
+        # Acota la búsqueda a la serie/número del nombre de archivo cuando se puede
+        self.cover_matcher = HybridCoverMatcher(self.session, self.cover_index)
+
     def _find_matches(self, comic):
         """Busca los mejores matches (thread)"""
         try:
+            self.pending_embeddings.discard(comic.id_comicbook)
             cover_path = comic.obtener_cover()
 
             if not os.path.exists(cover_path) or "Comic_sin_caratula" in cover_path:
                 GLib.idle_add(self._show_no_thumbnail)
                 return
 
-            if comic.embedding:
-                # Embedding ya guardado: no necesitamos CLIP
-                embedding = np.array(json.loads(comic.embedding))
+            if comic.embedding and comic.embedding_model == self.model_id:
+                # Embedding ya guardado con el modelo actual: no necesitamos CLIP
+                embedding = decode_embedding(comic.embedding)
             else:
                 # Cargar CLIP solo si este comic no tiene embedding
                 if self.emb_gen is None:
@@ -370,35 +386,38 @@ class AIClassificationWindow(Adw.Window):
 
                 raw = self.emb_gen.generate_embedding(cover_path)
                 if raw:
-                    comic.embedding = json.dumps(raw)
+                    comic.embedding = encode_embedding(raw)
+                    comic.embedding_model = self.emb_gen.model_id
+                    if self.emb_gen.model_id != self.model_id:
+                        # El backend cargado no es el configurado (create_backend volvió a
+                        # torch): comparar contra las covers de ese modelo
+                        print(f"⚠️ CLIP cargado como {self.emb_gen.model_id}, no {self.model_id}")
+                        self._use_model(self.emb_gen.model_id)
                     self.session.commit()
                     embedding = np.array(raw)
-
-                    # Si no quedan más comics sin embedding, liberar CLIP
-                    restantes_sin_embedding = sum(
-                        1 for c in self.comics_to_classify[self.current_index + 1:]
-                        if not c.embedding
-                    )
-                    if restantes_sin_embedding == 0:
-                        from helpers.embedding_generator import release_embedding_generator
-                        release_embedding_generator()
-                        self.emb_gen = None
                 else:
                     embedding = None
 
+                # Si no quedan más comics sin embedding, liberar CLIP ya (si no, lo
+                # libera el temporizador de inactividad)
+                if not self.pending_embeddings:
+                    release_embedding_generator()
+                    self.emb_gen = None
+
             if embedding is None:
                 GLib.idle_add(self._show_error, "Error generando embedding del comic")
                 return
 
-            # Calcular similaridades con numpy directamente (sin modelo CLIP)
-            matches = []
-            for cover_id, candidate_emb in self.candidate_embeddings:
-                similarity = float(np.dot(embedding, candidate_emb))
-                comicbook_info_id = self.cover_to_info[cover_id]
-                matches.append((comicbook_info_id, similarity, cover_id))
-
-            matches.sort(key=lambda x: x[1], reverse=True)
-            top_matches = matches[:3]
+            # Top 3 entre las covers de la serie/número del nombre de archivo; si
+            # ninguna supera el umbral, contra todo el índice de covers
+            results, source = self.cover_matcher.match(
+                comic.nombre_archivo, embedding, k=3, min_score=self.threshold
+            )
+            print(f"🔎 {comic.nombre_archivo}: candidatas {source}")
+            top_matches = [
+                (info_id, similarity, cover_id)
+                for cover_id, info_id, similarity in results
+            ]
 
             GLib.idle_add(self._display_matches, top_matches)
 
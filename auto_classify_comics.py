@@ -10,12 +10,16 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from entidades import Base
 from entidades.comicbook_model import Comicbook
-from entidades.comicbook_info_cover_model import ComicbookInfoCover
 from entidades.comicbook_info_model import ComicbookInfo
 from helpers.embedding_generator import get_embedding_generator
+from helpers.cover_index import get_cover_index
+from helpers.embedding_codec import decode_embedding_matrix
 
+# Memoria máxima de la matriz de similaridades por bloque en modo lote
+BATCH_SCORES_BYTES = 256 * 1024 * 1024
 
-def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=False):
+
+def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=False, batch=False):
     """
     Clasifica automáticamente comics sin clasificar usando embeddings.
 
@@ -23,6 +27,8 @@ def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=
         similarity_threshold: Umbral mínimo de similaridad (0-1) para aceptar una coincidencia
         max_comics: Máximo número de comics a procesar (None = todos)
         auto_apply: Si True, aplica automáticamente las clasificaciones. Si False, solo muestra sugerencias.
+        batch: Si True, compara todos los comics contra la matriz de covers por bloques
+               y resuelve los ComicbookInfo ganadores con una sola consulta
     """
     # Conectar a la base de datos
     db_path = os.path.join('data', 'babelcomics.db')
@@ -31,6 +37,9 @@ def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=
         return
 
     engine = create_engine(f'sqlite:///{db_path}')
+    # Columnas nuevas (embedding_model, ...) si la app todavía no abrió esta base
+    from helpers.db_migrations import ensure_schema
+    ensure_schema(engine)
     Session = sessionmaker(bind=engine)
     session = Session()
 
@@ -49,6 +58,8 @@ def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=
         # Obtener generador de embeddings
         print("Inicializando generador de embeddings...")
         emb_gen = get_embedding_generator()
+        # Backend realmente cargado (puede ser torch aunque se haya configurado otro)
+        model_id = emb_gen.resolve_model_id()
 
         # Obtener comics sin clasificar (id_comicbook_info vacío)
         comics_sin_clasificar = session.query(Comicbook).filter(
@@ -67,32 +78,41 @@ def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=
             print("No hay comics para clasificar!")
             return
 
-        # Cargar todos los embeddings de ComicbookInfo covers en memoria
+        # Cargar todos los embeddings de ComicbookInfo covers en una matriz
         print("\nCargando embeddings de covers existentes...")
-        covers_con_embedding = session.query(ComicbookInfoCover).filter(
-            ComicbookInfoCover.embedding != None,
-            ComicbookInfoCover.embedding != ''
-        ).all()
+        cover_index = get_cover_index(session, model_id)
 
-        if len(covers_con_embedding) == 0:
+        if len(cover_index) == 0:
             print("ERROR: No hay covers con embeddings. Ejecuta primero generate_cover_embeddings.py")
             return
 
-        print(f"Cargados {len(covers_con_embedding)} embeddings de covers")
-
-        # Crear diccionario de cover_id -> comicbook_info_id
-        cover_to_info = {cover.id_cover: cover.id_comicbook_info for cover in covers_con_embedding}
-
-        # Crear lista de candidatos (id_cover, embedding)
-        candidatos = [
-            (cover.id_cover, emb_gen.json_to_embedding(cover.embedding))
-            for cover in covers_con_embedding
-        ]
+        print(f"Cargados {len(cover_index)} embeddings de covers")
+
+        # Generar en lotes los embeddings que faltan o son de otro modelo (un forward pass de CLIP por lote)
+        pendientes = []
+        for comic in comics_sin_clasificar:
+            if comic.embedding and comic.embedding_model == model_id:
+                continue
+            cover_path = comic.obtener_cover()
+            if "Comic_sin_caratula" not in cover_path and os.path.exists(cover_path):
+                pendientes.append((comic, cover_path))
+
+        if pendientes:
+            print(f"\nGenerando {len(pendientes)} embeddings en lotes de {emb_gen.batch_size}...")
+            embeddings = emb_gen.generate_embeddings([cover_path for _, cover_path in pendientes])
+            for (comic, _), embedding in zip(pendientes, embeddings):
+                if embedding:
+                    comic.embedding = emb_gen.encode_embedding(embedding)
+                    comic.embedding_model = emb_gen.model_id
 
         print(f"\n{'='*80}")
         print(f"Iniciando clasificación automática (umbral: {similarity_threshold})")
         print(f"{'='*80}\n")
 
+        if batch:
+            _classify_batch(session, cover_index, comics_sin_clasificar, similarity_threshold, auto_apply)
+            return
+
         clasificados = 0
         omitidos = 0
 
@@ -108,13 +128,14 @@ def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=
                     continue
 
                 # Generar o usar embedding existente
-                if comic.embedding:
-                    embedding = emb_gen.json_to_embedding(comic.embedding)
+                if comic.embedding and comic.embedding_model == model_id:
+                    embedding = emb_gen.decode_embedding(comic.embedding)
                 else:
                     print(f"[{i}/{total_comics}] Generando embedding para {comic.nombre_archivo}...")
                     embedding = emb_gen.generate_embedding(cover_path)
                     if embedding:
-                        comic.embedding = emb_gen.embedding_to_json(embedding)
+                        comic.embedding = emb_gen.encode_embedding(embedding)
+                        comic.embedding_model = emb_gen.model_id
 
                 if embedding is None:
                     print(f"[{i}/{total_comics}] ⊘ {comic.nombre_archivo} - Error generando embedding")
@@ -122,15 +143,14 @@ def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=
                     continue
 
                 # Buscar la cover más similar
-                resultado = emb_gen.find_most_similar(embedding, candidatos)
+                resultado = cover_index.best_match(embedding)
 
                 if resultado is None:
                     print(f"[{i}/{total_comics}] ⊘ {comic.nombre_archivo} - Sin coincidencias")
                     omitidos += 1
                     continue
 
-                cover_id, similarity = resultado
-                comicbook_info_id = cover_to_info[cover_id]
+                cover_id, comicbook_info_id, similarity = resultado
 
                 # Obtener información del ComicbookInfo
                 info = session.query(ComicbookInfo).get(comicbook_info_id)
@@ -174,6 +194,78 @@ def auto_classify_comics(similarity_threshold=0.75, max_comics=None, auto_apply=
         session.close()
 
 
+def _classify_batch(session, cover_index, comics, similarity_threshold, auto_apply):
+    """
+    Clasificación en lote: una matriz de embeddings de comics contra la de covers
+
+    Las similaridades se calculan por bloques de comics para que la matriz
+    (bloque x covers) no pase de BATCH_SCORES_BYTES. Los ComicbookInfo
+    ganadores se leen con una sola consulta IN y las clasificaciones se
+    aplican en una única transacción.
+    """
+    import time
+
+    start = time.perf_counter()
+    total_comics = len(comics)
+    # Solo se comparan embeddings del mismo modelo que las covers del índice
+    matrix, positions = decode_embedding_matrix([
+        comic.embedding if comic.embedding_model == cover_index.model_id else None for comic in comics
+    ])
+    comics_con_embedding = [comics[position] for position in positions.tolist()]
+    omitidos = total_comics - len(comics_con_embedding)
+
+    if not comics_con_embedding:
+        print("No hay comics con embedding para clasificar")
+        return
+
+    # Mejor cover de cada comic, por bloques de memoria acotada
+    chunk_rows = max(1, BATCH_SCORES_BYTES // (max(len(cover_index), 1) * 4))
+    winners = []
+    for chunk_start in range(0, len(matrix), chunk_rows):
+        for result in cover_index.search_many(matrix[chunk_start:chunk_start + chunk_rows], k=1):
+            winners.append(result[0] if result else None)
+    compute_time = time.perf_counter() - start
+
+    # Resolver todos los ComicbookInfo ganadores de una vez
+    info_ids = sorted({winner[1] for winner in winners if winner is not None})
+    infos = {}
+    # Tandas para no pasar el límite de variables de SQLite
+    for chunk_start in range(0, len(info_ids), 900):
+        for info in session.query(ComicbookInfo).filter(
+            ComicbookInfo.id_comicbook_info.in_(info_ids[chunk_start:chunk_start + 900])
+        ):
+            infos[info.id_comicbook_info] = info
+
+    updates = []
+    for comic, winner in zip(comics_con_embedding, winners):
+        info = infos.get(winner[1]) if winner is not None else None
+        if info is None:
+            print(f"⊘ {comic.nombre_archivo} - Sin coincidencias")
+            omitidos += 1
+            continue
+
+        _, comicbook_info_id, similarity = winner
+        if similarity >= similarity_threshold:
+            print(f"✓ {comic.nombre_archivo} → {info.titulo} #{info.numero} ({similarity:.2%})")
+            updates.append({'id_comicbook': comic.id_comicbook, 'id_comicbook_info': str(comicbook_info_id)})
+        else:
+            print(f"⊘ {comic.nombre_archivo} → {info.titulo} #{info.numero} ({similarity:.2%}, bajo el umbral)")
+            omitidos += 1
+
+    print(f"\n⏱️  {len(comics_con_embedding)} comics x {len(cover_index)} covers en {compute_time:.2f}s")
+
+    # Aplicar todo en una sola transacción
+    if auto_apply and updates:
+        session.bulk_update_mappings(Comicbook, updates)
+        session.commit()
+        print(f"\n✅ Clasificados {len(updates)} comics automáticamente")
+    elif updates:
+        session.rollback()
+        print(f"\n💡 {len(updates)} clasificaciones sugeridas (usa --auto-apply para aplicar)")
+
+    print(f"⊘  {omitidos} comics omitidos (sin embedding, sin match o bajo umbral)")
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -184,6 +276,8 @@ if __name__ == "__main__":
                         help='Máximo número de comics a procesar')
     parser.add_argument('--auto-apply', action='store_true',
                         help='Aplicar automáticamente las clasificaciones (sin confirmación)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Clasificar todos los comics en lote (multiplicación de matrices por bloques)')
 
     args = parser.parse_args()
 
@@ -194,5 +288,6 @@ if __name__ == "__main__":
     auto_classify_comics(
         similarity_threshold=args.threshold,
         max_comics=args.max,
-        auto_apply=args.auto_apply
+        auto_apply=args.auto_apply,
+        batch=args.batch
     )
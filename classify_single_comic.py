@@ -10,9 +10,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from entidades import Base
 from entidades.comicbook_model import Comicbook
-from entidades.comicbook_info_cover_model import ComicbookInfoCover
 from entidades.comicbook_info_model import ComicbookInfo
 from helpers.embedding_generator import get_embedding_generator
+from helpers.cover_index import get_cover_index
 
 
 def classify_single_comic(comic_path, threshold=0.75, auto_apply=False):
@@ -21,6 +21,9 @@ def classify_single_comic(comic_path, threshold=0.75, auto_apply=False):
     # Conectar a BD
     db_path = os.path.join('data', 'babelcomics.db')
     engine = create_engine(f'sqlite:///{db_path}')
+    # Columnas nuevas (embedding_model, ...) si la app todavía no abrió esta base
+    from helpers.db_migrations import ensure_schema
+    ensure_schema(engine)
     Session = sessionmaker(bind=engine)
     session = Session()
 
@@ -53,15 +56,18 @@ def classify_single_comic(comic_path, threshold=0.75, auto_apply=False):
 
         # Generar o usar embedding existente
         emb_gen = get_embedding_generator()
+        # Backend realmente cargado (puede ser torch aunque se haya configurado otro)
+        model_id = emb_gen.resolve_model_id()
 
-        if comic.embedding:
-            embedding = emb_gen.json_to_embedding(comic.embedding)
+        if comic.embedding and comic.embedding_model == model_id:
+            embedding = emb_gen.decode_embedding(comic.embedding)
             print(f"   ✓ Usando embedding existente")
         else:
             print(f"   ⏳ Generando embedding...")
             embedding = emb_gen.generate_embedding(cover_path)
             if embedding:
-                comic.embedding = emb_gen.embedding_to_json(embedding)
+                comic.embedding = emb_gen.encode_embedding(embedding)
+                comic.embedding_model = model_id = emb_gen.model_id
                 print(f"   ✓ Embedding generado")
 
         if embedding is None:
@@ -69,33 +75,22 @@ def classify_single_comic(comic_path, threshold=0.75, auto_apply=False):
             return
 
         # Cargar embeddings de covers
-        covers_con_embedding = session.query(ComicbookInfoCover).filter(
-            ComicbookInfoCover.embedding != None,
-            ComicbookInfoCover.embedding != ''
-        ).all()
+        cover_index = get_cover_index(session, model_id)
 
-        if len(covers_con_embedding) == 0:
+        if len(cover_index) == 0:
             print("❌ No hay covers con embeddings. Ejecutá generate_cover_embeddings.py primero")
             return
 
-        print(f"   ⏳ Comparando con {len(covers_con_embedding)} covers...")
-
-        # Crear lista de candidatos
-        cover_to_info = {cover.id_cover: cover.id_comicbook_info for cover in covers_con_embedding}
-        candidatos = [
-            (cover.id_cover, emb_gen.json_to_embedding(cover.embedding))
-            for cover in covers_con_embedding
-        ]
+        print(f"   ⏳ Comparando con {len(cover_index)} covers...")
 
         # Buscar la más similar
-        resultado = emb_gen.find_most_similar(embedding, candidatos)
+        resultado = cover_index.best_match(embedding)
 
         if resultado is None:
             print(f"❌ Sin coincidencias")
             return
 
-        cover_id, similarity = resultado
-        comicbook_info_id = cover_to_info[cover_id]
+        cover_id, comicbook_info_id, similarity = resultado
 
         # Obtener información del ComicbookInfo
         info = session.query(ComicbookInfo).get(comicbook_info_id)
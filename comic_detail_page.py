@@ -6,6 +6,7 @@ comic_detail_page.py - Página de detalle de cómic para Navigation View
 import gi
 import os
 import re
+import threading
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
@@ -227,7 +228,8 @@ def create_comic_action_buttons(comic, main_window):
                     comic_title,
                     main_window,
                     scroll_threshold=scroll_threshold,
-                    scroll_cooldown=scroll_cooldown
+                    scroll_cooldown=scroll_cooldown,
+                    comic_id=comic.id_comicbook
                 )
 
                 if reader:
@@ -1058,53 +1060,82 @@ def load_page_thumbnail_progressive(page_image, page, comic):
         return False
 
 
+# Páginas pendientes de thumbnail por cómic: las cards de una pestaña se
+# agrupan para regenerarlas con un único hilo y una sola pasada por el archivo
+_pending_page_thumbnails = {}   # comic_id -> {ordenPagina: (nombre_pagina, [page_image, ...])}
+_page_thumbnail_workers = set()  # comic_ids con un hilo trabajando
+_page_thumbnail_lock = threading.Lock()
+
+
 def generate_thumbnail_from_comic(page_image, page, comic):
-    """Generar thumbnail extrayendo desde el archivo del cómic"""
+    """Encolar la página para generar su thumbnail desde el archivo del cómic"""
     try:
-        # Función worker para generar thumbnail
-        def thumbnail_worker():
-            try:
-                from helpers.comic_extractor import ComicExtractor
-                import tempfile
+        comic_id = comic.id_comicbook
+        comic_path = comic.path
+
+        with _page_thumbnail_lock:
+            pending = _pending_page_thumbnails.setdefault(comic_id, {})
+            page_name, page_images = pending.setdefault(page.ordenPagina, (page.nombre_pagina, []))
+            page_images.append(page_image)
+
+            if comic_id in _page_thumbnail_workers:
+                # El hilo de este cómic tomará la página en su próxima pasada
+                return False
+            _page_thumbnail_workers.add(comic_id)
+
+        # Un solo hilo por cómic (no uno por página)
+        thumbnail_thread = threading.Thread(
+            target=_page_thumbnail_worker,
+            args=(comic_id, comic_path),
+            daemon=True
+        )
+        thumbnail_thread.start()
 
-                extractor = ComicExtractor()
+        return False
 
-                # Crear directorio temporal
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    # Extraer páginas del archivo
-                    extracted_files = extractor.extract_comic_pages(comic.path, temp_dir)
+    except Exception as e:
+        print(f"Error iniciando generación de thumbnail: {e}")
+        return False
 
-                    if extracted_files and len(extracted_files) >= page.ordenPagina:
-                        # Obtener el archivo de esta página específica
-                        page_file = extracted_files[page.ordenPagina - 1]  # ordenPagina es 1-based
 
-                        # Generar thumbnail
-                        from helpers.thumbnail_path import get_thumbnails_base_path
-                        thumbnail_dir = os.path.join(get_thumbnails_base_path(), "comic_pages", str(comic.id_comicbook))
-                        thumbnail_filename = f"page_{page.ordenPagina:03d}.jpg"
-                        thumbnail_path = os.path.join(thumbnail_dir, thumbnail_filename)
+def _page_thumbnail_worker(comic_id, comic_path):
+    """Generar los thumbnails pendientes de un cómic leyendo solo esas páginas"""
+    import time
+    from helpers.comic_extractor import ComicExtractor
 
-                        success = extractor.generate_page_thumbnail(page_file, thumbnail_path)
+    extractor = ComicExtractor()
+    thumbnail_dir = ComicExtractor.get_page_thumbnail_dir(comic_id)
 
-                        if success:
-                            # Actualizar imagen en UI thread
-                            GLib.idle_add(update_page_image, page_image, thumbnail_path)
-                        else:
-                            print(f"Error generando thumbnail para página {page.ordenPagina}")
+    # Esperar un momento para que las cards creadas en el mismo ciclo se sumen al lote
+    time.sleep(0.05)
 
-            except Exception as e:
-                print(f"Error en worker de thumbnail: {e}")
+    while True:
+        with _page_thumbnail_lock:
+            batch = _pending_page_thumbnails.pop(comic_id, None)
+            if not batch:
+                _page_thumbnail_workers.discard(comic_id)
+                return
 
-        # Iniciar generación en hilo separado
-        import threading
-        thumbnail_thread = threading.Thread(target=thumbnail_worker, daemon=True)
-        thumbnail_thread.start()
+        def on_generated(page_order, thumbnail_path):
+            for page_image in batch[page_order][1]:
+                GLib.idle_add(update_page_image, page_image, thumbnail_path)
 
-        return False
+        try:
+            pages = [(page_name, page_order) for page_order, (page_name, _) in batch.items()]
 
-    except Exception as e:
-        print(f"Error iniciando generación de thumbnail: {e}")
-        return False
+            # Las páginas que ya tienen thumbnail en disco se muestran directamente
+            for page_order in batch:
+                thumbnail_path = os.path.join(thumbnail_dir, ComicExtractor.get_page_thumbnail_filename(page_order))
+                if os.path.exists(thumbnail_path):
+                    on_generated(page_order, thumbnail_path)
+
+            generated = extractor.regenerate_page_thumbnails(
+                comic_path, pages, thumbnail_dir, on_generated=on_generated
+            )
+            print(f"🖼️ {generated} thumbnails de página generados para cómic {comic_id}")
+
+        except Exception as e:
+            print(f"Error en worker de thumbnail: {e}")
 
 
 def update_page_image(page_image, image_path):
@@ -25,6 +25,9 @@ except ImportError:
     print("Error: No se puede importar ComicExtractor")
     ComicExtractor = None
 
+from tiled_page_view import TiledPageView
+from helpers.reader_metrics import PageTurnMetrics
+
 
 def cleanup_old_temp_files(temp_dir):
     """Limpiar archivos temporales viejos de babelcomics"""
@@ -87,7 +90,7 @@ class ComicReader(Adw.ApplicationWindow):
     """Lector de comics integrado con navegación fluida"""
 
     def __init__(self, comic_path, comic_title="Comic", parent_window=None,
-                 scroll_threshold=None, scroll_cooldown=None):
+                 scroll_threshold=None, scroll_cooldown=None, comic_id=None):
         # Crear aplicación si no existe
         app = Gio.Application.get_default()
         if app is None:
@@ -97,6 +100,7 @@ class ComicReader(Adw.ApplicationWindow):
         self.comic_path = comic_path
         self.comic_title = comic_title
         self.parent_window = parent_window
+        self.comic_id = comic_id  # Para reutilizar thumbnails en comic_pages/<id>
 
         # Parámetros de configuración de scroll
         self.scroll_threshold = scroll_threshold if scroll_threshold and scroll_threshold > 0 else 1.0
@@ -110,6 +114,11 @@ class ComicReader(Adw.ApplicationWindow):
         self.interpolation_mode = "nearest"  # "nearest", "bilinear", "hyper"
         self.loading = False
         self.temp_dir = None
+        self.cache_dir = None
+
+        # Métricas de latencia de cambio de página (overlay con Ctrl+I)
+        self.metrics = PageTurnMetrics()
+        self._metrics_saved = False
 
         # Configurar ventana
         self.setup_window()
@@ -117,6 +126,9 @@ class ComicReader(Adw.ApplicationWindow):
         # Crear interfaz
         self.setup_ui()
 
+        # Guardar métricas también al cerrar desde el gestor de ventanas
+        self.connect("close-request", self.on_close_request)
+
         # Extraer páginas en hilo separado
         self.extract_pages()
 
@@ -418,15 +430,28 @@ class ComicReader(Adw.ApplicationWindow):
         self.original_pixbuf = None
         self.current_page_path = None
 
+        # Renderizado por tiles para zoom alto: por encima de este tamaño
+        # escalado (en píxeles) no se materializa el pixbuf completo
+        self.tiled_view = None
+        self.tiled_render_threshold = 4096 * 4096
+        self.tiled_render_active = False
+
         # Sistema de precarga para transiciones rápidas
         self.preload_cache = {}  # Cache de pixbufs precargados
         self.preload_buffer = 3  # Precargar 3 páginas antes y después
         self.loading_pool = None  # Pool de threads para precarga
 
-        # Sistema de thumbnails progresivos
+        # Sistema de thumbnails progresivos (índice comic_pages/<id>/page_NNN.jpg)
         self.thumbnail_pool = None  # Pool dedicado para thumbnails
         self.thumbnail_rows = []   # Referencias a rows de thumbnails
         self.thumbnail_futures = []  # Futures de carga de thumbnails
+        self.thumbnail_requested = set()  # Páginas cuya carga ya se pidió
+        self.thumbnail_waiting = set()    # Páginas visibles esperando que se genere su thumbnail
+        self.thumbnail_lock = threading.Lock()
+        self.thumbnail_dir = None
+        self.thumbnail_visible_margin = 4  # Rows extra a cargar arriba/abajo de lo visible
+        self._thumbnail_generation_cancelled = False
+        self._thumbnail_load_scheduled = False
 
         # Control de scroll para navegación (valores configurables en constructor)
         self.scroll_accumulator = 0.0  # Acumulador de scroll
@@ -443,6 +468,22 @@ class ComicReader(Adw.ApplicationWindow):
 
         self.scrolled_window.set_child(self.comic_image)
 
+        # Overlay de rendimiento sobre la página (oculto por defecto)
+        self.page_overlay = Gtk.Overlay()
+        self.page_overlay.set_child(self.scrolled_window)
+
+        self.metrics_label = Gtk.Label()
+        self.metrics_label.add_css_class("monospace")
+        self.metrics_label.add_css_class("osd")
+        self.metrics_label.set_halign(Gtk.Align.END)
+        self.metrics_label.set_valign(Gtk.Align.START)
+        self.metrics_label.set_margin_top(8)
+        self.metrics_label.set_margin_end(8)
+        self.metrics_label.set_xalign(0)
+        self.metrics_label.set_can_target(False)  # No interceptar clicks
+        self.metrics_label.set_visible(False)
+        self.page_overlay.add_overlay(self.metrics_label)
+
         # Contenedor para centrar y mensaje de carga
         self.image_area = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
         self.image_area.set_vexpand(True)
@@ -500,6 +541,11 @@ class ComicReader(Adw.ApplicationWindow):
         self.thumbnail_scroll.set_child(self.thumbnail_list)
         self.sidebar_box.append(self.thumbnail_scroll)
 
+        # Cargar solo los thumbnails de las rows que entran en pantalla
+        thumbnail_vadjustment = self.thumbnail_scroll.get_vadjustment()
+        thumbnail_vadjustment.connect("value-changed", self._on_thumbnail_scroll_changed)
+        thumbnail_vadjustment.connect("changed", self._on_thumbnail_scroll_changed)
+
     def on_toggle_sidebar(self, button):
         """Mostrar/ocultar sidebar de thumbnails"""
         is_active = button.get_active()
@@ -525,6 +571,7 @@ class ComicReader(Adw.ApplicationWindow):
 
         # Fase 1: Crear TODOS los placeholders inmediatamente
         self.thumbnail_rows = []  # Guardar referencias para actualizar después
+        self.thumbnail_requested.clear()
         for i in range(page_count):
             row = self._create_placeholder_row(i)
             self.thumbnail_list.append(row)
@@ -532,8 +579,12 @@ class ComicReader(Adw.ApplicationWindow):
 
         print(f"✅ {page_count} placeholders creados")
 
-        # Fase 2: Iniciar carga asíncrona progresiva
-        self._start_progressive_thumbnail_loading()
+        # Fase 2: Generar en segundo plano los thumbnails que falten en el índice
+        self.thumbnail_dir = self._get_thumbnail_dir()
+        self._start_missing_thumbnail_generation()
+
+        # Fase 3: Cargar solo las rows visibles (el resto al hacer scroll)
+        self._schedule_visible_thumbnail_load()
 
     def _create_placeholder_row(self, page_num):
         """Crear row con placeholder para thumbnail"""
@@ -580,74 +631,163 @@ class ComicReader(Adw.ApplicationWindow):
 
         return row
 
-    def _start_progressive_thumbnail_loading(self):
-        """Iniciar carga progresiva con pool de hilos optimizado"""
-        if not self.pages:
-            return
+    def _get_thumbnail_dir(self):
+        """Directorio de thumbnails de páginas (el mismo índice que usa ComicExtractor)"""
+        if self.comic_id is not None and ComicExtractor:
+            return ComicExtractor.get_page_thumbnail_dir(self.comic_id)
 
-        page_count = len(self.pages)
-
-        # Crear pool de hilos optimizado para thumbnails
-        if hasattr(self, 'thumbnail_pool') and self.thumbnail_pool:
-            self.thumbnail_pool.shutdown(wait=False)
+        # Sin id de comic: guardar junto al cache de páginas extraídas
+        if self.cache_dir:
+            return f"{self.cache_dir}_thumbs"
+        return None
 
-        # 10-15 hilos concurrentes según el número de páginas
-        max_workers = min(15, max(10, page_count // 10))
-        print(f"🚀 Iniciando carga con {max_workers} hilos para {page_count} páginas")
+    def _get_page_thumbnail_path(self, page_num):
+        """Ruta del thumbnail de una página (page_num 0-based)"""
+        if not self.thumbnail_dir:
+            return None
+        return os.path.join(self.thumbnail_dir, f"page_{page_num + 1:03d}.jpg")
 
-        self.thumbnail_pool = ThreadPoolExecutor(
-            max_workers=max_workers,
-            thread_name_prefix="thumbnail_loader"
-        )
+    def _start_missing_thumbnail_generation(self):
+        """Generar en un único hilo los thumbnails que falten, cercanos a la página actual primero"""
+        if not self.pages or not self.thumbnail_dir or not ComicExtractor:
+            return
 
-        # Enviar tareas de carga de thumbnails con priorización
-        self.thumbnail_futures = []
+        missing_pages = [
+            i for i in range(len(self.pages))
+            if not os.path.exists(self._get_page_thumbnail_path(i))
+        ]
+        if not missing_pages:
+            print(f"✅ Todos los thumbnails de páginas ya existen en {self.thumbnail_dir}")
+            return
 
-        # Priorizar páginas cercanas a la actual
         current_page = getattr(self, 'current_page', 0)
-        priority_range = 10  # Priorizar 10 páginas antes y después
+        missing_pages.sort(key=lambda x: abs(x - current_page))
+        pages = list(self.pages)
+        thumbnail_dir = self.thumbnail_dir
 
-        # Lista priorizada: páginas cercanas primero
-        priority_pages = []
-        other_pages = []
+        print(f"🖼️ Generando {len(missing_pages)} thumbnails faltantes en {thumbnail_dir}")
 
-        for i in range(page_count):
-            if abs(i - current_page) <= priority_range:
-                priority_pages.append(i)
-            else:
-                other_pages.append(i)
+        def generation_worker():
+            try:
+                os.makedirs(thumbnail_dir, exist_ok=True)
+                extractor = ComicExtractor()
+                # Generador perezoso: deja de producir páginas al cerrar el lector
+                page_orders = (
+                    page_num + 1 for page_num in missing_pages
+                    if not self._thumbnail_generation_cancelled
+                )
+                generated = extractor.generate_missing_page_thumbnails(
+                    pages, thumbnail_dir, page_orders,
+                    on_generated=self._on_page_thumbnail_generated
+                )
+                print(f"✅ {generated} thumbnails de páginas generados")
+            except Exception as e:
+                print(f"❌ Error generando thumbnails de páginas: {e}")
+            finally:
+                # Las rows que siguen esperando no van a recibir thumbnail
+                with self.thumbnail_lock:
+                    failed_pages = list(self.thumbnail_waiting)
+                    self.thumbnail_waiting.clear()
+                if not self._thumbnail_generation_cancelled:
+                    for page_num in failed_pages:
+                        GLib.idle_add(self._replace_placeholder_with_error, page_num)
+
+        threading.Thread(target=generation_worker, daemon=True,
+                         name="thumbnail_generator").start()
+
+    def _on_page_thumbnail_generated(self, page_order, thumbnail_path):
+        """Callback del generador: cargar el thumbnail si su row ya está visible"""
+        page_num = page_order - 1
+        with self.thumbnail_lock:
+            if page_num not in self.thumbnail_waiting:
+                return
+            self.thumbnail_waiting.discard(page_num)
+        self._load_single_thumbnail(page_num)
 
-        # Ordenar páginas prioritarias por cercanía
-        priority_pages.sort(key=lambda x: abs(x - current_page))
+    def _on_thumbnail_scroll_changed(self, adjustment):
+        """Scroll o cambio de tamaño del sidebar"""
+        self._schedule_visible_thumbnail_load()
 
-        # Combinar listas: prioritarias primero
-        all_pages = priority_pages + other_pages
+    def _schedule_visible_thumbnail_load(self):
+        """Agrupar varios eventos de scroll en una sola carga en el hilo principal"""
+        if not self.thumbnail_rows or self._thumbnail_load_scheduled:
+            return
+        self._thumbnail_load_scheduled = True
+        GLib.idle_add(self._load_visible_thumbnails)
+
+    def _get_visible_thumbnail_range(self):
+        """Obtener (primera, última) página cuyas rows están en pantalla"""
+        row_count = len(self.thumbnail_rows)
+        vadjustment = self.thumbnail_scroll.get_vadjustment()
+        top = vadjustment.get_value()
+        page_size = vadjustment.get_page_size()
+
+        first_row = self.thumbnail_list.get_row_at_y(int(top))
+        first = first_row.get_index() if first_row else 0
+
+        if page_size <= 0:
+            # Todavía sin asignar tamaño: cargar solo el margen inicial
+            return first, min(row_count - 1, first + self.thumbnail_visible_margin)
+
+        last_row = self.thumbnail_list.get_row_at_y(int(top + page_size) - 1)
+        last = last_row.get_index() if last_row else row_count - 1
+        return first, last
+
+    def _load_visible_thumbnails(self):
+        """Pedir la carga de los thumbnails visibles (más un margen) que falten"""
+        self._thumbnail_load_scheduled = False
+        if not self.pages or not self.thumbnail_rows:
+            return False
+
+        if self.thumbnail_pool is None:
+            # Los thumbnails del índice son pequeños: pocos hilos alcanzan
+            self.thumbnail_pool = ThreadPoolExecutor(
+                max_workers=4,
+                thread_name_prefix="thumbnail_loader"
+            )
 
-        # Enviar tareas en orden de prioridad
-        for i in all_pages:
-            future = self.thumbnail_pool.submit(self._load_single_thumbnail, i)
+        first, last = self._get_visible_thumbnail_range()
+        start = max(0, first - self.thumbnail_visible_margin)
+        end = min(len(self.thumbnail_rows), last + self.thumbnail_visible_margin + 1)
+
+        for page_num in range(start, end):
+            if page_num in self.thumbnail_requested:
+                continue
+            self.thumbnail_requested.add(page_num)
+            future = self.thumbnail_pool.submit(self._load_single_thumbnail, page_num)
             self.thumbnail_futures.append(future)
 
-        print(f"📤 {page_count} tareas enviadas (priorizando página {current_page + 1})")
+        return False  # No repetir
 
     def _load_single_thumbnail(self, page_num):
-        """Cargar un single thumbnail en hilo separado"""
+        """Cargar un thumbnail del índice en hilo separado"""
         if page_num >= len(self.pages):
             return
 
-        page_path = self.pages[page_num]
+        thumbnail_path = self._get_page_thumbnail_path(page_num)
+        if not thumbnail_path:
+            GLib.idle_add(self._replace_placeholder_with_error, page_num)
+            return
+
+        if not os.path.exists(thumbnail_path):
+            # Todavía no generado: el generador avisará al terminarlo
+            with self.thumbnail_lock:
+                self.thumbnail_waiting.add(page_num)
+            if not os.path.exists(thumbnail_path):
+                return
+            # Se generó mientras tanto: cargarlo ahora
+            with self.thumbnail_lock:
+                self.thumbnail_waiting.discard(page_num)
 
         try:
-            # Cargar imagen con tamaño fijo (doble de grande)
+            # El thumbnail del índice es chico (150x200): decodificarlo es barato
             pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                page_path, 180, 240, True
+                thumbnail_path, 180, 240, True
             )
 
             # Programar reemplazo en hilo principal
             GLib.idle_add(self._replace_placeholder_with_thumbnail, page_num, pixbuf)
 
-            print(f"✅ Thumbnail {page_num + 1} cargado")
-
         except Exception as e:
             print(f"❌ Error cargando thumbnail {page_num + 1}: {e}")
             # Programar placeholder de error
@@ -769,22 +909,26 @@ class ComicReader(Adw.ApplicationWindow):
 
     def setup_mouse_events(self):
         """Configurar eventos de mouse para navegación"""
+        self.attach_mouse_controllers(self.comic_image)
+
+    def attach_mouse_controllers(self, widget):
+        """Agregar los controllers de mouse del lector a un widget de página"""
         # Click controller para navegación con mouse
         click_controller = Gtk.GestureClick()
         click_controller.connect("pressed", self.on_image_clicked)
-        self.comic_image.add_controller(click_controller)
+        widget.add_controller(click_controller)
 
         # Click controller para menú contextual (click derecho)
         right_click_controller = Gtk.GestureClick()
         right_click_controller.set_button(3) # Botón derecho
         right_click_controller.connect("pressed", self.on_right_click)
-        self.comic_image.add_controller(right_click_controller)
+        widget.add_controller(right_click_controller)
 
         # Scroll controller para zoom
         scroll_controller = Gtk.EventControllerScroll()
         scroll_controller.set_flags(Gtk.EventControllerScrollFlags.VERTICAL)
         scroll_controller.connect("scroll", self.on_image_scroll)
-        self.comic_image.add_controller(scroll_controller)
+        widget.add_controller(scroll_controller)
 
     def setup_keyboard_shortcuts(self):
         """Configurar atajos de teclado"""
@@ -816,6 +960,8 @@ class ComicReader(Adw.ApplicationWindow):
             ("F", self.on_toggle_fullscreen),  # F simple también
             # Sidebar de thumbnails
             ("T", self.on_toggle_sidebar_key),  # T para toggle sidebar
+            # Overlay de rendimiento (latencia de cambio de página)
+            ("<Control>i", self.toggle_metrics_overlay),
             # Control de sensibilidad de scroll
             ("<Control>plus", lambda: self.adjust_scroll_sensitivity("decrease")),  # Más sensible
             ("<Control>minus", lambda: self.adjust_scroll_sensitivity("increase")),  # Menos sensible
@@ -851,10 +997,12 @@ class ComicReader(Adw.ApplicationWindow):
 
                 # Actualizar timestamp del directorio actual (touch)
                 self.touch_cache_directory(cache_dir)
+                self.cache_dir = cache_dir
 
                 # Verificar si ya está en cache y es válido
                 if self.is_cache_valid(cache_dir):
                     print(f"✅ Usando cache existente: {cache_dir}")
+                    self.metrics.comic_format = ComicExtractor().detect_comic_format(self.comic_path)
                     cached_pages = self.load_cached_pages(cache_dir)
                     if cached_pages:
                         GLib.idle_add(self.on_extraction_complete, cached_pages)
@@ -883,6 +1031,7 @@ class ComicReader(Adw.ApplicationWindow):
                     return
 
                 print(f"Formato detectado: {comic_format}")
+                self.metrics.comic_format = comic_format
 
                 # Extraer páginas usando el método correcto
                 extracted_pages = extractor.extract_comic_pages(self.comic_path, self.temp_dir)
@@ -921,7 +1070,7 @@ class ComicReader(Adw.ApplicationWindow):
         # Ocultar mensaje de carga y mostrar imagen
         if self.loading_box.get_parent() == self.image_area:
             self.image_area.remove(self.loading_box)
-        self.image_area.append(self.scrolled_window)
+        self.image_area.append(self.page_overlay)
 
         # Mostrar primera página
         self.go_to_page(0)
@@ -999,6 +1148,7 @@ class ComicReader(Adw.ApplicationWindow):
         if not self.pages or page_number < 0 or page_number >= len(self.pages):
             return
 
+        turn_start = time.perf_counter()
         self.current_page = page_number
         page_path = self.pages[page_number]
         self.current_page_path = page_path
@@ -1016,7 +1166,7 @@ class ComicReader(Adw.ApplicationWindow):
             # Primero cargar el pixbuf para tener control total
             print(f"📂 Cargando página {page_number + 1}")
             try:
-                self.original_pixbuf = GdkPixbuf.Pixbuf.new_from_file(page_path)
+                self.original_pixbuf = self.load_page_pixbuf(page_path)
                 orig_w = self.original_pixbuf.get_width()
                 orig_h = self.original_pixbuf.get_height()
                 file_size_mb = os.path.getsize(page_path) / (1024 * 1024)
@@ -1031,6 +1181,7 @@ class ComicReader(Adw.ApplicationWindow):
                 self.original_pixbuf = None
                 # Fallback a método anterior si falla
                 print(f"🔄 Fallback: usando set_filename")
+                self.show_picture_view()
                 self.comic_image.set_filename(page_path)
                 self.configure_image_size()
 
@@ -1046,6 +1197,9 @@ class ComicReader(Adw.ApplicationWindow):
             # Resetear acumulador de scroll inteligente
             self.page_change_accumulator = 0.0
 
+            # Medir hasta que el nuevo contenido llegue a pantalla
+            self.track_page_paint(turn_start)
+
             # Iniciar precarga de páginas adyacentes para transiciones rápidas
             self.start_preload_adjacent_pages()
 
@@ -1057,6 +1211,65 @@ class ComicReader(Adw.ApplicationWindow):
             traceback.print_exc()
             self.show_toast(f"Error cargando página {page_number + 1}", "error")
 
+    def load_page_pixbuf(self, page_path):
+        """Cargar una página midiendo por separado lectura de disco y decodificación"""
+        with self.metrics.measure('disk_read'):
+            with open(page_path, 'rb') as f:
+                data = f.read()
+
+        with self.metrics.measure('decode'):
+            loader = GdkPixbuf.PixbufLoader()
+            try:
+                loader.write(data)
+            finally:
+                loader.close()
+            pixbuf = loader.get_pixbuf()
+
+        if pixbuf is None:
+            raise ValueError(f"No se pudo decodificar {os.path.basename(page_path)}")
+        return pixbuf
+
+    def track_page_paint(self, turn_start):
+        """Registrar la latencia total cuando el siguiente frame termine de pintarse"""
+        frame_clock = self.get_frame_clock()
+        if frame_clock is None:
+            self.metrics.record('total', (time.perf_counter() - turn_start) * 1000)
+            self.update_metrics_overlay()
+            return
+
+        handler_id = None
+
+        def on_after_paint(clock):
+            clock.disconnect(handler_id)
+            self.metrics.record('total', (time.perf_counter() - turn_start) * 1000)
+            self.update_metrics_overlay()
+
+        handler_id = frame_clock.connect("after-paint", on_after_paint)
+
+    def toggle_metrics_overlay(self, *args):
+        """Mostrar/ocultar el overlay de rendimiento"""
+        visible = not self.metrics_label.get_visible()
+        self.metrics_label.set_visible(visible)
+        self.update_metrics_overlay()
+        self.show_toast("Métricas de rendimiento " + ("visibles" if visible else "ocultas"), "info")
+
+    def update_metrics_overlay(self):
+        """Refrescar el texto del overlay si está visible"""
+        if self.metrics_label.get_visible():
+            self.metrics_label.set_text(self.metrics.format_overlay_text())
+
+    def save_metrics(self):
+        """Volcar las métricas de la sesión a JSON (una sola vez)"""
+        if self._metrics_saved:
+            return
+        self._metrics_saved = True
+
+        metrics_path = self.metrics.dump_json(self.comic_path)
+        if metrics_path:
+            total = self.metrics.get_stage_summary('total')
+            print(f"📊 Métricas del lector guardadas en {metrics_path} "
+                  f"(p50 {total['p50_ms']:.1f} ms, p95 {total['p95_ms']:.1f} ms)")
+
     def apply_current_view_settings(self):
         """Aplicar configuración actual de zoom y ajuste"""
         if not self.original_pixbuf or not self.current_page_path:
@@ -1103,6 +1316,12 @@ class ComicReader(Adw.ApplicationWindow):
 
             print(f"Nuevo tamaño calculado: {new_width}x{new_height}")
 
+            # Páginas enormes (zoom alto): escalar solo los tiles visibles
+            if self.should_use_tiled_render(new_width, new_height):
+                self.show_tiled_page(new_width / orig_width)
+                return
+            self.show_picture_view()
+
             # Configurar Picture según el modo
             if abs(self.zoom_level - 1.0) > 0.01 or self.fit_mode == "original":
                 # Zoom manual O tamaño original: sin restricciones
@@ -1130,10 +1349,12 @@ class ComicReader(Adw.ApplicationWindow):
             if new_width != orig_width or new_height != orig_height:
                 try:
                     interp_type = self.get_interpolation_type()
-                    scaled_pixbuf = self.original_pixbuf.scale_simple(
-                        new_width, new_height, interp_type
-                    )
-                    texture = Gdk.Texture.new_for_pixbuf(scaled_pixbuf)
+                    with self.metrics.measure('scale'):
+                        scaled_pixbuf = self.original_pixbuf.scale_simple(
+                            new_width, new_height, interp_type
+                        )
+                    with self.metrics.measure('texture'):
+                        texture = Gdk.Texture.new_for_pixbuf(scaled_pixbuf)
                     self.comic_image.set_paintable(texture)
                     self.current_pixbuf = scaled_pixbuf
 
@@ -1146,7 +1367,8 @@ class ComicReader(Adw.ApplicationWindow):
                     self.comic_image.set_paintable(texture)
             else:
                 # Usar imagen original sin escalar
-                texture = Gdk.Texture.new_for_pixbuf(self.original_pixbuf)
+                with self.metrics.measure('texture'):
+                    texture = Gdk.Texture.new_for_pixbuf(self.original_pixbuf)
                 self.comic_image.set_paintable(texture)
                 self.current_pixbuf = self.original_pixbuf
 
@@ -1160,6 +1382,7 @@ class ComicReader(Adw.ApplicationWindow):
             # Fallback: cargar imagen directamente
             if self.current_page_path and os.path.exists(self.current_page_path):
                 print("Fallback: cargando imagen directamente")
+                self.show_picture_view()
                 self.comic_image.set_filename(self.current_page_path)
 
     def configure_image_size(self):
@@ -1203,18 +1426,64 @@ class ComicReader(Adw.ApplicationWindow):
 
             print(f"Aplicando zoom {self.zoom_level}: {orig_width}x{orig_height} -> {new_width}x{new_height}")
 
+            if self.should_use_tiled_render(new_width, new_height):
+                self.show_tiled_page(self.zoom_level)
+                return
+            self.show_picture_view()
+
             interp_type = self.get_interpolation_type()
-            scaled_pixbuf = self.original_pixbuf.scale_simple(
-                new_width, new_height, interp_type
-            )
+            with self.metrics.measure('scale'):
+                scaled_pixbuf = self.original_pixbuf.scale_simple(
+                    new_width, new_height, interp_type
+                )
 
-            texture = Gdk.Texture.new_for_pixbuf(scaled_pixbuf)
+            with self.metrics.measure('texture'):
+                texture = Gdk.Texture.new_for_pixbuf(scaled_pixbuf)
             self.comic_image.set_paintable(texture)
             self.current_pixbuf = scaled_pixbuf
 
         except Exception as e:
             print(f"Error aplicando zoom: {e}")
 
+    def should_use_tiled_render(self, new_width, new_height):
+        """¿La página escalada es tan grande que conviene renderizarla por tiles?"""
+        return new_width * new_height > self.tiled_render_threshold
+
+    def show_tiled_page(self, scale):
+        """Mostrar la página actual con el renderer por tiles"""
+        if self.tiled_view is None:
+            self.tiled_view = TiledPageView()
+            self.tiled_view.set_halign(Gtk.Align.CENTER)
+            self.tiled_view.set_valign(Gtk.Align.CENTER)
+            self.attach_mouse_controllers(self.tiled_view)
+
+        self.tiled_view.set_adjustments(
+            self.scrolled_window.get_hadjustment(),
+            self.scrolled_window.get_vadjustment()
+        )
+        self.tiled_view.set_page(self.original_pixbuf, scale, self.get_interpolation_type())
+
+        if not self.tiled_render_active:
+            # Liberar la textura grande que pudiera tener el Picture
+            self.comic_image.set_paintable(None)
+            self.scrolled_window.set_child(self.tiled_view)
+            self.tiled_render_active = True
+
+        # No hay pixbuf escalado completo en modo tiles
+        self.current_pixbuf = None
+
+        scaled_width, scaled_height = self.tiled_view.get_scaled_size()
+        print(f"🧩 Render por tiles: {scaled_width}x{scaled_height} (escala {scale:.2f})")
+
+    def show_picture_view(self):
+        """Volver al Gtk.Picture normal si estaba activo el renderer por tiles"""
+        if not self.tiled_render_active:
+            return
+
+        self.tiled_view.clear_tiles()
+        self.scrolled_window.set_child(self.comic_image)
+        self.tiled_render_active = False
+
     def calculate_size_for_mode(self, orig_width, orig_height, widget_width, widget_height):
         """Calcular tamaño según el modo de ajuste"""
         if self.fit_mode == "width":
@@ -1286,9 +1555,10 @@ class ComicReader(Adw.ApplicationWindow):
             # Cargar solo si el archivo existe
             if os.path.exists(page_path):
                 # Para precarga, cargamos una versión optimizada
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                    page_path, 1920, 1080, True  # Tamaño máximo razonable
-                )
+                with self.metrics.measure('preload'):
+                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                        page_path, 1920, 1080, True  # Tamaño máximo razonable
+                    )
 
                 # Guardar en cache
                 self.preload_cache[page_num] = {
@@ -1436,7 +1706,7 @@ class ComicReader(Adw.ApplicationWindow):
     def on_image_clicked(self, gesture, n_press, x, y):
         """Manejar click en imagen para navegación"""
         if n_press == 1:  # Click simple
-            width = self.comic_image.get_width()
+            width = gesture.get_widget().get_width()
 
             # Dividir imagen en zonas para navegación
             if x < width / 3:
@@ -1502,7 +1772,11 @@ class ComicReader(Adw.ApplicationWindow):
         """Manejar click derecho para mostrar el menú contextual"""
         if n_press == 1:
             # Asociar el popover a la imagen en la que se hizo click
-            self.context_popover.set_parent(self.comic_image)
+            widget = gesture.get_widget()
+            if self.context_popover.get_parent() is not widget:
+                if self.context_popover.get_parent() is not None:
+                    self.context_popover.unparent()
+                self.context_popover.set_parent(widget)
             
             # Crear un rectángulo en las coordenadas del click
             rect = Gdk.Rectangle()
@@ -1759,20 +2033,34 @@ class ComicReader(Adw.ApplicationWindow):
         self.cleanup()
         self.close()
 
+    def on_close_request(self, window):
+        """Guardar métricas al cerrar la ventana"""
+        self.save_metrics()
+        return False  # Permitir el cierre
+
     def cleanup(self):
         """Limpiar archivos temporales y recursos"""
+        self.save_metrics()
+
         # Cerrar pool de threads de precarga
         if self.loading_pool:
             print("🔄 Cerrando pool de precarga...")
             self.loading_pool.shutdown(wait=False)
             self.loading_pool = None
 
+        # Detener generación de thumbnails faltantes
+        self._thumbnail_generation_cancelled = True
+
         # Cerrar pool de thumbnails
         if self.thumbnail_pool:
             print("🔄 Cerrando pool de thumbnails...")
             self.thumbnail_pool.shutdown(wait=False)
             self.thumbnail_pool = None
 
+        # Liberar tiles del renderer de zoom alto
+        if self.tiled_view:
+            self.tiled_view.clear_tiles()
+
         # Limpiar cache de precarga
         if self.preload_cache:
             print("🗑️ Limpiando cache de precarga...")
@@ -1783,6 +2071,9 @@ class ComicReader(Adw.ApplicationWindow):
             self.thumbnail_rows.clear()
         if hasattr(self, 'thumbnail_futures'):
             self.thumbnail_futures.clear()
+        self.thumbnail_requested.clear()
+        with self.thumbnail_lock:
+            self.thumbnail_waiting.clear()
 
         # NO limpiar archivos temporales de cache (para reutilizar)
         # Solo limpiar si es directorio temporal aleatorio (no cache)
@@ -2131,7 +2422,7 @@ class ComicReader(Adw.ApplicationWindow):
 
 
 def open_comic_with_reader(comic_path, comic_title="Comic", parent_window=None,
-                          scroll_threshold=None, scroll_cooldown=None):
+                          scroll_threshold=None, scroll_cooldown=None, comic_id=None):
     """Función helper para abrir comic con el lector"""
     if not os.path.exists(comic_path):
         print(f"Archivo no existe: {comic_path}")
@@ -2139,7 +2430,7 @@ def open_comic_with_reader(comic_path, comic_title="Comic", parent_window=None,
 
     try:
         reader = ComicReader(comic_path, comic_title, parent_window,
-                           scroll_threshold, scroll_cooldown)
+                           scroll_threshold, scroll_cooldown, comic_id)
         reader.present()
         return reader
     except Exception as e:
@@ -139,8 +139,8 @@ class VolumeSearchCard(Gtk.Box):
     def download_cover_background(self, image_url):
         """Descargar cover en background thread"""
         try:
-            import requests
             from io import BytesIO
+            from helpers.http_session import request_with_retry
 
             # Headers completos de Chrome para evitar bloqueos 403 Forbidden
             headers = {
@@ -160,7 +160,7 @@ class VolumeSearchCard(Gtk.Box):
             }
 
             # Descargar imagen con headers correctos
-            response = requests.get(image_url, headers=headers, timeout=30)
+            response = request_with_retry('GET', image_url, headers=headers, timeout=30)
             response.raise_for_status()
 
             # Crear pixbuf desde bytes
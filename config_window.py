@@ -29,6 +29,10 @@ from repositories.setup_repository import SetupRepository
 class ConfigWindow(Adw.PreferencesWindow):
     """Ventana de configuración usando Adwaita PreferencesWindow"""
 
+    # Valores de Setup.clip_backend y su texto en el ComboRow (mismo orden)
+    CLIP_BACKENDS = ['torch', 'torch_int8', 'onnx', 'onnx_int8']
+    CLIP_BACKEND_LABELS = ["PyTorch (fp32)", "PyTorch int8", "ONNX Runtime", "ONNX Runtime int8"]
+
     def __init__(self, parent_window=None):
         super().__init__()
 
@@ -529,7 +533,7 @@ class ConfigWindow(Adw.PreferencesWindow):
         # Workers concurrentes
         self.workers_row = Adw.SpinRow()
         self.workers_row.set_title("Workers concurrentes")
-        self.workers_row.set_subtitle("Número de hilos para descargas paralelas")
+        self.workers_row.set_subtitle("Número de hilos/procesos para descargas e indexado de páginas")
 
         # Cargar valor desde BD
         current_workers = 5
@@ -542,6 +546,69 @@ class ConfigWindow(Adw.PreferencesWindow):
 
         perf_group.add(self.workers_row)
 
+        # Hilos de CPU para CLIP
+        self.clip_threads_row = Adw.SpinRow()
+        self.clip_threads_row.set_title("Hilos de CPU para CLIP")
+        self.clip_threads_row.set_subtitle("Hilos de PyTorch al generar embeddings (0 = automático)")
+
+        current_clip_threads = 0
+        if self.config:
+            current_clip_threads = self.config.clip_threads
+
+        clip_threads_adjustment = Gtk.Adjustment(value=current_clip_threads, lower=0, upper=64, step_increment=1)
+        self.clip_threads_row.set_adjustment(clip_threads_adjustment)
+        self.clip_threads_row.connect("changed", self.on_clip_threads_changed)
+
+        perf_group.add(self.clip_threads_row)
+
+        # Tamaño de lote para CLIP
+        self.clip_batch_row = Adw.SpinRow()
+        self.clip_batch_row.set_title("Lote de imágenes para CLIP")
+        self.clip_batch_row.set_subtitle("Imágenes procesadas juntas al generar embeddings")
+
+        current_clip_batch = 16
+        if self.config:
+            current_clip_batch = self.config.clip_batch_size
+
+        clip_batch_adjustment = Gtk.Adjustment(value=current_clip_batch, lower=1, upper=128, step_increment=1)
+        self.clip_batch_row.set_adjustment(clip_batch_adjustment)
+        self.clip_batch_row.connect("changed", self.on_clip_batch_changed)
+
+        perf_group.add(self.clip_batch_row)
+
+        # Liberar CLIP por inactividad
+        self.clip_idle_row = Adw.SpinRow()
+        self.clip_idle_row.set_title("Liberar CLIP tras inactividad")
+        self.clip_idle_row.set_subtitle("Segundos sin generar embeddings antes de liberar el modelo (0 = nunca)")
+
+        current_clip_idle = 300
+        if self.config and self.config.clip_idle_timeout is not None:
+            current_clip_idle = self.config.clip_idle_timeout
+
+        clip_idle_adjustment = Gtk.Adjustment(value=current_clip_idle, lower=0, upper=3600, step_increment=30)
+        self.clip_idle_row.set_adjustment(clip_idle_adjustment)
+        self.clip_idle_row.connect("changed", self.on_clip_idle_changed)
+
+        perf_group.add(self.clip_idle_row)
+
+        # Backend de inferencia para CLIP
+        self.clip_backend_row = Adw.ComboRow()
+        self.clip_backend_row.set_title("Backend de CLIP")
+        self.clip_backend_row.set_subtitle("Int8 y ONNX aceleran la generación en CPU (se aplica al recargar el modelo)")
+
+        backend_model = Gtk.StringList()
+        for label in self.CLIP_BACKEND_LABELS:
+            backend_model.append(label)
+        self.clip_backend_row.set_model(backend_model)
+
+        current_backend = 'torch'
+        if self.config and self.config.clip_backend in self.CLIP_BACKENDS:
+            current_backend = self.config.clip_backend
+        self.clip_backend_row.set_selected(self.CLIP_BACKENDS.index(current_backend))
+        self.clip_backend_row.connect("notify::selected-item", self.on_clip_backend_changed)
+
+        perf_group.add(self.clip_backend_row)
+
         # Cache de thumbnails
         self.cache_row = Adw.SwitchRow()
         self.cache_row.set_title("Cache de thumbnails")
@@ -660,6 +727,9 @@ class ConfigWindow(Adw.PreferencesWindow):
         self.config.rate_limit_interval = spin_row.get_value()
         self.save_config()
 
+        from helpers.rate_limiter import set_rate_limit_interval
+        set_rate_limit_interval(self.config.rate_limit_interval)
+
     def on_select_organize_folder(self, button):
         """Abrir diálogo para seleccionar carpeta de organización"""
         dialog = Gtk.FileDialog()
@@ -744,6 +814,49 @@ class ConfigWindow(Adw.PreferencesWindow):
         self.config.workers_concurrentes = int(spin_row.get_value())
         self.save_config()
 
+    def on_clip_threads_changed(self, spin_row):
+        """Callback cuando cambian los hilos de CLIP"""
+        if not self.config:
+            return
+
+        self.config.clip_threads = int(spin_row.get_value())
+        self.save_config()
+
+    def on_clip_batch_changed(self, spin_row):
+        """Callback cuando cambia el lote de CLIP"""
+        if not self.config:
+            return
+
+        self.config.clip_batch_size = int(spin_row.get_value())
+        self.save_config()
+
+    def on_clip_idle_changed(self, spin_row):
+        """Callback cuando cambia el tiempo de inactividad para liberar CLIP"""
+        if not self.config:
+            return
+
+        self.config.clip_idle_timeout = int(spin_row.get_value())
+        self.save_config()
+
+        from helpers.embedding_generator import model_lifecycle
+        model_lifecycle.idle_timeout = self.config.clip_idle_timeout
+
+    def on_clip_backend_changed(self, combo_row, param):
+        """Callback cuando cambia el backend de CLIP"""
+        if not self.config:
+            return
+
+        backend = self.CLIP_BACKENDS[combo_row.get_selected()]
+        if backend == self.config.clip_backend:
+            return
+
+        self.config.clip_backend = backend
+        self.save_config()
+
+        # Los embeddings del backend anterior no son comparables: regenerarlos en segundo plano
+        from helpers.reembed_job import start_reembed_job
+        start_reembed_job()
+
     def on_cache_changed(self, switch_row, param):
         """Callback cuando cambia cache de thumbnails"""
         if not self.config:
@@ -1574,14 +1687,17 @@ class ConfigWindow(Adw.PreferencesWindow):
                 'Upgrade-Insecure-Requests': '1',
             }
 
+            # Sesión y limitador compartidos con el resto de las descargas de ComicVine
+            from helpers.http_session import request_with_retry
+
             # Intentar con verificación SSL, si falla intentar sin verificación
             try:
-                response = requests.get(image_url, timeout=30, headers=headers, verify=True)
+                response = request_with_retry('GET', image_url, timeout=30, headers=headers, verify=True)
                 response.raise_for_status()
             except (requests.exceptions.SSLError, requests.exceptions.ConnectionError) as ssl_error:
                 print(f"SSL Error para {volume.nombre}, intentando sin verificación SSL: {ssl_error}")
                 try:
-                    response = requests.get(image_url, timeout=30, headers=headers, verify=False)
+                    response = request_with_retry('GET', image_url, timeout=30, headers=headers, verify=False)
                     response.raise_for_status()
                 except Exception as fallback_error:
                     print(f"Error también sin SSL para {volume.nombre}: {fallback_error}")
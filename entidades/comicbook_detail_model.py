@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from entidades import Base
 import os
@@ -16,6 +16,15 @@ class Comicbook_Detail(Base):
     tipoPagina   = Column(Integer, nullable=False, default=0)
     nombre_pagina = Column(String, nullable=True)
 
+    # Metadatos leídos de la cabecera de la imagen (sin decodificar píxeles)
+    ancho = Column(Integer, nullable=True)
+    alto = Column(Integer, nullable=True)
+    formato_imagen = Column(String, nullable=True)  # 'jpeg', 'png', 'webp', ...
+    doble_pagina = Column(Boolean, nullable=False, default=False)
+
+    # dHash de 64 bits en hex (helpers/page_hash.py) para detectar duplicados
+    phash = Column(String(16), nullable=True)
+
     comicbook = relationship("Comicbook", back_populates="detalles")
 
     def __repr__(self):
@@ -33,6 +42,12 @@ class Comicbook_Detail(Base):
         # carpeta destino "estándar", similar al de ComicbookInfoCover
         from helpers.thumbnail_path import get_thumbnails_base_path
         base_dir = os.path.join(get_thumbnails_base_path(), "comic_pages", str(self.comicbook_id))
+
+        # Nombre con el que ComicExtractor genera los thumbnails (ordenPagina 1-based)
+        ruta = os.path.join(base_dir, f"page_{self.ordenPagina:03d}.jpg")
+        if os.path.exists(ruta):
+            return ruta
+
         filename = f"page_{self.indicePagina}.jpg"
         ruta = os.path.join(base_dir, filename)
 
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Float, BigInteger, Boolean, ForeignKey
+from sqlalchemy.orm import relationship
+from entidades import Base
+
+
+class ComicbookDuplicate(Base):
+    """
+    Comic físico que pertenece a un grupo de posibles duplicados por cover
+    (helpers/cover_duplicates.py). Cada corrida del job reemplaza la tabla.
+    """
+    __tablename__ = 'comicbooks_duplicates'
+
+    id_duplicate = Column(Integer, primary_key=True, autoincrement=True)
+    grupo = Column(Integer, nullable=False, index=True)
+    id_comicbook = Column(Integer, ForeignKey('comicbooks.id_comicbook'), nullable=False, index=True)
+
+    # Mayor similaridad de cover con otro comic del grupo
+    similaridad = Column(Float, nullable=False, default=0.0)
+    # Menor similaridad entre dos comics cualesquiera del grupo (el grupo se arma
+    # por encadenamiento, así que puede quedar por debajo del umbral)
+    similaridad_minima = Column(Float, nullable=False, default=0.0)
+    # El grupo pasó la verificación por páginas (cantidad y hashes): recién
+    # entonces se sugiere borrar los archivos que no son el más grande
+    verificado = Column(Boolean, nullable=False, default=False)
+    # Tamaño del archivo al momento de agrupar (para estimar el espacio a liberar)
+    tamanio_bytes = Column(BigInteger, nullable=False, default=0)
+
+    # Parámetros de la corrida
+    umbral = Column(Float, nullable=False, default=0.0)
+    embedding_model = Column(String, nullable=True)
+    fecha = Column(String, nullable=False, default='')
+
+    comicbook = relationship("Comicbook")
+
+    def __repr__(self):
+        return (f"<ComicbookDuplicate(grupo={self.grupo}, id_comicbook={self.id_comicbook}, "
+                f"similaridad={self.similaridad:.3f})>")
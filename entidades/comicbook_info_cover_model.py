@@ -3,6 +3,7 @@
 import os
 from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
+from entidades.embedding_type import EmbeddingBlob
 from entidades import Base # Importa la Base compartida
 
 class ComicbookInfoCover(Base):
@@ -11,7 +12,8 @@ class ComicbookInfoCover(Base):
     id_cover = Column(Integer, primary_key=True, autoincrement=True)
     id_comicbook_info = Column(Integer, ForeignKey('comicbooks_info.id_comicbook_info'), nullable=False)
     url_imagen = Column(String, nullable=False)
-    embedding = Column(String, nullable=True)  # JSON string of the image embedding vector
+    embedding = Column(EmbeddingBlob, nullable=True)  # Binary (helpers/embedding_codec.py) of the image embedding vector
+    embedding_model = Column(String, nullable=True)  # Model id that produced the embedding (helpers/embedding_generator.get_model_id)
     
 
     comic_info = relationship("ComicbookInfo", back_populates="portadas")
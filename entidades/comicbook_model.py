@@ -2,6 +2,7 @@ import os
 from entidades import Base
 from sqlalchemy import Column, Integer, String, Boolean, Sequence, ForeignKey
 from sqlalchemy.orm import relationship
+from entidades.embedding_type import EmbeddingBlob
 from entidades.comicbook_detail_model import Comicbook_Detail
 
 class Comicbook(Base):
@@ -19,7 +20,8 @@ class Comicbook(Base):
     id_comicbook_info = Column(String, nullable=False, default='')
     calidad = Column(Integer, nullable=False, default=0)
     en_papelera = Column(Boolean, nullable=False, default=False)
-    embedding = Column(String, nullable=True)  # JSON string of the cover embedding vector
+    embedding = Column(EmbeddingBlob, nullable=True)  # Binary (helpers/embedding_codec.py) of the cover embedding vector
+    embedding_model = Column(String, nullable=True)  # Model id that produced the embedding (helpers/embedding_generator.get_model_id)
 
     detalles = relationship("Comicbook_Detail", back_populates="comicbook", cascade="all, delete-orphan")
 
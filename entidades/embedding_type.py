@@ -0,0 +1,30 @@
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+
+class _RawBinary(LargeBinary):
+    """BLOB que devuelve el valor tal cual (bytes, o str en filas JSON sin migrar)"""
+
+    def result_processor(self, dialect, coltype):
+        return None
+
+
+class EmbeddingBlob(TypeDecorator):
+    """
+    Columna de embedding en formato binario (helpers/embedding_codec.py).
+
+    Acepta asignar listas, arrays, JSON o bytes ya codificados; lo que se lee
+    es el valor guardado sin decodificar, para poder decodificar muchas filas
+    juntas con decode_embedding_matrix.
+    """
+
+    impl = _RawBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        from helpers.embedding_codec import encode_embedding
+        return encode_embedding(value)
+
+    def process_result_value(self, value, dialect):
+        return value
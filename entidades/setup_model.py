@@ -31,6 +31,10 @@ class Setup(Base):
     workers_concurrentes = Column(Integer, nullable=False, default=5)
     cache_thumbnails = Column(Boolean, nullable=False, default=True)
     limpieza_automatica = Column(Boolean, nullable=False, default=True)
+    clip_threads = Column(Integer, nullable=False, default=0)  # 0 = automático (PyTorch)
+    clip_batch_size = Column(Integer, nullable=False, default=16)
+    clip_backend = Column(String, nullable=False, default='torch')  # torch, torch_int8, onnx, onnx_int8
+    clip_idle_timeout = Column(Integer, nullable=False, default=300)  # segundos sin uso para liberar CLIP (0 = nunca)
 
     # Configuración del lector de comics
     scroll_threshold = Column(Float, nullable=False, default=1.0)
@@ -11,6 +11,8 @@ from sqlalchemy.orm import sessionmaker
 from entidades import Base
 from entidades.comicbook_info_cover_model import ComicbookInfoCover
 from helpers.embedding_generator import get_embedding_generator
+from helpers.cover_ann_index import add_cover_embedding
+from helpers.reembed_job import stale_embedding_filter
 
 
 def generate_all_cover_embeddings(batch_size=50):
@@ -27,6 +29,9 @@ def generate_all_cover_embeddings(batch_size=50):
         return
 
     engine = create_engine(f'sqlite:///{db_path}')
+    # Columnas nuevas (embedding_model, ...) si la app todavía no abrió esta base
+    from helpers.db_migrations import ensure_schema
+    ensure_schema(engine)
     Session = sessionmaker(bind=engine)
     session = Session()
 
@@ -47,14 +52,16 @@ def generate_all_cover_embeddings(batch_size=50):
         # Obtener generador de embeddings
         print("Inicializando generador de embeddings...")
         emb_gen = get_embedding_generator()
+        # Backend realmente cargado (puede ser torch aunque se haya configurado otro)
+        model_id = emb_gen.resolve_model_id()
 
-        # Obtener todas las covers sin embedding
+        # Obtener todas las covers sin embedding o con embedding de otro modelo
         covers_sin_embedding = session.query(ComicbookInfoCover).filter(
-            (ComicbookInfoCover.embedding == None) | (ComicbookInfoCover.embedding == '')
+            stale_embedding_filter(ComicbookInfoCover, model_id, include_missing=True)
         ).all()
 
         total = len(covers_sin_embedding)
-        print(f"\nEncontradas {total} covers sin embedding")
+        print(f"\nEncontradas {total} covers sin embedding (o de otro modelo)")
 
         if total == 0:
             print("Todas las covers ya tienen embeddings!")
@@ -84,8 +91,10 @@ def generate_all_cover_embeddings(batch_size=50):
                 embedding = emb_gen.generate_embedding(imagen_path)
 
                 if embedding is not None:
-                    # Guardar como JSON
-                    cover.embedding = emb_gen.embedding_to_json(embedding)
+                    # Guardar en formato binario
+                    cover.embedding = emb_gen.encode_embedding(embedding)
+                    cover.embedding_model = emb_gen.model_id
+                    add_cover_embedding(cover.id_cover, cover.id_comicbook_info, embedding, emb_gen.model_id)
                     procesadas += 1
 
                     # Commit cada batch_size items
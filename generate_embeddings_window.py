@@ -12,6 +12,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from entidades.comicbook_info_cover_model import ComicbookInfoCover
 from helpers.embedding_generator import get_embedding_generator
+from helpers.cover_ann_index import add_cover_embedding
+from helpers.reembed_job import stale_embedding_filter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
@@ -286,13 +288,15 @@ class GenerateEmbeddingsWindow(Adw.Window):
             self.log("✅ Modelo cargado")
             self.log("")
 
-            # Obtener covers sin embedding
+            # Obtener covers sin embedding o con embedding de otro modelo
+            # (el del backend realmente cargado, que puede no ser el configurado)
+            self.model_id = emb_gen.resolve_model_id()
             covers_sin_embedding = session.query(ComicbookInfoCover).filter(
-                (ComicbookInfoCover.embedding == None) | (ComicbookInfoCover.embedding == '')
+                stale_embedding_filter(ComicbookInfoCover, self.model_id, include_missing=True)
             ).all()
 
             total = len(covers_sin_embedding)
-            self.log(f"📦 Total de covers sin embedding: {total}")
+            self.log(f"📦 Total de covers sin embedding (o de otro modelo): {total}")
             self.log("")
 
             if total == 0:
@@ -305,6 +309,9 @@ class GenerateEmbeddingsWindow(Adw.Window):
             errors = 0
             batch_size = 50
 
+            # Las covers válidas se juntan en lotes para un solo forward pass de CLIP
+            pending = []  # [(i, cover, imagen_path, issue_info), ...]
+
             for i, cover in enumerate(covers_sin_embedding, 1):
                 if self.cancelled:
                     self.log("❌ Proceso cancelado por el usuario")
@@ -336,49 +343,25 @@ class GenerateEmbeddingsWindow(Adw.Window):
                         self.update_progress(i, total)
                         continue
 
-                    # Generar embedding
-                    self.log(f"[{i}/{total}] {os.path.basename(imagen_path)}")
-                    self.update_progress(i, total, imagen_path)
-
-                    embedding = None
-                    try:
-                        embedding = emb_gen.generate_embedding(imagen_path)
-                    except Exception as e:
-                        self.log(f"  ⚠️ Error generando embedding {issue_info}: {e}")
-                        
-                        # Intentar recuperar la cover si falla
-                        if self.recover_cover(cover, session):
-                            self.log("  🔄 Reintentando generación...")
-                            try:
-                                # Recalcular ruta por si cambió
-                                imagen_path = cover.obtener_ruta_local()
-                                embedding = emb_gen.generate_embedding(imagen_path)
-                            except Exception as e2:
-                                self.log(f"  ❌ Falló reintento: {e2}")
-                                embedding = None
-                        else:
-                            embedding = None
-
-                    if embedding is not None:
-                        cover.embedding = emb_gen.embedding_to_json(embedding)
-                        processed += 1
-
-                        # Commit por batches
-                        if processed % batch_size == 0:
-                            session.commit()
-                            self.log(f"  ✓ Guardadas {processed} covers")
-                    else:
-                        errors += 1
-                        self.log(f"  ❌ Error (irrecuperable) {issue_info}")
-                        self.failed_covers.append(cover) # Agregar a fallidos
-
-                    self.update_stats(total, processed, skipped, errors)
+                    pending.append((i, cover, imagen_path, issue_info))
 
                 except Exception as e:
                     errors += 1
                     self.log(f"  ❌ Error procesando item: {e}")
                     self.update_stats(total, processed, skipped, errors)
 
+                if len(pending) >= emb_gen.batch_size:
+                    processed, errors = self._flush_embedding_batch(
+                        pending, emb_gen, session, total, processed, skipped, errors, batch_size
+                    )
+                    pending = []
+
+            # Último lote incompleto
+            if pending and not self.cancelled:
+                processed, errors = self._flush_embedding_batch(
+                    pending, emb_gen, session, total, processed, skipped, errors, batch_size
+                )
+
             # Commit final
             session.commit()
             session.close()
@@ -399,6 +382,70 @@ class GenerateEmbeddingsWindow(Adw.Window):
             self.log(traceback.format_exc())
             GLib.idle_add(self.on_complete)
 
+    def _flush_embedding_batch(self, pending, emb_gen, session, total, processed, skipped, errors, batch_size):
+        """Procesa un lote, hace commit cada batch_size covers y actualiza estadísticas"""
+        batch_processed, batch_errors = self._process_embedding_batch(pending, emb_gen, session, total)
+
+        previous = processed
+        processed += batch_processed
+        errors += batch_errors
+
+        # Commit por batches
+        if processed // batch_size > previous // batch_size:
+            session.commit()
+            self.log(f"  ✓ Guardadas {processed} covers")
+
+        self.update_stats(total, processed, skipped, errors)
+        return processed, errors
+
+    def _process_embedding_batch(self, pending, emb_gen, session, total):
+        """
+        Genera los embeddings de un lote de covers con una sola llamada a CLIP.
+        Las que fallan se intentan recuperar (redescarga) de a una.
+
+        Returns:
+            Tupla (procesadas, errores)
+        """
+        processed = 0
+        errors = 0
+
+        last_index, _, last_path, _ = pending[-1]
+        self.log(f"[{last_index}/{total}] Lote de {len(pending)} covers")
+        self.update_progress(last_index, total, last_path)
+
+        try:
+            embeddings = emb_gen.generate_embeddings([imagen_path for _, _, imagen_path, _ in pending])
+        except Exception as e:
+            self.log(f"  ⚠️ Error generando lote de embeddings: {e}")
+            embeddings = [None] * len(pending)
+
+        for (i, cover, imagen_path, issue_info), embedding in zip(pending, embeddings):
+            if embedding is None:
+                self.log(f"  ⚠️ Error generando embedding {issue_info}: {os.path.basename(imagen_path)}")
+
+                # Intentar recuperar la cover si falla
+                if self.recover_cover(cover, session):
+                    self.log("  🔄 Reintentando generación...")
+                    try:
+                        # Recalcular ruta por si cambió
+                        imagen_path = cover.obtener_ruta_local()
+                        embedding = emb_gen.generate_embedding(imagen_path)
+                    except Exception as e2:
+                        self.log(f"  ❌ Falló reintento: {e2}")
+                        embedding = None
+
+            if embedding is not None:
+                cover.embedding = emb_gen.encode_embedding(embedding)
+                cover.embedding_model = emb_gen.model_id
+                add_cover_embedding(cover.id_cover, cover.id_comicbook_info, embedding, emb_gen.model_id)
+                processed += 1
+            else:
+                errors += 1
+                self.log(f"  ❌ Error (irrecuperable) {issue_info}")
+                self.failed_covers.append(cover) # Agregar a fallidos
+
+        return processed, errors
+
     def recover_cover(self, cover, session):
         """Intenta recuperar una cover dañada o faltante"""
         try:
@@ -522,7 +569,8 @@ class GenerateEmbeddingsWindow(Adw.Window):
             'cover_id': task_data.get('cover_id'),
             'success': False,
             'new_url': None,
-            'embedding_json': None,
+            'embedding_data': None,
+            'embedding_model': None,
             'log_messages': []
         }
         
@@ -588,7 +636,8 @@ class GenerateEmbeddingsWindow(Adw.Window):
                     embedding = emb_gen.generate_embedding(path)
                     
                     if embedding is not None:
-                        result['embedding_json'] = emb_gen.embedding_to_json(embedding)
+                        result['embedding_data'] = emb_gen.encode_embedding(embedding)
+                        result['embedding_model'] = emb_gen.model_id
                         result['success'] = True
                         result['new_url'] = image_url
                         log(f"  ✅ [ID {cover_id}] Reparación exitosa")
@@ -680,8 +729,11 @@ class GenerateEmbeddingsWindow(Adw.Window):
                                 if result['new_url'] and cover.url_imagen != result['new_url']:
                                     cover.url_imagen = result['new_url']
                                 
-                                cover.embedding = result['embedding_json']
+                                cover.embedding = result['embedding_data']
+                                cover.embedding_model = result['embedding_model']
                                 session.commit() # Commit parcial para ir guardando
+                                add_cover_embedding(cover.id_cover, cover.id_comicbook_info,
+                                                    cover.embedding, cover.embedding_model)
                                 repaired_count += 1
                                 
                     except Exception as e:
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+archive_tools.py - Lectura de miembros de CBR/CB7 con las herramientas del sistema
+
+Sin dependencias de GTK ni de la base de datos para poder usarse desde los
+procesos del pool de thumbnails.
+
+- La disponibilidad de unrar/7z se resuelve una sola vez por proceso con
+  shutil.which (sin lanzar procesos de prueba).
+- Un miembro suelto se lee por stdout (`unrar p` / `7z e -so`) sin pasar por disco.
+- Todos los miembros de un RAR se recorren con un solo `unrar p`, en el orden
+  del archivo (en RAR sólidos es la única forma de no descomprimir de nuevo).
+- Con 7z, los miembros pedidos de muchos archivos se extraen con una sola
+  invocación (`-ai@lista` + `-o<dir>/*`), en lugar de un proceso por archivo.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Nombres posibles de cada herramienta, en orden de preferencia
+UNRAR_COMMANDS = ('unrar', 'rar')
+SEVEN_ZIP_COMMANDS = ('7z', '7zz', '7za')
+
+# Archivos por invocación de 7z en modo lote (limita el tamaño del temporal)
+BATCH_ARCHIVES = 64
+
+# Timeout de cada proceso (segundos)
+COMMAND_TIMEOUT = 300
+
+
+@lru_cache(maxsize=None)
+def find_command(*names: str) -> Optional[str]:
+    """Ruta del primer comando disponible (cacheado por proceso)"""
+    for name in names:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def get_archive_tool(comic_format: str) -> Optional[Tuple[str, str]]:
+    """
+    Herramienta del sistema para un formato
+
+    Returns:
+        ('unrar' | '7z', ruta_del_ejecutable) o None si no hay ninguna
+    """
+    if comic_format == 'rar':
+        unrar = find_command(*UNRAR_COMMANDS)
+        if unrar:
+            return 'unrar', unrar
+    if comic_format in ('rar', '7z'):
+        seven_zip = find_command(*SEVEN_ZIP_COMMANDS)
+        if seven_zip:
+            return '7z', seven_zip
+    return None
+
+
+def get_archive_format(path: str) -> Optional[str]:
+    """Formato por extensión ('rar' o '7z'), o None para otros"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.cbr', '.rar'):
+        return 'rar'
+    if ext in ('.cb7', '.7z'):
+        return '7z'
+    return None
+
+
+def list_archive_members(path: str) -> List[str]:
+    """Nombres de los archivos (no directorios) dentro de un CBR/CB7"""
+    tool = get_archive_tool(get_archive_format(path))
+    if not tool:
+        return []
+
+    kind, command = tool
+    if kind == 'unrar':
+        result = subprocess.run(
+            [command, 'lb', '-p-', '--', path],
+            capture_output=True, timeout=COMMAND_TIMEOUT
+        )
+        if result.returncode != 0:
+            return []
+        return [line for line in result.stdout.decode('utf-8', 'replace').splitlines() if line]
+
+    # 7z: formato técnico (-slt) sin cabeceras (-ba), un bloque por miembro
+    result = subprocess.run(
+        [command, 'l', '-slt', '-ba', '-p-', '-sccUTF-8', '--', path],
+        capture_output=True, timeout=COMMAND_TIMEOUT
+    )
+    if result.returncode != 0:
+        return []
+
+    members = []
+    current_path = None
+    is_dir = False
+    for line in result.stdout.decode('utf-8', 'replace').splitlines() + ['']:
+        if line.startswith('Path = '):
+            current_path = line[len('Path = '):]
+        elif line.startswith('Folder = '):
+            is_dir = line.endswith('+')
+        elif line.startswith('Attributes = ') and 'D' in line[len('Attributes = '):].split(' ')[0]:
+            is_dir = True
+        elif not line.strip():
+            if current_path and not is_dir:
+                members.append(current_path)
+            current_path = None
+            is_dir = False
+    return members
+
+
+def read_archive_member(path: str, member: str) -> Optional[bytes]:
+    """Leer un miembro por stdout, sin extraer a disco"""
+    tool = get_archive_tool(get_archive_format(path))
+    if not tool:
+        return None
+
+    kind, command = tool
+    if kind == 'unrar':
+        args = [command, 'p', '-inul', '-p-', '--', path, member]
+    else:
+        args = [command, 'e', '-so', '-p-', '-sccUTF-8', '--', path, member]
+
+    try:
+        result = subprocess.run(args, capture_output=True, timeout=COMMAND_TIMEOUT)
+        if result.returncode == 0 and result.stdout:
+            return result.stdout
+    except (subprocess.TimeoutExpired, OSError) as e:
+        print(f"Error leyendo {member} de {path}: {e}")
+    return None
+
+
+class _MemberStream:
+    """Vista de solo lectura de los próximos `size` bytes de un stream"""
+
+    def __init__(self, stream, size: int):
+        self._stream = stream
+        self.remaining = size
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._stream.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def drain(self) -> None:
+        """Descartar lo que no se leyó del miembro"""
+        while self.remaining > 0:
+            if not self.read(min(self.remaining, 1024 * 1024)):
+                raise ValueError("unrar terminó antes de tiempo")
+
+
+def iter_rar_member_streams(path: str, members: List[Tuple[str, int]]) -> Iterator[Tuple[str, _MemberStream]]:
+    """
+    Recorrer los miembros de un RAR con una sola invocación de `unrar p`
+
+    unrar escribe todos los archivos seguidos por stdout en el orden del
+    archivo; los tamaños separan un miembro del siguiente. Lo que el llamador
+    no lee de cada miembro se descarta antes de pasar al próximo.
+
+    Args:
+        members: [(nombre, tamaño_descomprimido), ...] de todos los archivos
+            (no directorios) en el orden del RAR, por ejemplo de rarfile.infolist()
+
+    Yields:
+        (nombre, stream) - el stream solo es válido hasta el siguiente yield
+    """
+    unrar = find_command(*UNRAR_COMMANDS)
+    if not unrar:
+        raise ValueError("unrar no disponible")
+
+    process = subprocess.Popen(
+        [unrar, 'p', '-inul', '-p-', '--', path],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        for name, size in members:
+            member = _MemberStream(process.stdout, size)
+            yield name, member
+            member.drain()
+        if process.stdout.read(1):
+            raise ValueError("la salida de unrar no coincide con la lista de miembros")
+    finally:
+        process.stdout.close()
+        try:
+            process.wait(timeout=COMMAND_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def read_archive_members_batch(requests: Dict[str, str]) -> Dict[str, bytes]:
+    """
+    Leer un miembro de cada uno de muchos archivos CBR/CB7
+
+    Con 7z se agrupan hasta BATCH_ARCHIVES archivos por invocación; con unrar
+    (que acepta un solo archivo por llamada) se lee cada uno por stdout.
+
+    Args:
+        requests: {ruta_del_archivo: nombre_del_miembro}
+
+    Returns:
+        {ruta_del_archivo: bytes} solo para los que se pudieron leer
+    """
+    results = {}
+    batchable = []
+
+    for path, member in requests.items():
+        tool = get_archive_tool(get_archive_format(path))
+        if not tool:
+            continue
+        if tool[0] == '7z':
+            batchable.append((path, member))
+        else:
+            data = read_archive_member(path, member)
+            if data:
+                results[path] = data
+
+    # 7z nombra la carpeta de salida de cada archivo con su nombre sin
+    # extensión, así que un lote no puede repetir nombres
+    batches = []
+    for path, member in batchable:
+        stem = Path(path).stem
+        for batch in batches:
+            if stem not in batch and len(batch) < BATCH_ARCHIVES:
+                batch[stem] = (path, member)
+                break
+        else:
+            batches.append({stem: (path, member)})
+
+    for batch in batches:
+        results.update(_extract_7z_batch(batch))
+
+    # Lo que el lote no pudo extraer se intenta miembro por miembro
+    for path, member in batchable:
+        if path not in results:
+            data = read_archive_member(path, member)
+            if data:
+                results[path] = data
+
+    return results
+
+
+def _extract_7z_batch(batch: Dict[str, Tuple[str, str]]) -> Dict[str, bytes]:
+    """Extraer con un solo proceso de 7z los miembros pedidos de varios archivos"""
+    command = find_command(*SEVEN_ZIP_COMMANDS)
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="babelcomics_7z_") as temp_dir:
+        archives_list = os.path.join(temp_dir, "archives.txt")
+        members_list = os.path.join(temp_dir, "members.txt")
+        output_dir = os.path.join(temp_dir, "out")
+
+        with open(archives_list, 'w', encoding='utf-8') as f:
+            f.write("\n".join(path for path, _ in batch.values()) + "\n")
+        # La lista de miembros se aplica a todos los archivos del lote: en el
+        # peor caso se extrae alguna imagen de más con el mismo nombre
+        with open(members_list, 'w', encoding='utf-8') as f:
+            f.write("\n".join(sorted({member for _, member in batch.values()})) + "\n")
+
+        try:
+            subprocess.run(
+                [command, 'x', '-y', '-bd', '-p-', '-scsUTF-8', '-an',
+                 f'-ai@{archives_list}', f'-i@{members_list}', f'-o{output_dir}/*'],
+                capture_output=True, timeout=COMMAND_TIMEOUT
+            )
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"Error en extracción por lote con 7z: {e}")
+            return results
+
+        # El código de salida no se usa: con un archivo dañado 7z devuelve
+        # error pero igual extrae el resto del lote
+        for stem, (path, member) in batch.items():
+            extracted = os.path.join(output_dir, stem, member)
+            if os.path.isfile(extracted):
+                with open(extracted, 'rb') as f:
+                    results[path] = f.read()
+
+    return results
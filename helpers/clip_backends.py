@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+clip_backends.py - Backends de inferencia para la torre de visión de CLIP
+
+El preprocesado (CLIPProcessor) es siempre el mismo; lo que cambia es cómo
+se calcula image_features a partir de pixel_values:
+
+    torch       PyTorch fp32 (CPU o GPU), el comportamiento original
+    torch_int8  PyTorch con cuantización dinámica int8 de las capas Linear (CPU)
+    onnx        ONNX Runtime con el modelo exportado a data/clip_onnx
+    onnx_int8   ONNX Runtime con el modelo exportado y cuantizado a int8
+
+El backend se elige en la configuración (Setup.clip_backend). Si el elegido
+no está disponible (falta onnxruntime, se usa GPU, falla la exportación) se
+vuelve a torch.
+
+Verificación, sin conexión y con el modelo del caché local de HuggingFace:
+    python helpers/clip_backends.py --parity <carpeta_de_imágenes>
+    python helpers/clip_backends.py --benchmark <carpeta_de_imágenes> [hilos]
+"""
+
+import os
+import time
+
+import numpy as np
+import torch
+
+try:
+    import onnxruntime
+    ONNX_SUPPORT = True
+except ImportError:
+    ONNX_SUPPORT = False
+
+BACKENDS = ('torch', 'torch_int8', 'onnx', 'onnx_int8')
+DEFAULT_BACKEND = 'torch'
+
+ONNX_DIR = os.path.join('data', 'clip_onnx')
+ONNX_OPSET = 17
+
+# Similaridad coseno mínima contra torch fp32 para dar por buena la paridad
+PARITY_MIN_COSINE = 0.99
+
+
+class TorchBackend:
+    """PyTorch fp32 (el modelo tal cual)"""
+
+    name = 'torch'
+
+    def __init__(self, model, device):
+        self.model = model
+        self.device = device
+
+    def image_features(self, pixel_values):
+        """pixel_values (n, 3, 224, 224) -> numpy float32 (n, 512) sin normalizar"""
+        if isinstance(pixel_values, np.ndarray):
+            pixel_values = torch.from_numpy(pixel_values)
+        with torch.no_grad():
+            features = self.model.get_image_features(pixel_values=pixel_values.to(self.device))
+
+        # Versiones recientes de transformers pueden devolver un objeto en vez de tensor
+        if not isinstance(features, torch.Tensor):
+            features = features.pooler_output if hasattr(features, 'pooler_output') else features.last_hidden_state[:, 0, :]
+        return features.cpu().numpy().astype(np.float32)
+
+
+class TorchInt8Backend(TorchBackend):
+    """
+    Cuantización dinámica int8 de las capas Linear de la torre de visión
+
+    Los pesos se guardan en int8 y las activaciones se cuantizan al vuelo;
+    solo funciona en CPU. Trabaja sobre una copia para no tocar el modelo fp32.
+    """
+
+    name = 'torch_int8'
+
+    def __init__(self, model):
+        import copy
+        quantized = copy.deepcopy(model).to('cpu').eval()
+        quantized.vision_model = torch.ao.quantization.quantize_dynamic(
+            quantized.vision_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        quantized.visual_projection = torch.ao.quantization.quantize_dynamic(
+            quantized.visual_projection, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        super().__init__(quantized, 'cpu')
+
+
+class _VisionFeatures(torch.nn.Module):
+    """Torre de visión + proyección, con pixel_values como única entrada (para exportar)"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.vision_model = model.vision_model
+        self.visual_projection = model.visual_projection
+
+    def forward(self, pixel_values):
+        pooled = self.vision_model(pixel_values=pixel_values).pooler_output
+        return self.visual_projection(pooled)
+
+
+class OnnxBackend:
+    """ONNX Runtime sobre la torre de visión exportada (opcionalmente cuantizada)"""
+
+    def __init__(self, model, quantize=False, num_threads=0, model_name="openai/clip-vit-base-patch32"):
+        if not ONNX_SUPPORT:
+            raise RuntimeError("onnxruntime no está instalado")
+
+        self.name = 'onnx_int8' if quantize else 'onnx'
+        path = export_onnx(model, model_name, quantize=quantize)
+
+        options = onnxruntime.SessionOptions()
+        if num_threads and num_threads > 0:
+            options.intra_op_num_threads = int(num_threads)
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def image_features(self, pixel_values):
+        pixel_values = pixel_values.cpu().numpy() if isinstance(pixel_values, torch.Tensor) else pixel_values
+        return self.session.run(None, {self.input_name: pixel_values.astype(np.float32)})[0]
+
+
+def get_onnx_path(model_name, quantize=False):
+    """Ruta del modelo exportado para un modelo de HuggingFace"""
+    base = model_name.replace('/', '__')
+    return os.path.join(ONNX_DIR, f"{base}{'_int8' if quantize else ''}.onnx")
+
+
+def export_onnx(model, model_name, quantize=False):
+    """
+    Exportar la torre de visión a ONNX (y cuantizarla) si todavía no existe
+
+    Returns:
+        Ruta del .onnx listo para usar
+    """
+    fp32_path = get_onnx_path(model_name)
+    target = get_onnx_path(model_name, quantize)
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(ONNX_DIR, exist_ok=True)
+
+    if not os.path.exists(fp32_path):
+        print(f"   Exportando torre de visión de CLIP a ONNX ({fp32_path})...")
+        wrapper = _VisionFeatures(model.to('cpu')).eval()
+        dummy = torch.zeros(1, 3, 224, 224, dtype=torch.float32)
+        temp_path = fp32_path + '.part'
+        with torch.no_grad():
+            torch.onnx.export(
+                wrapper, (dummy,), temp_path,
+                input_names=['pixel_values'], output_names=['image_features'],
+                dynamic_axes={'pixel_values': {0: 'batch'}, 'image_features': {0: 'batch'}},
+                opset_version=ONNX_OPSET
+            )
+        os.replace(temp_path, fp32_path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"   Cuantizando modelo ONNX a int8 ({target})...")
+        temp_path = target + '.part'
+        quantize_dynamic(fp32_path, temp_path, weight_type=QuantType.QInt8)
+        os.replace(temp_path, target)
+
+    return target
+
+
+def create_backend(name, model, device, num_threads=0, model_name="openai/clip-vit-base-patch32"):
+    """
+    Crear el backend configurado, volviendo a torch si no se puede
+
+    Los backends cuantizados y ONNX son solo de CPU: con GPU se usa torch.
+    """
+    if name not in BACKENDS:
+        print(f"⚠️ Backend de CLIP desconocido '{name}', usando torch")
+        name = DEFAULT_BACKEND
+
+    if name != 'torch' and device != 'cpu':
+        print(f"   Backend {name} es solo para CPU; usando torch en {device}")
+        name = 'torch'
+
+    try:
+        if name == 'torch_int8':
+            return TorchInt8Backend(model)
+        if name in ('onnx', 'onnx_int8'):
+            return OnnxBackend(model, quantize=(name == 'onnx_int8'),
+                               num_threads=num_threads, model_name=model_name)
+    except Exception as e:
+        print(f"⚠️ No se pudo iniciar el backend {name} ({e}), usando torch")
+
+    return TorchBackend(model, device)
+
+
+def _normalize(features):
+    return features / np.linalg.norm(features, axis=1, keepdims=True)
+
+
+def _load_local_clip(model_name="openai/clip-vit-base-patch32"):
+    """Modelo y processor solo desde el caché local (sin red)"""
+    from transformers import CLIPModel, CLIPProcessor
+    model = CLIPModel.from_pretrained(model_name, local_files_only=True, use_safetensors=False).eval()
+    processor = CLIPProcessor.from_pretrained(model_name, local_files_only=True, use_safetensors=False)
+    return model, processor
+
+
+def _load_pixel_values(processor, image_paths):
+    from PIL import Image
+    images = []
+    for path in image_paths:
+        with Image.open(path) as raw:
+            images.append(raw.convert("RGB"))
+    return processor(images=images, return_tensors="pt")['pixel_values']
+
+
+def check_backend_parity(image_paths, backends=BACKENDS[1:], batch_size=16):
+    """
+    Comparar cada backend contra torch fp32 sobre las mismas imágenes
+
+    Además del coseno entre embeddings de la misma imagen, mide si el vecino
+    más cercano de cada imagen (dentro del conjunto) sigue siendo el mismo,
+    que es lo que importa para el matching de covers.
+
+    Returns:
+        {backend: {'min_cosine', 'mean_cosine', 'top1_agreement', 'ok'}}
+    """
+    model, processor = _load_local_clip()
+    reference_backend = TorchBackend(model, 'cpu')
+
+    pixel_batches = [_load_pixel_values(processor, image_paths[start:start + batch_size])
+                     for start in range(0, len(image_paths), batch_size)]
+    reference = _normalize(np.vstack([reference_backend.image_features(batch) for batch in pixel_batches]))
+
+    def nearest(matrix):
+        scores = matrix @ matrix.T
+        np.fill_diagonal(scores, -np.inf)
+        return np.argmax(scores, axis=1)
+
+    reference_nearest = nearest(reference) if len(reference) > 1 else None
+
+    report = {}
+    for name in backends:
+        backend = create_backend(name, model, 'cpu')
+        if backend.name != name:
+            report[name] = {'ok': False, 'error': 'no disponible'}
+            continue
+
+        features = _normalize(np.vstack([backend.image_features(batch) for batch in pixel_batches]))
+        cosines = np.sum(features * reference, axis=1)
+        agreement = float(np.mean(nearest(features) == reference_nearest)) if reference_nearest is not None else 1.0
+        report[name] = {
+            'min_cosine': float(cosines.min()),
+            'mean_cosine': float(cosines.mean()),
+            'top1_agreement': agreement,
+            'ok': bool(cosines.min() >= PARITY_MIN_COSINE),
+        }
+    return report
+
+
+def benchmark_backends(image_paths, backends=BACKENDS, batch_size=16, num_threads=None, repeats=3):
+    """
+    Latencia por lote e imágenes por segundo de cada backend (solo inferencia)
+
+    Returns:
+        {backend: {'images_per_second', 'batch_ms'}}
+    """
+    if num_threads:
+        torch.set_num_threads(int(num_threads))
+
+    model, processor = _load_local_clip()
+    pixel_values = _load_pixel_values(processor, image_paths[:batch_size])
+
+    report = {}
+    for name in backends:
+        backend = create_backend(name, model, 'cpu', num_threads or 0)
+        if backend.name != name:
+            continue
+
+        backend.image_features(pixel_values)  # calentamiento
+        start = time.perf_counter()
+        for _ in range(repeats):
+            backend.image_features(pixel_values)
+        elapsed = (time.perf_counter() - start) / repeats
+
+        report[name] = {
+            'images_per_second': len(pixel_values) / elapsed,
+            'batch_ms': elapsed * 1000,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).parent.parent))
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ('--parity', '--benchmark'):
+        print("Uso: python helpers/clip_backends.py --parity|--benchmark <carpeta> [hilos]")
+        sys.exit(1)
+
+    folder = Path(sys.argv[2])
+    paths = sorted(str(p) for p in folder.iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp'))
+    if not paths:
+        print(f"❌ No hay imágenes en {folder}")
+        sys.exit(1)
+
+    if sys.argv[1] == '--parity':
+        print(f"🔍 Paridad contra torch fp32 con {len(paths)} imágenes")
+        failed = False
+        for name, row in check_backend_parity(paths).items():
+            if 'error' in row:
+                print(f"   {name:<11} ⚠️ {row['error']}")
+                continue
+            mark = "✅" if row['ok'] else "❌"
+            failed = failed or not row['ok']
+            print(f"   {name:<11} {mark} coseno mín {row['min_cosine']:.4f}  medio {row['mean_cosine']:.4f}  "
+                  f"vecino top-1 igual {row['top1_agreement']:.1%}")
+        sys.exit(1 if failed else 0)
+
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    print(f"⏱️  Benchmark con lotes de {min(16, len(paths))} imágenes, hilos: {threads or 'automático'}")
+    for name, row in benchmark_backends(paths, num_threads=threads).items():
+        print(f"   {name:<11} {row['images_per_second']:7.1f} img/s  ({row['batch_ms']:.0f} ms por lote)")
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Conversión de CBR/CB7 a CBZ sin compresión (modo store)
+
+Los RAR y los 7z sólidos son los formatos más lentos en todos los caminos
+calientes (abrir en el lector, thumbnails de portada, indexado de páginas):
+leer una página obliga a lanzar unrar o a descomprimir el bloque desde el
+principio. Un ZIP en modo store permite leer cualquier página con un seek.
+
+La conversión corre en un pool de procesos; cada proceso escribe el CBZ a un
+archivo temporal y lo verifica (cantidad de páginas y CRC de cada miembro).
+El proceso principal hace el reemplazo atómico, actualiza Comicbook.path y
+recién entonces borra el original.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import zlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Agregar directorio padre al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Extensiones que se convierten
+CONVERTIBLE_EXTENSIONS = ('.cbr', '.rar', '.cb7', '.7z')
+
+# Bytes de cabeceras ZIP por miembro (local + directorio central) sin contar el nombre
+ZIP_ENTRY_OVERHEAD = 30 + 46
+ZIP_END_OVERHEAD = 22
+
+
+@dataclass
+class ComicConversionResult:
+    """Resultado (o estimación, en dry run) de convertir un cómic"""
+    comicbook_id: int
+    source_path: str
+    target_path: str
+    status: str  # 'CONVERTED', 'DRY_RUN', 'SKIPPED', 'ERROR'
+    message: str
+    pages: int = 0
+    source_size: int = 0  # Bytes del archivo original
+    target_size: int = 0  # Bytes del CBZ (estimado en dry run)
+    source_page_ms: float = 0.0  # Lectura de una página del original
+    target_page_ms: float = 0.0  # Lectura de una página en modo store (estimada en dry run)
+
+    @property
+    def size_delta(self) -> int:
+        """Diferencia de espacio en disco (positivo = ocupa más)"""
+        return self.target_size - self.source_size
+
+    @property
+    def speedup(self) -> float:
+        """Cuántas veces más rápido se lee una página después de convertir"""
+        if self.target_page_ms <= 0:
+            return 0.0
+        return self.source_page_ms / self.target_page_ms
+
+
+def get_cbz_path(source_path: str) -> str:
+    """Ruta del CBZ que reemplaza a un CBR/CB7"""
+    return str(Path(source_path).with_suffix('.cbz'))
+
+
+def _list_archive_members(source_path: str) -> List[Tuple[str, int, Optional[int]]]:
+    """
+    Listar todos los miembros (no solo imágenes: también ComicInfo.xml, etc.)
+    desde las cabeceras del archivo, sin descomprimir nada
+
+    Returns:
+        [(nombre, tamaño_descomprimido, crc_declarado_o_None), ...] en el orden del archivo
+    """
+    ext = Path(source_path).suffix.lower()
+
+    if ext in ('.cbr', '.rar'):
+        import rarfile
+        with rarfile.RarFile(source_path, 'r') as rar_ref:
+            return [
+                (info.filename, info.file_size, getattr(info, 'CRC', None))
+                for info in rar_ref.infolist() if not info.is_dir()
+            ]
+
+    if ext in ('.cb7', '.7z'):
+        import py7zr
+        with py7zr.SevenZipFile(source_path, 'r') as seven_z_ref:
+            return [
+                (info.filename, info.uncompressed, getattr(info, 'crc32', None))
+                for info in seven_z_ref.list() if not info.is_directory
+            ]
+
+    raise ValueError(f"Formato no convertible: {ext}")
+
+
+def _extract_archive_members(source_path: str, temp_dir: str) -> List[Tuple[str, str, Optional[int]]]:
+    """
+    Extraer todos los miembros a temp_dir en una sola pasada
+
+    Un read() por miembro relanza unrar y, en archivos sólidos, descomprime de
+    nuevo todo lo anterior (O(n²)). Tampoco se guardan en memoria: un ómnibus
+    por cada proceso del pool serían varios GB.
+
+    Returns:
+        [(nombre, ruta_extraída, crc_declarado_o_None), ...] en el orden del archivo
+    """
+    ext = Path(source_path).suffix.lower()
+
+    if ext in ('.cbr', '.rar'):
+        import rarfile
+        with rarfile.RarFile(source_path, 'r') as rar_ref:
+            infos = [info for info in rar_ref.infolist() if not info.is_dir()]
+            rar_ref.extractall(temp_dir, members=infos)
+        members = [(info.filename, getattr(info, 'CRC', None)) for info in infos]
+
+    elif ext in ('.cb7', '.7z'):
+        import py7zr
+        with py7zr.SevenZipFile(source_path, 'r') as seven_z_ref:
+            infos = [info for info in seven_z_ref.list() if not info.is_directory]
+            seven_z_ref.extractall(path=temp_dir)
+        members = [(info.filename, getattr(info, 'crc32', None)) for info in infos]
+
+    else:
+        raise ValueError(f"Formato no convertible: {ext}")
+
+    extracted = []
+    for name, declared_crc in members:
+        path = os.path.join(temp_dir, name)
+        if not os.path.isfile(path):
+            raise ValueError(f"No se pudo extraer {name}")
+        extracted.append((name, path, declared_crc))
+    return extracted
+
+
+def _file_crc32(path: str) -> int:
+    """CRC32 de un archivo, leyéndolo por bloques"""
+    crc = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            crc = zlib.crc32(block, crc)
+    return crc & 0xFFFFFFFF
+
+
+def _drop_file_cache(path: str) -> None:
+    """Sacar un archivo del page cache (Linux) para medir una lectura en frío"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def _time_source_page_read(source_path: str, member_name: str) -> Tuple[float, bytes]:
+    """Tiempo (ms) de leer una página suelta del original en frío, como hace el lector"""
+    from helpers.comic_extractor import ComicExtractor
+    _drop_file_cache(source_path)
+    data = b''
+    start = time.perf_counter()
+    for _, data in ComicExtractor().iter_image_members(source_path, [member_name]):
+        break
+    return (time.perf_counter() - start) * 1000, data
+
+
+def _time_store_page_read(member_name: str, data: bytes) -> float:
+    """
+    Tiempo (ms) de leer una página de un CBZ en modo store, en frío
+
+    Se escribe un CBZ de muestra con esa página, se saca del page cache y se
+    mide lo mismo que hace el lector: abrir el ZIP, ubicar el miembro y leerlo.
+    """
+    with tempfile.TemporaryDirectory(prefix="babelcomics_store_") as temp_dir:
+        sample_path = os.path.join(temp_dir, "sample.cbz")
+        with zipfile.ZipFile(sample_path, 'w', compression=zipfile.ZIP_STORED) as zip_ref:
+            zip_ref.writestr(member_name, data)
+        _drop_file_cache(sample_path)
+
+        start = time.perf_counter()
+        with zipfile.ZipFile(sample_path, 'r') as zip_ref:
+            zip_ref.read(member_name)
+        return (time.perf_counter() - start) * 1000
+
+
+def _estimate_comic_job(job: Tuple[int, str]) -> ComicConversionResult:
+    """
+    Trabajo del pool en dry run: medir el original y estimar el CBZ
+
+    Los tamaños salen de las cabeceras del archivo (sin descomprimir); solo se
+    lee la página que se usa para comparar tiempos de lectura.
+    """
+    comicbook_id, source_path = job
+    target_path = get_cbz_path(source_path)
+    result = ComicConversionResult(comicbook_id, source_path, target_path, 'DRY_RUN', '')
+
+    try:
+        from helpers.comic_extractor import ComicExtractor
+        extractor = ComicExtractor()
+
+        result.source_size = os.path.getsize(source_path)
+        members = _list_archive_members(source_path)
+        image_names = extractor._sort_image_members([name for name, _, _ in members])
+        result.pages = len(image_names)
+        result.target_size = ZIP_END_OVERHEAD + sum(
+            ZIP_ENTRY_OVERHEAD + 2 * len(name.encode('utf-8')) + size
+            for name, size, _ in members
+        )
+
+        if image_names:
+            # Página del medio: en un 7z sólido es de las más caras de alcanzar
+            middle = image_names[len(image_names) // 2]
+            result.source_page_ms, data = _time_source_page_read(source_path, middle)
+            if data:
+                result.target_page_ms = _time_store_page_read(middle, data)
+
+        result.message = (f"Convertiría a {os.path.basename(target_path)} "
+                          f"({result.pages} páginas, {result.size_delta / 1024 / 1024:+.1f} MB)")
+
+    except Exception as e:
+        result.status = 'ERROR'
+        result.message = str(e)
+
+    return result
+
+
+def _convert_comic_job(job: Tuple[int, str]) -> ComicConversionResult:
+    """
+    Trabajo del pool: escribir el CBZ a un temporal y verificarlo
+
+    El temporal (<destino>.part) queda listo para que el proceso principal
+    lo renombre; si algo falla se borra.
+    """
+    comicbook_id, source_path = job
+    target_path = get_cbz_path(source_path)
+    partial_path = target_path + ".part"
+    result = ComicConversionResult(comicbook_id, source_path, target_path, 'CONVERTED', '')
+
+    try:
+        from helpers.comic_extractor import ComicExtractor
+        extractor = ComicExtractor()
+
+        if os.path.exists(target_path):
+            result.status = 'SKIPPED'
+            result.message = f"Ya existe {os.path.basename(target_path)}"
+            return result
+
+        result.source_size = os.path.getsize(source_path)
+        expected_crcs = {}
+        with tempfile.TemporaryDirectory(prefix="babelcomics_convert_") as temp_dir:
+            members = _extract_archive_members(source_path, temp_dir)
+            source_pages = extractor._sort_image_members([name for name, _, _ in members])
+            if not source_pages:
+                raise ValueError("El archivo no contiene páginas")
+
+            # CRC de lo extraído; si el formato lo declara, tiene que coincidir.
+            # ZipFile.write copia cada archivo por bloques, sin cargarlo entero
+            with zipfile.ZipFile(partial_path, 'w', compression=zipfile.ZIP_STORED) as zip_ref:
+                for name, path, declared_crc in members:
+                    crc = _file_crc32(path)
+                    if declared_crc is not None and declared_crc != crc:
+                        raise ValueError(f"CRC inválido en el original: {name}")
+                    expected_crcs[name] = crc
+                    zip_ref.write(path, arcname=name)
+
+        # Verificar el CBZ escrito: mismas páginas, mismo orden y mismos CRC
+        with zipfile.ZipFile(partial_path, 'r') as zip_ref:
+            bad_member = zip_ref.testzip()
+            if bad_member:
+                raise ValueError(f"CRC inválido en el CBZ: {bad_member}")
+            written_crcs = {info.filename: info.CRC for info in zip_ref.infolist()}
+
+        if written_crcs != expected_crcs:
+            raise ValueError("Los miembros del CBZ no coinciden con el original")
+        if extractor.list_image_members(partial_path) != source_pages:
+            raise ValueError("La cantidad u orden de páginas no coincide")
+
+        result.pages = len(source_pages)
+        result.target_size = os.path.getsize(partial_path)
+        result.message = f"Convertido ({result.pages} páginas)"
+
+    except Exception as e:
+        result.status = 'ERROR'
+        result.message = str(e)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    return result
+
+
+class ComicConverter:
+    """
+    Job de mantenimiento: convierte CBR/CB7 de la biblioteca a CBZ en modo store
+    """
+
+    def __init__(self, session, progress_callback=None):
+        """
+        Args:
+            session: Sesión de SQLAlchemy para acceso a BD
+            progress_callback: function(done, total, result) - llamada por cada cómic
+        """
+        self.session = session
+        self.progress_callback = progress_callback
+
+    def find_candidates(self, comic_ids: List[int] = None) -> List[Tuple[int, str]]:
+        """Cómics CBR/CB7 existentes en disco y fuera de la papelera"""
+        from entidades.comicbook_model import Comicbook
+
+        query = self.session.query(Comicbook.id_comicbook, Comicbook.path).filter(
+            Comicbook.en_papelera == False
+        )
+        if comic_ids:
+            query = query.filter(Comicbook.id_comicbook.in_(comic_ids))
+
+        return [
+            (comic_id, path) for comic_id, path in query.all()
+            if path and path.lower().endswith(CONVERTIBLE_EXTENSIONS) and os.path.exists(path)
+        ]
+
+    def run(self, comic_ids: List[int] = None, workers: int = None,
+            dry_run: bool = False, keep_original: bool = False) -> List[ComicConversionResult]:
+        """
+        Convertir (o estimar, en dry run) los cómics candidatos
+
+        Args:
+            comic_ids: Cómics a convertir (por defecto todos los CBR/CB7)
+            workers: Procesos del pool (por defecto Setup.workers_concurrentes)
+            dry_run: Solo medir y estimar, sin escribir nada
+            keep_original: No borrar el CBR/CB7 después de convertir
+
+        Returns:
+            Lista de resultados, uno por cómic
+        """
+        if workers is None:
+            from helpers.config_helper import ConfigHelper
+            workers = ConfigHelper.get_workers_count()
+        workers = max(1, int(workers))
+
+        jobs = self.find_candidates(comic_ids)
+        job_function = _estimate_comic_job if dry_run else _convert_comic_job
+        results = []
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(job_function, job): job for job in jobs}
+
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    comic_id, path = futures[future]
+                    result = ComicConversionResult(comic_id, path, get_cbz_path(path), 'ERROR', str(e))
+
+                # El reemplazo y la BD se tocan solo desde este proceso
+                if result.status == 'CONVERTED':
+                    self._swap_converted(result, keep_original)
+
+                results.append(result)
+                if self.progress_callback:
+                    self.progress_callback(done, len(jobs), result)
+
+        return results
+
+    def _swap_converted(self, result: ComicConversionResult, keep_original: bool):
+        """Renombrar el CBZ verificado, apuntar Comicbook.path a él y borrar el original"""
+        from entidades.comicbook_model import Comicbook
+
+        partial_path = result.target_path + ".part"
+        replaced = False
+        try:
+            # No pisar un archivo que haya aparecido mientras se convertía
+            if os.path.exists(result.target_path):
+                raise FileExistsError(f"Ya existe {result.target_path}")
+            os.replace(partial_path, result.target_path)
+            replaced = True
+
+            comicbook = self.session.query(Comicbook).filter_by(
+                id_comicbook=result.comicbook_id
+            ).first()
+            if comicbook:
+                comicbook.path = result.target_path
+                self.session.commit()
+
+        except Exception as e:
+            self.session.rollback()
+            # Dejar todo como estaba: el original sigue siendo el archivo válido.
+            # El destino solo se borra si lo creó este reemplazo (nunca uno preexistente)
+            paths = (partial_path, result.target_path) if replaced else (partial_path,)
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            result.status = 'ERROR'
+            result.message = f"Error reemplazando archivo: {e}"
+            return
+
+        if not keep_original:
+            try:
+                os.remove(result.source_path)
+            except OSError as e:
+                result.message += f" (no se pudo borrar el original: {e})"
+
+
+def summarize_results(results: List[ComicConversionResult]) -> Dict:
+    """Totales del job: cantidades por estado, espacio y mejora estimada"""
+    measured = [r for r in results if r.status in ('DRY_RUN', 'CONVERTED') and r.source_page_ms > 0]
+    source_ms = sum(r.source_page_ms for r in measured)
+    target_ms = sum(r.target_page_ms for r in measured)
+
+    summary = {status: 0 for status in ('CONVERTED', 'DRY_RUN', 'SKIPPED', 'ERROR')}
+    for result in results:
+        summary[result.status] += 1
+
+    ok = [r for r in results if r.status in ('DRY_RUN', 'CONVERTED')]
+    summary.update({
+        'source_bytes': sum(r.source_size for r in ok),
+        'target_bytes': sum(r.target_size for r in ok),
+        'size_delta_bytes': sum(r.size_delta for r in ok),
+        'page_read_ms_before': round(source_ms / len(measured), 2) if measured else 0.0,
+        'page_read_ms_after': round(target_ms / len(measured), 2) if measured else 0.0,
+        'speedup': round(source_ms / target_ms, 1) if target_ms > 0 else 0.0,
+    })
+    return summary
+
+
+if __name__ == "__main__":
+    # Uso: python helpers/comic_converter.py [--run] [--keep-original] [workers]
+    #   sin --run solo genera el reporte (dry run)
+    from sqlalchemy.orm import sessionmaker
+    from entidades import engine
+    from helpers.db_migrations import ensure_schema
+
+    args = sys.argv[1:]
+    dry_run = '--run' not in args
+    keep_original = '--keep-original' in args
+    numbers = [arg for arg in args if arg.isdigit()]
+    workers = int(numbers[0]) if numbers else None
+
+    ensure_schema(engine)
+    session = sessionmaker(bind=engine)()
+
+    def print_progress(done, total, result):
+        icon = {'CONVERTED': '✅', 'DRY_RUN': '🔎', 'SKIPPED': '⏭️', 'ERROR': '❌'}[result.status]
+        print(f"{icon} [{done}/{total}] {os.path.basename(result.source_path)}: {result.message}")
+
+    converter = ComicConverter(session, progress_callback=print_progress)
+    results = converter.run(workers=workers, dry_run=dry_run, keep_original=keep_original)
+    summary = summarize_results(results)
+
+    print(f"\n📊 {'Reporte (dry run)' if dry_run else 'Conversión'}: {len(results)} cómics CBR/CB7")
+    print(f"   - Espacio actual: {summary['source_bytes'] / 1024 / 1024:.1f} MB")
+    print(f"   - Espacio CBZ:    {summary['target_bytes'] / 1024 / 1024:.1f} MB "
+          f"({summary['size_delta_bytes'] / 1024 / 1024:+.1f} MB)")
+    print(f"   - Lectura de una página: {summary['page_read_ms_before']} ms → "
+          f"{summary['page_read_ms_after']} ms (x{summary['speedup']})")
+    print(f"   - Errores: {summary['ERROR']}, omitidos: {summary['SKIPPED']}")
+    session.close()
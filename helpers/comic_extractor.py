@@ -4,22 +4,32 @@ comic_extractor.py - Extractor de páginas de archivos de cómics
 Soporta CBZ (ZIP), CBR (RAR), y otros formatos comprimidos
 """
 
+import io
+import multiprocessing
 import os
+import re
 import sys
+import time
+import queue
 import tempfile
+import threading
 import zipfile
 import shutil
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 
 # Agregar directorio padre al path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from sqlalchemy import insert
 from sqlalchemy.orm import sessionmaker
 from entidades import engine
 from entidades.comicbook_model import Comicbook
 from entidades.comicbook_detail_model import Comicbook_Detail
+from helpers.image_header import read_image_header
+from helpers.archive_tools import UNRAR_COMMANDS, find_command, iter_rar_member_streams
 
 # Intentar importar dependencias opcionales
 try:
@@ -46,6 +56,13 @@ except ImportError:
     PIL_SUPPORT = False
     print("⚠️ Soporte PIL (thumbnails) no disponible - instalar: pip install Pillow")
 
+try:
+    from helpers.page_hash import compute_dhash, hash_to_hex
+    PAGE_HASH_SUPPORT = True
+except ImportError:
+    PAGE_HASH_SUPPORT = False
+    print("⚠️ Hash perceptual de páginas no disponible - instalar: pip install numpy")
+
 
 class ComicExtractor:
     """Extractor de páginas de archivos de cómics"""
@@ -56,6 +73,12 @@ class ComicExtractor:
     # Extensiones de imagen válidas (en orden de prioridad)
     IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tiff'}
 
+    # Nombres de archivo que suelen marcar la portada (ej: "00_cover.jpg", "fc.jpg")
+    COVER_NAME_PATTERN = re.compile(r'(^|[^a-z])(cover|cvr|portada|fc)([^a-z]|$)', re.IGNORECASE)
+
+    # Relación ancho/alto a partir de la cual una página se considera doble
+    DOUBLE_PAGE_RATIO = 1.2
+
     def __init__(self, progress_callback=None, status_callback=None):
         """
         Inicializar extractor
@@ -209,8 +232,10 @@ class ComicExtractor:
 
         for cmd in rar_commands:
             try:
-                # Verificar si el comando existe
-                subprocess.run([cmd, '--help'], capture_output=True, check=False, timeout=5)
+                # Verificar si el comando existe (cacheado por proceso, sin lanzarlo)
+                if not find_command(cmd):
+                    print(f"⚠️ Comando {cmd} no encontrado")
+                    continue
 
                 print(f"🔧 Intentando extracción RAR con: {cmd}")
 
@@ -293,99 +318,473 @@ class ComicExtractor:
 
     def generate_page_thumbnail(self, image_path: str, thumbnail_path: str, size=(150, 200)) -> bool:
         """Generar thumbnail de una página"""
+        return self._generate_thumbnail_with_hash(image_path, thumbnail_path, size)[0]
+
+    def generate_page_thumbnail_from_bytes(self, image_data: bytes, thumbnail_path: str,
+                                           size=(150, 200)) -> bool:
+        """Generar thumbnail de una página leída en memoria (sin pasar por disco)"""
+        return self._generate_thumbnail_with_hash(io.BytesIO(image_data), thumbnail_path, size)[0]
+
+    def _generate_thumbnail_with_hash(self, image_source, thumbnail_path: str,
+                                      size=(150, 200)) -> Tuple[bool, Optional[str]]:
+        """
+        Generar el thumbnail y el hash perceptual de una página
+
+        Args:
+            image_source: Ruta o stream de la imagen original
+
+        Returns:
+            (thumbnail_ok, phash en hex o None)
+        """
         if not PIL_SUPPORT:
-            return False
+            return False, None
 
         try:
             # Crear directorio si no existe
             os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
 
             # Abrir y redimensionar imagen
-            with Image.open(image_path) as img:
-                # Convertir a RGB si es necesario
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-
-                # Redimensionar manteniendo aspecto
-                img.thumbnail(size, Image.Resampling.LANCZOS)
+            with Image.open(image_source) as img:
+                phash = self._save_thumbnail(img, thumbnail_path, size)
 
-                # Guardar thumbnail
-                img.save(thumbnail_path, 'JPEG', quality=85, optimize=True)
-
-            return True
+            return True, phash
 
         except Exception as e:
             print(f"Error generando thumbnail {thumbnail_path}: {e}")
-            return False
+            return False, None
+
+    def _save_thumbnail(self, img, thumbnail_path: str, size) -> Optional[str]:
+        """Redimensionar y guardar un thumbnail JPEG; devuelve el dHash de la página"""
+        # Las imágenes con paleta se convierten antes: resize sobre 'P' usa NEAREST
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+
+        # thumbnail() llama a draft(): los JPEG se decodifican directamente a
+        # 1/2, 1/4 u 1/8 de resolución en lugar de decodificar la página completa
+        img.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+        # Convertir a RGB si es necesario (después de reducir, es más barato)
+        if img.mode in ('RGBA', 'LA'):
+            img = img.convert('RGB')
+
+        # Guardar thumbnail
+        img.save(thumbnail_path, 'JPEG', quality=85, optimize=True)
+
+        # El dHash se calcula sobre la imagen ya reducida (no cambia el resultado
+        # y evita otra decodificación a resolución completa)
+        if PAGE_HASH_SUPPORT:
+            return hash_to_hex(compute_dhash(img))
+        return None
+
+    def list_image_members(self, comic_file: str) -> List[str]:
+        """Nombres de los archivos de imagen dentro del cómic, en orden de lectura"""
+        comic_format = self.detect_comic_format(comic_file)
+
+        if comic_format == 'zip':
+            with zipfile.ZipFile(comic_file, 'r') as zip_ref:
+                names = [info.filename for info in zip_ref.infolist() if not info.is_dir()]
+        elif comic_format == 'rar' and RAR_SUPPORT:
+            with rarfile.RarFile(comic_file, 'r') as rar_ref:
+                names = [info.filename for info in rar_ref.infolist() if not info.is_dir()]
+        elif comic_format == '7z' and SEVEN_ZIP_SUPPORT:
+            with py7zr.SevenZipFile(comic_file, 'r') as seven_z_ref:
+                names = [info.filename for info in seven_z_ref.list() if not info.is_directory]
+        else:
+            raise ValueError(f"Formato no soportado para lectura directa: {comic_format}")
+
+        return self._sort_image_members(names)
+
+    def _sort_image_members(self, names: List[str]) -> List[str]:
+        """Filtrar imágenes y ordenarlas igual que extract_comic_pages (por nombre de archivo)"""
+        image_names = [name for name in names if Path(name).suffix.lower() in self.IMAGE_EXTENSIONS]
+        image_names.sort(key=lambda name: self._natural_sort_key(Path(name).name))
+        return image_names
+
+    def iter_image_members(self, comic_file: str,
+                           member_names: Optional[List[str]] = None) -> Iterator[Tuple[str, bytes]]:
+        """
+        Leer a memoria las imágenes del cómic, una por una, sin escribir a disco
 
-    def process_comic(self, comic: Comicbook, session) -> bool:
-        """Procesar un cómic completo: extraer páginas y popular BD"""
+        Args:
+            comic_file: Ruta del archivo de cómic
+            member_names: Miembros a leer (por defecto todas las imágenes, en orden de lectura)
+
+        Yields:
+            (nombre_del_miembro, bytes)
+        """
+        comic_format = self.detect_comic_format(comic_file)
+        if member_names is None:
+            member_names = self.list_image_members(comic_file)
+
+        if comic_format == 'zip':
+            with zipfile.ZipFile(comic_file, 'r') as zip_ref:
+                for name in member_names:
+                    yield name, zip_ref.read(name)
+
+        elif comic_format == 'rar' and RAR_SUPPORT:
+            # Un read() por miembro relanza unrar y, en archivos sólidos, descomprime
+            # de nuevo todo lo anterior (O(n²)); se extraen los miembros pedidos con
+            # una sola llamada a un temporal y se leen de ahí de a uno
+            with rarfile.RarFile(comic_file, 'r') as rar_ref, \
+                    tempfile.TemporaryDirectory(prefix="babelcomics_rar_") as temp_dir:
+                wanted = set(member_names)
+                infos = [info for info in rar_ref.infolist() if info.filename in wanted]
+                rar_ref.extractall(temp_dir, members=infos)
+                for name in member_names:
+                    with open(os.path.join(temp_dir, name), 'rb') as f:
+                        yield name, f.read()
+
+        elif comic_format == '7z' and SEVEN_ZIP_SUPPORT:
+            with py7zr.SevenZipFile(comic_file, 'r') as seven_z_ref:
+                if not hasattr(seven_z_ref, 'read'):
+                    raise ValueError("py7zr sin soporte de lectura a memoria")
+                # Una sola pasada: en 7z sólidos leer miembro por miembro
+                # descomprimiría el bloque desde el principio cada vez
+                contents = seven_z_ref.read(targets=list(member_names))
+                for name in member_names:
+                    if name in contents:
+                        yield name, contents.pop(name).read()
+
+        else:
+            raise ValueError(f"Formato no soportado para lectura directa: {comic_format}")
+
+    @staticmethod
+    def get_page_thumbnail_dir(comic_id: int) -> str:
+        """Directorio de thumbnails de páginas de un cómic (comic_pages/<id>)"""
+        from helpers.thumbnail_path import get_thumbnails_base_path
+        return os.path.join(get_thumbnails_base_path(), "comic_pages", str(comic_id))
+
+    @classmethod
+    def has_page_thumbnails(cls, comic_id: int) -> bool:
+        """Si el cómic ya tiene thumbnails de páginas en disco (las filas de solo metadatos no los tienen)"""
+        thumbnail_dir = cls.get_page_thumbnail_dir(comic_id)
         try:
-            self._update_status(f"Procesando: {Path(comic.path).name}")
+            with os.scandir(thumbnail_dir) as entries:
+                return any(entry.is_file() for entry in entries)
+        except OSError:
+            return False
 
-            # Verificar que el archivo existe
-            if not os.path.exists(comic.path):
-                print(f"❌ Archivo no existe: {comic.path}")
-                return False
+    @staticmethod
+    def get_page_thumbnail_filename(page_order: int) -> str:
+        """Nombre del thumbnail de una página (ordenPagina 1-based)"""
+        return f"page_{page_order:03d}.jpg"
 
-            # Verificar si ya tiene páginas en BD
-            existing_pages = session.query(Comicbook_Detail).filter(
-                Comicbook_Detail.comicbook_id == comic.id_comicbook
-            ).count()
+    def generate_missing_page_thumbnails(self, page_files: List[str], thumbnail_dir: str,
+                                         page_orders: Optional[List[int]] = None,
+                                         on_generated=None) -> int:
+        """
+        Generar en una sola pasada los thumbnails que falten en thumbnail_dir
 
-            if existing_pages > 0:
-                print(f"✅ Cómic {comic.id_comicbook} ya tiene {existing_pages} páginas")
-                return True
+        Args:
+            page_files: Rutas de las páginas ya extraídas, en orden de lectura
+            thumbnail_dir: Directorio destino (ej: comic_pages/<id>)
+            page_orders: Órdenes (1-based) a generar, en orden de prioridad.
+                         Si es None se recorren todas las páginas.
+            on_generated: function(page_order, thumbnail_path) - llamada por cada thumbnail creado
+
+        Returns:
+            Cantidad de thumbnails generados
+        """
+        if page_orders is None:
+            page_orders = range(1, len(page_files) + 1)
+
+        generated = 0
+        for page_order in page_orders:
+            if page_order < 1 or page_order > len(page_files):
+                continue
+
+            thumbnail_path = os.path.join(thumbnail_dir, self.get_page_thumbnail_filename(page_order))
+            if os.path.exists(thumbnail_path):
+                continue
 
-            # Crear directorio temporal
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Extraer páginas del archivo
-                page_files = self.extract_comic_pages(comic.path, temp_dir)
+            # Escribir a un archivo parcial y renombrar para que los lectores
+            # concurrentes nunca vean un JPEG a medio escribir
+            partial_path = thumbnail_path + ".part"
+            if self.generate_page_thumbnail(page_files[page_order - 1], partial_path):
+                os.replace(partial_path, thumbnail_path)
+                generated += 1
+                if on_generated:
+                    on_generated(page_order, thumbnail_path)
 
-                if not page_files:
-                    print(f"❌ No se pudieron extraer páginas de: {comic.path}")
-                    return False
+        return generated
 
-                print(f"📄 Extraídas {len(page_files)} páginas de {Path(comic.path).name}")
+    def resolve_page_members(self, comic_file: str, pages: List[Tuple[Optional[str], int]],
+                             member_names: Optional[List[str]] = None) -> dict:
+        """
+        Resolver qué miembro del archivo corresponde a cada página
+
+        Se busca primero por nombre (Comicbook_Detail.nombre_pagina, que guarda
+        solo el nombre base) y si no aparece, por posición (ordenPagina 1-based).
+
+        Args:
+            pages: Lista de (nombre_pagina, ordenPagina)
+            member_names: Miembros ya listados (para no volver a abrir el archivo)
+
+        Returns:
+            Diccionario {ordenPagina: nombre_del_miembro}
+        """
+        if member_names is None:
+            member_names = self.list_image_members(comic_file)
+        by_basename = {}
+        for name in member_names:
+            by_basename.setdefault(Path(name).name, name)
+
+        resolved = {}
+        for page_name, page_order in pages:
+            member = by_basename.get(page_name) if page_name else None
+            if member is None and 1 <= page_order <= len(member_names):
+                member = member_names[page_order - 1]
+            if member is not None:
+                resolved[page_order] = member
+        return resolved
+
+    def read_page(self, comic_file: str, page_name: Optional[str] = None,
+                  page_order: int = 0) -> Optional[bytes]:
+        """
+        Leer a memoria una sola página del cómic sin extraer el resto
+
+        Args:
+            page_name: Comicbook_Detail.nombre_pagina
+            page_order: Comicbook_Detail.ordenPagina (1-based), usado si no hay nombre
 
-                # Crear directorio de thumbnails
-                from helpers.thumbnail_path import get_thumbnails_base_path
-                thumbnail_dir = os.path.join(get_thumbnails_base_path(), "comic_pages", str(comic.id_comicbook))
-                os.makedirs(thumbnail_dir, exist_ok=True)
+        Returns:
+            Bytes de la imagen o None si no se encontró
+        """
+        resolved = self.resolve_page_members(comic_file, [(page_name, page_order)])
+        member = resolved.get(page_order)
+        if member is None:
+            return None
+
+        for _, data in self.iter_image_members(comic_file, [member]):
+            return data
+        return None
+
+    def regenerate_page_thumbnails(self, comic_file: str, pages: List[Tuple[Optional[str], int]],
+                                   thumbnail_dir: str, on_generated=None) -> int:
+        """
+        Generar los thumbnails de varias páginas de un cómic en una sola pasada
+        por el archivo, leyendo únicamente los miembros pedidos
+
+        Args:
+            comic_file: Ruta del archivo de cómic
+            pages: Lista de (nombre_pagina, ordenPagina) a generar
+            thumbnail_dir: Directorio destino (ej: comic_pages/<id>)
+            on_generated: function(page_order, thumbnail_path) - llamada por cada thumbnail creado
+
+        Returns:
+            Cantidad de thumbnails generados
+        """
+        all_members = self.list_image_members(comic_file)
+        resolved = self.resolve_page_members(comic_file, pages, all_members)
+
+        # Un mismo miembro puede corresponder a más de un orden si la BD quedó desfasada
+        orders_by_member = {}
+        for page_order, member in resolved.items():
+            thumbnail_path = os.path.join(thumbnail_dir, self.get_page_thumbnail_filename(page_order))
+            if not os.path.exists(thumbnail_path):
+                orders_by_member.setdefault(member, []).append(page_order)
+
+        if not orders_by_member:
+            return 0
+
+        # Leer en orden del archivo para no retroceder en RAR/7z
+        member_names = [name for name in all_members if name in orders_by_member]
+
+        generated = 0
+        for member, data in self.iter_image_members(comic_file, member_names):
+            for page_order in orders_by_member[member]:
+                thumbnail_path = os.path.join(thumbnail_dir, self.get_page_thumbnail_filename(page_order))
+                partial_path = thumbnail_path + ".part"
+                if self.generate_page_thumbnail_from_bytes(data, partial_path):
+                    os.replace(partial_path, thumbnail_path)
+                    generated += 1
+                    if on_generated:
+                        on_generated(page_order, thumbnail_path)
+
+        return generated
+
+    def read_page_metadata(self, comic_file: str) -> List[dict]:
+        """
+        Leer nombre, dimensiones y formato de cada página sin decodificar píxeles
+
+        Para ZIP solo se lee la lista de miembros y los primeros bytes de cada
+        imagen. Los RAR se recorren con un solo unrar en el orden del archivo
+        (abrir cada miembro lanza un unrar por página y en archivos sólidos
+        descomprime de nuevo todo lo anterior). Los 7z no permiten acceso
+        parcial a un bloque sólido, así que se leen completos (pero tampoco
+        se decodifican).
+
+        Returns:
+            Lista de dicts en orden de lectura con nombre_pagina, ancho, alto,
+            formato_imagen, doble_pagina y tipoPagina
+        """
+        comic_format = self.detect_comic_format(comic_file)
+        member_names = self.list_image_members(comic_file)
+        headers = {}
+
+        if comic_format == 'zip':
+            with zipfile.ZipFile(comic_file, 'r') as zip_ref:
+                for name in member_names:
+                    with zip_ref.open(name) as member:
+                        headers[name] = read_image_header(member)
+
+        elif comic_format == 'rar' and RAR_SUPPORT and find_command(*UNRAR_COMMANDS):
+            with rarfile.RarFile(comic_file, 'r') as rar_ref:
+                members = [(info.filename, info.file_size)
+                           for info in rar_ref.infolist() if not info.is_dir()]
+            wanted = set(member_names)
+            try:
+                for name, member in iter_rar_member_streams(comic_file, members):
+                    if name in wanted:
+                        headers[name] = read_image_header(member)
+            except (ValueError, OSError) as e:
+                print(f"⚠️ Lectura secuencial de {Path(comic_file).name} falló, extrayendo: {e}")
+                headers = {}
+
+        if not headers and comic_format != 'zip':
+            for name, data in self.iter_image_members(comic_file, member_names):
+                headers[name] = read_image_header(io.BytesIO(data))
+
+        return self._build_page_metadata(member_names, headers)
+
+    def _build_page_metadata(self, member_names: List[str], headers: dict) -> List[dict]:
+        """Armar los metadatos de páginas y marcar portada probable y páginas dobles"""
+        # Portada: la primera de las 3 primeras páginas con nombre de portada,
+        # o la primera página si ninguna lo indica
+        cover_index = 0
+        for index, name in enumerate(member_names[:3]):
+            if self.COVER_NAME_PATTERN.search(Path(name).stem):
+                cover_index = index
+                break
+
+        pages = []
+        for index, name in enumerate(member_names):
+            header = headers.get(name)
+            image_format, width, height = header if header else (None, None, None)
+            pages.append({
+                'nombre_pagina': Path(name).name,
+                'ancho': width,
+                'alto': height,
+                'formato_imagen': image_format,
+                'doble_pagina': bool(width and height and width > height * self.DOUBLE_PAGE_RATIO),
+                'tipoPagina': 1 if index == cover_index else 0,  # 1 = COVER
+            })
+        return pages
+
+    def _thumbnail_pages_streaming(self, comic_file: str,
+                                   thumbnail_dir: str) -> Optional[List[Tuple[str, bool, Optional[str]]]]:
+        """
+        Generar thumbnails leyendo cada página del archivo a memoria
 
-                # Procesar cada página
-                for page_order, page_file in enumerate(page_files, 1):
-                    try:
-                        # Generar thumbnail
-                        thumbnail_filename = f"page_{page_order:03d}.jpg"
-                        thumbnail_path = os.path.join(thumbnail_dir, thumbnail_filename)
+        Returns:
+            Lista de (nombre_pagina, thumbnail_ok, phash) en orden, o None si el
+            archivo no se puede leer directamente
+        """
+        try:
+            results = []
+            for page_order, (member_name, data) in enumerate(self.iter_image_members(comic_file), 1):
+                thumbnail_path = os.path.join(thumbnail_dir, self.get_page_thumbnail_filename(page_order))
+                thumbnail_success, phash = self._generate_thumbnail_with_hash(io.BytesIO(data), thumbnail_path)
+                results.append((Path(member_name).name, thumbnail_success, phash))
+            return results
+        except Exception as e:
+            print(f"⚠️ Lectura directa falló para {Path(comic_file).name}: {e}")
+            return None
 
-                        thumbnail_success = self.generate_page_thumbnail(page_file, thumbnail_path)
+    def _thumbnail_pages_extracted(self, comic_file: str,
+                                   thumbnail_dir: str) -> List[Tuple[str, bool, Optional[str]]]:
+        """Generar thumbnails extrayendo el cómic completo a un directorio temporal"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            page_files = self.extract_comic_pages(comic_file, temp_dir)
 
-                        # Crear registro en BD
-                        page_detail = Comicbook_Detail()
-                        page_detail.comicbook_id = comic.id_comicbook
-                        page_detail.indicePagina = page_order - 1  # 0-based
-                        page_detail.ordenPagina = page_order      # 1-based
-                        page_detail.tipoPagina = 1 if page_order == 1 else 0  # Primera página = COVER
-                        page_detail.nombre_pagina = Path(page_file).name
+            results = []
+            for page_order, page_file in enumerate(page_files, 1):
+                thumbnail_path = os.path.join(thumbnail_dir, self.get_page_thumbnail_filename(page_order))
+                thumbnail_success, phash = self._generate_thumbnail_with_hash(page_file, thumbnail_path)
+                results.append((Path(page_file).name, thumbnail_success, phash))
+            return results
 
-                        session.add(page_detail)
+    def process_comic(self, comic: Comicbook, session, streaming: bool = True) -> bool:
+        """
+        Procesar un cómic completo: generar thumbnails de páginas y popular BD
 
-                        if thumbnail_success:
-                            self.pages_extracted += 1
+        Args:
+            comic: Cómic a procesar
+            session: Sesión de SQLAlchemy
+            streaming: Leer cada página a memoria y escribir solo el thumbnail.
+                       Si el archivo no se puede leer así (ej: RAR sin rarfile)
+                       se extrae a un directorio temporal como antes.
+        """
+        try:
+            self._update_status(f"Procesando: {Path(comic.path).name}")
 
-                    except Exception as e:
-                        print(f"Error procesando página {page_order}: {e}")
-                        self.errors += 1
+            # Verificar que el archivo existe
+            if not os.path.exists(comic.path):
+                print(f"❌ Archivo no existe: {comic.path}")
+                return False
 
-                # Commit páginas de este cómic
-                session.commit()
-                self.comics_processed += 1
+            # Verificar si ya tiene páginas en BD (filas de solo metadatos, sin
+            # thumbnails en disco, no cuentan como procesado)
+            existing_rows = session.query(Comicbook_Detail).filter(
+                Comicbook_Detail.comicbook_id == comic.id_comicbook
+            ).all()
 
-                print(f"✅ Procesado cómic {comic.id_comicbook}: {len(page_files)} páginas")
+            if existing_rows and self.has_page_thumbnails(comic.id_comicbook):
+                print(f"✅ Cómic {comic.id_comicbook} ya tiene {len(existing_rows)} páginas")
                 return True
 
+            # Crear directorio de thumbnails
+            thumbnail_dir = self.get_page_thumbnail_dir(comic.id_comicbook)
+            os.makedirs(thumbnail_dir, exist_ok=True)
+
+            pages = None
+            if streaming:
+                pages = self._thumbnail_pages_streaming(comic.path, thumbnail_dir)
+            if not pages:
+                pages = self._thumbnail_pages_extracted(comic.path, thumbnail_dir)
+
+            if not pages:
+                print(f"❌ No se pudieron extraer páginas de: {comic.path}")
+                return False
+
+            print(f"📄 Procesadas {len(pages)} páginas de {Path(comic.path).name}")
+
+            # Filas de solo metadatos del mismo archivo: completarlas en lugar de duplicarlas
+            rows_by_order = {row.ordenPagina: row for row in existing_rows}
+            if existing_rows and len(existing_rows) != len(pages):
+                for row in existing_rows:
+                    session.delete(row)
+                rows_by_order = {}
+
+            # Crear registros en BD
+            for page_order, (page_name, thumbnail_success, phash) in enumerate(pages, 1):
+                existing = rows_by_order.get(page_order)
+                if existing is not None:
+                    existing.phash = phash
+                    if thumbnail_success:
+                        self.pages_extracted += 1
+                    continue
+
+                page_detail = Comicbook_Detail()
+                page_detail.comicbook_id = comic.id_comicbook
+                page_detail.indicePagina = page_order - 1  # 0-based
+                page_detail.ordenPagina = page_order      # 1-based
+                page_detail.tipoPagina = 1 if page_order == 1 else 0  # Primera página = COVER
+                page_detail.nombre_pagina = page_name
+                page_detail.phash = phash
+
+                session.add(page_detail)
+
+                if thumbnail_success:
+                    self.pages_extracted += 1
+
+            # Commit páginas de este cómic
+            session.commit()
+            self.comics_processed += 1
+
+            print(f"✅ Procesado cómic {comic.id_comicbook}: {len(pages)} páginas")
+            return True
+
         except Exception as e:
             print(f"Error procesando cómic {comic.id_comicbook}: {e}")
             session.rollback()
@@ -437,6 +836,238 @@ class ComicExtractor:
             print(f"Error en proceso batch: {e}")
             return {'error': str(e)}
 
+    def process_comics_parallel(self, comic_ids: List[int] = None, limit: int = None,
+                                workers: int = None, streaming: bool = True,
+                                rows_per_transaction: int = 2000,
+                                metadata_only: bool = False) -> dict:
+        """
+        Procesar un lote de cómics en paralelo con un pool de procesos
+
+        Cada proceso lee un cómic y genera sus thumbnails; los resultados
+        pasan por una cola a un único hilo escritor que inserta las filas de
+        Comicbook_Detail en transacciones grandes (SQLite admite un solo
+        escritor, así que no hay contención entre procesos).
+
+        Args:
+            comic_ids: Cómics a procesar (por defecto todos los que no tienen páginas
+                       o a los que les faltan metadatos/thumbnails según el modo)
+            limit: Máximo de cómics a procesar
+            workers: Procesos del pool (por defecto Setup.workers_concurrentes)
+            streaming: Leer páginas a memoria en vez de extraer a temporal
+            rows_per_transaction: Filas de Comicbook_Detail por commit
+            metadata_only: Solo leer lista de miembros y cabeceras (dimensiones,
+                           formato, portada/doble página) sin generar thumbnails
+
+        En modo thumbnails, a los cómics que ya tienen thumbnails pero no hash se
+        les calcula el phash desde los thumbnails (backfill_page_hashes).
+        """
+        try:
+            from helpers.db_migrations import ensure_schema
+            ensure_schema(engine)
+
+            if workers is None:
+                from helpers.config_helper import ConfigHelper
+                workers = ConfigHelper.get_workers_count()
+            workers = max(1, int(workers))
+
+            Session = sessionmaker(bind=engine)
+            session = Session()
+
+            # Cómics sin páginas en BD (se insertan) y cómics con páginas a completar
+            # (se actualizan): en modo metadatos, los que tienen páginas sin
+            # dimensiones; en modo thumbnails, los que solo tienen filas de
+            # metadatos (ningún phash y sin thumbnails en disco, como process_comic)
+            if metadata_only:
+                incomplete = Comicbook.detalles.any(Comicbook_Detail.ancho.is_(None))
+            else:
+                incomplete = Comicbook.detalles.any() & ~Comicbook.detalles.any(Comicbook_Detail.phash.isnot(None))
+
+            # Los que ya tienen thumbnails en disco pero no hash (indexados antes de
+            # que existiera phash) no se vuelven a leer: el hash sale del thumbnail
+            targets = []
+            hash_backfill = []
+            for condition, update in ((~Comicbook.detalles.any(), False), (incomplete, True)):
+                query = session.query(Comicbook.id_comicbook, Comicbook.path).filter(condition)
+                if comic_ids:
+                    query = query.filter(Comicbook.id_comicbook.in_(comic_ids))
+                for comic_id, comic_path in query.all():
+                    if update and not metadata_only and self.has_page_thumbnails(comic_id):
+                        hash_backfill.append(comic_id)
+                        continue
+                    targets.append((comic_id, comic_path, update))
+            if limit:
+                targets = targets[:limit]
+            session.close()
+
+            # Los directorios se resuelven acá: los procesos hijos no
+            # comparten la ruta de thumbnails configurada en memoria
+            jobs = [
+                (comic_id, comic_path, self.get_page_thumbnail_dir(comic_id), streaming, metadata_only)
+                for comic_id, comic_path, _ in targets
+            ]
+            updates = {comic_id for comic_id, _, update in targets if update}
+
+            total_comics = len(jobs)
+            self._update_status(f"Procesando {total_comics} cómics con {workers} procesos...")
+
+            # El pool se crea antes que el hilo escritor y con forkserver: los
+            # procesos se lanzan a medida que hacen falta y hacer fork de un
+            # proceso con hilos vivos (el escritor, GTK) puede heredar locks tomados
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=_process_pool_context())
+
+            results_queue = queue.Queue(maxsize=workers * 4)
+            writer_stats = {'rows': 0, 'transactions': 0, 'error': None}
+            writer = threading.Thread(
+                target=self._page_details_writer,
+                args=(results_queue, rows_per_transaction, writer_stats),
+                name="comic_pages_writer",
+                daemon=True
+            )
+            writer.start()
+
+            try:
+                with pool:
+                    futures = [pool.submit(_thumbnail_comic_job, job) for job in jobs]
+
+                    for done, future in enumerate(as_completed(futures), 1):
+                        try:
+                            comic_id, pages, error = future.result()
+                        except Exception as e:
+                            comic_id, pages, error = None, None, str(e)
+
+                        if pages:
+                            results_queue.put((comic_id, pages, comic_id in updates))
+                            self.comics_processed += 1
+                            self.pages_extracted += sum(1 for page in pages if page.get('thumbnail_ok'))
+                        else:
+                            print(f"❌ No se pudieron procesar páginas del cómic {comic_id}: {error}")
+                            self.errors += 1
+
+                        if self.progress_callback:
+                            self.progress_callback(done / total_comics)
+            finally:
+                # Avisar al escritor que no hay más resultados y esperar el último commit
+                results_queue.put(None)
+                writer.join()
+
+            if writer_stats['error']:
+                raise RuntimeError(writer_stats['error'])
+
+            hashes_backfilled = 0
+            if hash_backfill and PAGE_HASH_SUPPORT and PIL_SUPPORT:
+                from helpers.page_hash import backfill_page_hashes
+                self._update_status(f"Calculando hashes de {len(hash_backfill)} cómics desde sus thumbnails...")
+                session = Session()
+                try:
+                    hashes_backfilled = backfill_page_hashes(session, comic_ids=hash_backfill)
+                finally:
+                    session.close()
+
+            stats = {
+                'comics_processed': self.comics_processed,
+                'pages_extracted': self.pages_extracted,
+                'errors': self.errors,
+                'total_comics': total_comics,
+                'rows_inserted': writer_stats['rows'],
+                'transactions': writer_stats['transactions'],
+                'hashes_backfilled': hashes_backfilled,
+                'workers': workers
+            }
+
+            self._update_status(f"✅ Completado: {self.comics_processed}/{total_comics} cómics")
+
+            return stats
+
+        except Exception as e:
+            print(f"Error en proceso paralelo: {e}")
+            return {'error': str(e)}
+
+    def _page_details_writer(self, results_queue, rows_per_transaction: int, writer_stats: dict):
+        """Hilo escritor único: inserta las páginas de la cola en transacciones grandes"""
+        Session = sessionmaker(bind=engine)
+        session = Session()
+        pending_rows = []
+        finished = False
+
+        def flush():
+            if not pending_rows:
+                return
+            session.execute(insert(Comicbook_Detail), pending_rows)
+            session.commit()
+            writer_stats['rows'] += len(pending_rows)
+            writer_stats['transactions'] += 1
+            pending_rows.clear()
+
+        try:
+            while True:
+                item = results_queue.get()
+                if item is None:
+                    finished = True
+                    break
+
+                comic_id, pages, update = item
+                if update and self._update_page_details(session, comic_id, pages):
+                    continue
+
+                for page_order, page in enumerate(pages, 1):
+                    pending_rows.append({
+                        'comicbook_id': comic_id,
+                        'indicePagina': page_order - 1,  # 0-based
+                        'ordenPagina': page_order,       # 1-based
+                        # Sin metadatos: primera página = COVER
+                        'tipoPagina': page.get('tipoPagina', 1 if page_order == 1 else 0),
+                        'nombre_pagina': page['nombre_pagina'],
+                        'ancho': page.get('ancho'),
+                        'alto': page.get('alto'),
+                        'formato_imagen': page.get('formato_imagen'),
+                        'doble_pagina': page.get('doble_pagina', False),
+                        'phash': page.get('phash')
+                    })
+
+                if len(pending_rows) >= rows_per_transaction:
+                    flush()
+
+            flush()
+
+        except Exception as e:
+            print(f"Error en escritor de páginas: {e}")
+            session.rollback()
+            writer_stats['error'] = str(e)
+            # Vaciar la cola para no bloquear al productor
+            while not finished:
+                finished = results_queue.get() is None
+        finally:
+            session.close()
+
+    def _update_page_details(self, session, comic_id: int, pages: List[dict]) -> bool:
+        """
+        Completar las filas existentes de un cómic con lo que trajo el job
+
+        Solo se escriben los campos que el job conoce (metadatos o phash), sin
+        tocar tipoPagina ni el resto. Si la cantidad de páginas no coincide (el
+        archivo cambió) se borran las filas y devuelve False para reinsertarlas.
+        """
+        rows = session.query(Comicbook_Detail.id_detail, Comicbook_Detail.ordenPagina).filter(
+            Comicbook_Detail.comicbook_id == comic_id
+        ).all()
+        if len(rows) != len(pages):
+            session.query(Comicbook_Detail).filter(
+                Comicbook_Detail.comicbook_id == comic_id
+            ).delete(synchronize_session=False)
+            return False
+
+        fields = ('nombre_pagina', 'ancho', 'alto', 'formato_imagen', 'doble_pagina', 'phash')
+        ids_by_order = {page_order: detail_id for detail_id, page_order in rows}
+        mappings = []
+        for page_order, page in enumerate(pages, 1):
+            mapping = {key: page[key] for key in fields if key in page}
+            mapping['id_detail'] = ids_by_order.get(page_order)
+            if mapping['id_detail'] is not None:
+                mappings.append(mapping)
+        session.bulk_update_mappings(Comicbook_Detail, mappings)
+        session.commit()
+        return True
+
     def _update_status(self, message: str):
         """Actualizar mensaje de estado"""
         print(f"ComicExtractor: {message}")
@@ -444,6 +1075,52 @@ class ComicExtractor:
             self.status_callback(message)
 
 
+def _process_pool_context():
+    """Contexto de multiprocessing sin fork: forkserver si existe (Linux), si no spawn"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def _thumbnail_comic_job(job: Tuple[int, str, str, bool, bool]) -> Tuple[int, Optional[List[dict]], Optional[str]]:
+    """
+    Trabajo de un proceso del pool: generar los thumbnails de un cómic,
+    o solo leer los metadatos de sus páginas si metadata_only
+
+    Returns:
+        (comic_id, [dict por página] o None, error o None)
+    """
+    comic_id, comic_path, thumbnail_dir, streaming, metadata_only = job
+    try:
+        if not os.path.exists(comic_path):
+            return comic_id, None, f"Archivo no existe: {comic_path}"
+
+        extractor = ComicExtractor()
+
+        if metadata_only:
+            pages = extractor.read_page_metadata(comic_path)
+            if not pages:
+                return comic_id, None, "No se encontraron páginas"
+            return comic_id, pages, None
+
+        os.makedirs(thumbnail_dir, exist_ok=True)
+
+        pages = None
+        if streaming:
+            pages = extractor._thumbnail_pages_streaming(comic_path, thumbnail_dir)
+        if not pages:
+            pages = extractor._thumbnail_pages_extracted(comic_path, thumbnail_dir)
+
+        if not pages:
+            return comic_id, None, "No se encontraron páginas"
+        return comic_id, [
+            {'nombre_pagina': page_name, 'thumbnail_ok': thumbnail_ok, 'phash': phash}
+            for page_name, thumbnail_ok, phash in pages
+        ], None
+
+    except Exception as e:
+        return comic_id, None, str(e)
+
+
 # Función de conveniencia
 def extract_comic_pages(comic_id: int) -> bool:
     """Extraer páginas de un cómic específico"""
@@ -451,7 +1128,110 @@ def extract_comic_pages(comic_id: int) -> bool:
     return extractor.process_comics_batch([comic_id])
 
 
+def benchmark_page_thumbnails(comic_files: List[str], streaming: bool = True) -> dict:
+    """
+    Medir páginas/segundo generando thumbnails de páginas (sin tocar la BD)
+
+    Args:
+        comic_files: Archivos de cómic a procesar
+        streaming: True = lectura a memoria, False = extracción a directorio temporal
+    """
+    extractor = ComicExtractor()
+    total_pages = 0
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        for index, comic_file in enumerate(comic_files):
+            thumbnail_dir = os.path.join(output_dir, str(index))
+            os.makedirs(thumbnail_dir, exist_ok=True)
+
+            pages = None
+            if streaming:
+                pages = extractor._thumbnail_pages_streaming(comic_file, thumbnail_dir)
+            if not pages:
+                pages = extractor._thumbnail_pages_extracted(comic_file, thumbnail_dir)
+            total_pages += len(pages)
+        elapsed = time.perf_counter() - start
+
+    return {
+        'comics': len(comic_files),
+        'pages': total_pages,
+        'seconds': round(elapsed, 2),
+        'pages_per_second': round(total_pages / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def benchmark_page_metadata(comic_files: List[str]) -> dict:
+    """Medir páginas/segundo leyendo solo cabeceras (modo --metadata, sin tocar la BD)"""
+    extractor = ComicExtractor()
+    total_pages = 0
+
+    start = time.perf_counter()
+    for comic_file in comic_files:
+        try:
+            total_pages += len(extractor.read_page_metadata(comic_file))
+        except Exception as e:
+            print(f"⚠️ Error leyendo metadatos de {Path(comic_file).name}: {e}")
+    elapsed = time.perf_counter() - start
+
+    return {
+        'comics': len(comic_files),
+        'pages': total_pages,
+        'seconds': round(elapsed, 2),
+        'pages_per_second': round(total_pages / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        # Benchmark: python helpers/comic_extractor.py --benchmark <carpeta_de_comics>
+        library_dir = sys.argv[2]
+        comic_files = sorted(
+            str(path) for path in Path(library_dir).rglob("*")
+            if path.suffix.lower() in ComicExtractor.COMIC_EXTENSIONS
+        )
+
+        # Los CBR se miden aparte: su costo (unrar, archivos sólidos) es otro
+        rar_files = [path for path in comic_files if Path(path).suffix.lower() in ('.cbr', '.rar')]
+        other_files = [path for path in comic_files if Path(path).suffix.lower() not in ('.cbr', '.rar')]
+
+        for label, files in (("CBR", rar_files), ("CBZ/CB7", other_files)):
+            if not files:
+                continue
+            print(f"🧪 Benchmark de páginas sobre {len(files)} cómics {label}")
+
+            extracted = benchmark_page_thumbnails(files, streaming=False)
+            print(f"   - Extracción a temporal: {extracted['pages']} páginas en "
+                  f"{extracted['seconds']}s ({extracted['pages_per_second']} páginas/s)")
+
+            streamed = benchmark_page_thumbnails(files, streaming=True)
+            print(f"   - Lectura a memoria:     {streamed['pages']} páginas en "
+                  f"{streamed['seconds']}s ({streamed['pages_per_second']} páginas/s)")
+
+            if extracted['pages_per_second'] > 0:
+                gain = streamed['pages_per_second'] / extracted['pages_per_second']
+                print(f"   - Mejora: x{gain:.2f}")
+
+            metadata = benchmark_page_metadata(files)
+            print(f"   - Solo metadatos:        {metadata['pages']} páginas en "
+                  f"{metadata['seconds']}s ({metadata['pages_per_second']} páginas/s)")
+            if streamed['seconds'] > 0:
+                print(f"   - Metadatos vs thumbnails: {metadata['seconds'] / streamed['seconds']:.0%} del tiempo")
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] in ("--parallel", "--metadata"):
+        # Indexado de páginas de toda la biblioteca:
+        #   python helpers/comic_extractor.py --parallel [workers]  (con thumbnails)
+        #   python helpers/comic_extractor.py --metadata [workers]  (solo cabeceras)
+        workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        extractor = ComicExtractor()
+        stats = extractor.process_comics_parallel(
+            workers=workers,
+            metadata_only=(sys.argv[1] == "--metadata")
+        )
+        print(f"\n📊 Estadísticas: {stats}")
+        sys.exit(0)
+
     # Test del extractor
     print("🧪 Testing ComicExtractor...")
 
@@ -10,7 +10,7 @@ import re
 import shutil
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -26,6 +26,7 @@ class ComicOrganizationPlan:
     version: int  # Número de versión si es duplicado (0 = original, 1+ = versiones)
     volume_id: int = 0  # ID del volumen al que pertenece (para agrupación)
     volume_name: str = ""  # Nombre del volumen (para display)
+    content_duplicates: List[int] = field(default_factory=list)  # Cómics con las mismas páginas (hash perceptual)
 
 
 class ComicOrganizer:
@@ -471,8 +472,32 @@ class ComicOrganizer:
                 plan.message = f'Duplicado en el volumen, se creará versión {version:02d}'
                 plan.version = version
 
+        # Tercer pase: duplicados por contenido, aunque los nombres no coincidan
+        self._mark_content_duplicates(plans)
+
         return plans
 
+    def _mark_content_duplicates(self, plans: List[ComicOrganizationPlan]) -> None:
+        """
+        Marca los planes cuyo cómic tiene las mismas páginas que otro de la
+        biblioteca, según los hashes perceptuales de Comicbook_Detail.
+
+        No cambia el estado del plan: solo lo informa para que el usuario decida.
+        """
+        try:
+            from helpers.page_hash import find_content_duplicates
+            duplicates = find_content_duplicates(self.session)
+        except Exception as e:
+            print(f"No se pudieron buscar duplicados por contenido: {e}")
+            return
+
+        for plan in plans:
+            others = duplicates.get(plan.comicbook_id)
+            if others:
+                plan.content_duplicates = others
+                ids = ", ".join(f"#{other}" for other in others)
+                plan.message = f"{plan.message} · Mismo contenido que {ids}"
+
     def _create_plan_for_comic(self, comicbook) -> ComicOrganizationPlan:
         """Crea plan de organización para un cómic específico"""
 
@@ -2,8 +2,14 @@
 
 import requests
 import json
-import time
+import sys
 from concurrent.futures import ThreadPoolExecutor, as_completed # ¡Nuevas importaciones!
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from helpers.http_session import request_with_retry
+from helpers.rate_limiter import api_resource
 
 class ComicVineClient:
     """
@@ -28,18 +34,11 @@ class ComicVineClient:
                              "Por favor, reemplaza 'TU_API_KEY' con tu clave real.")
         self.api_key = api_key
         self.headers = {'User-Agent': user_agent}
-        self.last_request_time = 0 
-        self.request_interval = 0.5 
 
-    def _wait_for_rate_limit(self):
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.request_interval:
-            time.sleep(self.request_interval - elapsed)
-        self.last_request_time = time.time()
+    # El ritmo de requests lo controla el limitador compartido (helpers/rate_limiter.py)
+    # dentro de request_with_retry, también para los hilos de get_volumes/get_issues_by_ids
 
     def _make_api_request(self, endpoint, params=None):
-        self._wait_for_rate_limit() 
-
         if params is None:
             params = {}
         
@@ -50,7 +49,8 @@ class ComicVineClient:
         
         try:
             print(f"DEBUG: Solicitando URL: {full_url} con params: {params}")
-            response = requests.get(full_url, params=params, headers=self.headers)
+            response = request_with_retry('GET', full_url, resource=api_resource(endpoint),
+                                          params=params, headers=self.headers)
             print(f"DEBUG: URL COMPLETA FINAL: {response.url}")
             response.raise_for_status() 
             
@@ -97,11 +97,9 @@ class ComicVineClient:
             url += f"&filter=name:{name_filter}"
         url += f"&api_key={self.api_key}&format=json"
 
-        self._wait_for_rate_limit()
-
         try:
             print(f"DEBUG: URL construida manualmente: {url}")
-            response = requests.get(url, headers=self.headers)
+            response = request_with_retry('GET', url, resource='publishers', headers=self.headers)
             response.raise_for_status()
 
             data = response.json()
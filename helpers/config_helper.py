@@ -94,6 +94,38 @@ class ConfigHelper:
             return config.rate_limit_interval
         return 0.5  # Valor por defecto
 
+    @staticmethod
+    def get_clip_threads():
+        """Obtener hilos de CPU para CLIP (0 = automático)"""
+        config = ConfigHelper.get_setup_config()
+        if config:
+            return config.clip_threads
+        return 0  # Valor por defecto
+
+    @staticmethod
+    def get_clip_batch_size():
+        """Obtener imágenes por lote para generar embeddings CLIP"""
+        config = ConfigHelper.get_setup_config()
+        if config:
+            return config.clip_batch_size
+        return 16  # Valor por defecto
+
+    @staticmethod
+    def get_clip_backend():
+        """Obtener backend de inferencia para CLIP (torch, torch_int8, onnx, onnx_int8)"""
+        config = ConfigHelper.get_setup_config()
+        if config and config.clip_backend:
+            return config.clip_backend
+        return 'torch'  # Valor por defecto
+
+    @staticmethod
+    def get_clip_idle_timeout():
+        """Obtener segundos sin uso tras los que se libera CLIP (0 = nunca)"""
+        config = ConfigHelper.get_setup_config()
+        if config and config.clip_idle_timeout is not None:
+            return config.clip_idle_timeout
+        return 300  # Valor por defecto
+
     @staticmethod
     def is_dark_mode():
         """Verificar si está activado el modo oscuro"""
@@ -145,6 +177,7 @@ if __name__ == "__main__":
     print(f"📦 Items per batch: {ConfigHelper.get_items_per_batch()}")
     print(f"⚡ Workers: {ConfigHelper.get_workers_count()}")
     print(f"⏱️  Rate limit: {ConfigHelper.get_rate_limit_interval()}s")
+    print(f"🧠 CLIP: {ConfigHelper.get_clip_threads()} hilos, lotes de {ConfigHelper.get_clip_batch_size()}")
     print(f"🌙 Dark mode: {ConfigHelper.is_dark_mode()}")
     print(f"💾 Cache thumbnails: {ConfigHelper.should_cache_thumbnails()}")
     print(f"🧹 Auto cleanup: {ConfigHelper.should_auto_cleanup()}")
@@ -0,0 +1,695 @@
+#!/usr/bin/env python3
+"""
+cover_ann_index.py - Índice aproximado (IVF) de embeddings de covers en disco
+
+Con cientos de miles de covers, cargar todos los embeddings desde SQLite al
+iniciar cuesta más que la búsqueda en sí. Este índice vive en data/cover_ann
+y se abre con np.load(mmap_mode='r'): solo se leen del disco las listas que
+se consultan.
+
+Estructura (IVF, inverted file):
+    centroids.npy   (nlist, d) float32   centroides k-means (coseno)
+    vectors.npy     (n, d) float16       embeddings ordenados por lista
+    cover_ids.npy   (n,) int64           id_cover de cada fila
+    info_ids.npy    (n,) int64           id_comicbook_info de cada fila
+    offsets.npy     (nlist + 1,) int64   la lista i ocupa offsets[i]:offsets[i+1]
+    delta_vectors.f16 / delta_ids.i64    covers agregadas después del build
+
+Una búsqueda compara el embedding con los centroides, recorre las `nprobe`
+listas más cercanas y el delta, y devuelve el top-k. Las covers nuevas se
+agregan al delta (append a archivo) sin reconstruir; cuando el delta crece
+mucho conviene volver a correr --build.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from helpers.cover_index import normalize_rows
+from helpers.embedding_codec import decode_embedding, decode_embedding_matrix
+
+ANN_DIR = os.path.join('data', 'cover_ann')
+FORMAT_VERSION = 1
+
+# Listas recorridas por búsqueda (más = mejor recall, más lento)
+DEFAULT_NPROBE = 32
+
+# Muestra y vueltas de k-means para entrenar los centroides
+TRAIN_SAMPLE = 50000
+KMEANS_ITERATIONS = 12
+
+# Filas por bloque al leer de SQLite y al recorrer el índice (memoria acotada)
+CHUNK_ROWS = 16384
+
+# Con el delta por encima de esta fracción del índice se sugiere reconstruir
+REBUILD_DELTA_FRACTION = 0.2
+
+_DELTA_VECTORS = 'delta_vectors.f16'
+_DELTA_IDS = 'delta_ids.i64'
+
+
+def choose_nlist(count: int) -> int:
+    """Cantidad de listas para `count` vectores (~4·√n, entre 16 y 4096)"""
+    return int(max(1, min(count, np.clip(round(4 * np.sqrt(count)), 16, 4096))))
+
+
+def _assign(vectors, centroids: np.ndarray) -> np.ndarray:
+    """Lista (centroide más cercano) de cada vector, por bloques"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        chunk = np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32)
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def _spherical_kmeans(sample: np.ndarray, nlist: int, iterations: int, seed: int = 0) -> np.ndarray:
+    """K-means sobre vectores normalizados (centroides también normalizados)"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        order = np.argsort(assignments, kind='stable')
+        lists, starts = np.unique(assignments[order], return_index=True)
+
+        sums = np.zeros_like(centroids)
+        sums[lists] = np.add.reduceat(sample[order], starts, axis=0)
+
+        # Listas vacías: volver a sembrarlas con vectores al azar
+        empty = np.setdiff1d(np.arange(nlist), lists)
+        if len(empty):
+            sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class CoverAnnIndex:
+    """
+    Índice IVF de covers abierto con memory-map
+
+    Uso:
+        index = CoverAnnIndex.build(session)        # una vez (o --build)
+        index = CoverAnnIndex.load()                # en cada inicio
+        index.sync(session)                         # covers nuevas -> delta
+        index.search(embedding, k=3)
+    """
+
+    def __init__(self, path: str, centroids, vectors, cover_ids, info_ids, offsets,
+                 nprobe: int = DEFAULT_NPROBE, model_id: Optional[str] = None):
+        self.path = path
+        self.model_id = model_id
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.vectors = vectors
+        self.cover_ids = cover_ids
+        self.info_ids = info_ids
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.nprobe = nprobe
+        self.dim = self.centroids.shape[1]
+
+        self.delta_vectors = np.zeros((0, self.dim), dtype=np.float16)
+        self.delta_cover_ids = np.zeros(0, dtype=np.int64)
+        self.delta_info_ids = np.zeros(0, dtype=np.int64)
+        # Covers del índice principal que se borraron o se reemplazaron en el delta
+        self._hidden = np.zeros(0, dtype=np.int64)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.cover_ids) - len(self._hidden_in_main()) + len(self.delta_cover_ids)
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def exists(path: str = ANN_DIR) -> bool:
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+    @classmethod
+    def load(cls, path: str = ANN_DIR, nprobe: int = DEFAULT_NPROBE) -> Optional["CoverAnnIndex"]:
+        """Abrir el índice del disco (memory-map), o None si no existe o es de otra versión"""
+        if not cls.exists(path):
+            return None
+
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            print(f"⚠️ Índice de covers en {path} con versión {meta.get('version')}, hay que reconstruirlo")
+            return None
+
+        def load_array(name):
+            return np.load(os.path.join(path, name), mmap_mode='r')
+
+        index = cls(
+            path,
+            np.load(os.path.join(path, 'centroids.npy')),
+            load_array('vectors.npy'),
+            load_array('cover_ids.npy'),
+            load_array('info_ids.npy'),
+            np.load(os.path.join(path, 'offsets.npy')),
+            nprobe=nprobe,
+            model_id=meta.get('model_id')
+        )
+        index._load_delta()
+        return index
+
+    def _load_delta(self):
+        vectors_path = os.path.join(self.path, _DELTA_VECTORS)
+        ids_path = os.path.join(self.path, _DELTA_IDS)
+        if not os.path.exists(vectors_path) or not os.path.exists(ids_path):
+            return
+
+        row_bytes = self.dim * 2
+        # Si un append quedó cortado, usar solo las filas completas de ambos archivos
+        rows = min(os.path.getsize(vectors_path) // row_bytes, os.path.getsize(ids_path) // 16)
+        if rows == 0:
+            return
+
+        vectors = np.memmap(vectors_path, dtype='<f2', mode='r', shape=(rows, self.dim))
+        ids = np.memmap(ids_path, dtype='<i8', mode='r', shape=(rows, 2))
+
+        # Si una cover aparece varias veces en el delta vale la última
+        _, last = np.unique(ids[::-1, 0], return_index=True)
+        keep = np.sort(rows - 1 - last)
+        self.delta_vectors = np.asarray(vectors[keep])
+        self.delta_cover_ids = np.asarray(ids[keep, 0])
+        self.delta_info_ids = np.asarray(ids[keep, 1])
+        self._hidden = np.union1d(self._hidden, self.delta_cover_ids)
+
+    @classmethod
+    def build(cls, session, path: str = ANN_DIR, nlist: Optional[int] = None,
+              progress_callback=None, model_id: Optional[str] = None) -> Optional["CoverAnnIndex"]:
+        """
+        Construir el índice desde la base, con memoria acotada
+
+        Los embeddings se leen de SQLite por bloques a un archivo temporal
+        mapeado, se entrenan los centroides con una muestra y se reescriben
+        ordenados por lista. El índice anterior se reemplaza al terminar.
+        Solo entran las covers del modelo indicado (por defecto el actual).
+
+        Returns:
+            El índice nuevo, o None si no hay covers con embedding
+        """
+        from entidades.comicbook_info_cover_model import ComicbookInfoCover
+        from helpers.embedding_generator import get_active_model_id
+
+        model_id = model_id or get_active_model_id()
+
+        def report(message):
+            print(message)
+            if progress_callback:
+                progress_callback(message)
+
+        total = session.query(ComicbookInfoCover.id_cover).filter(
+            ComicbookInfoCover.embedding.isnot(None),
+            ComicbookInfoCover.embedding_model == model_id
+        ).count()
+        if total == 0:
+            return None
+
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        start_time = time.perf_counter()
+        raw = None
+        cover_ids = np.empty(total, dtype=np.int64)
+        info_ids = np.empty(total, dtype=np.int64)
+        count = 0
+        last_id = 0
+
+        # 1. Volcar los embeddings a un .npy temporal
+        while count < total:
+            rows = session.query(
+                ComicbookInfoCover.id_cover,
+                ComicbookInfoCover.id_comicbook_info,
+                ComicbookInfoCover.embedding
+            ).filter(
+                ComicbookInfoCover.embedding.isnot(None),
+                ComicbookInfoCover.embedding_model == model_id,
+                ComicbookInfoCover.id_cover > last_id
+            ).order_by(ComicbookInfoCover.id_cover).limit(CHUNK_ROWS).all()
+            if not rows:
+                break
+            last_id = rows[-1].id_cover
+
+            matrix, positions = decode_embedding_matrix([row.embedding for row in rows])
+            if not len(positions):
+                continue
+            if raw is None:
+                raw = np.lib.format.open_memmap(
+                    os.path.join(tmp_path, 'raw.npy'), mode='w+', dtype=np.float16,
+                    shape=(total, matrix.shape[1])
+                )
+
+            take = min(len(positions), total - count)
+            raw[count:count + take] = normalize_rows(matrix[:take])
+            for offset, position in enumerate(positions[:take].tolist()):
+                cover_ids[count + offset] = rows[position].id_cover
+                info_ids[count + offset] = rows[position].id_comicbook_info
+            count += take
+            report(f"📥 Embeddings leídos: {count}/{total}")
+
+        if raw is None or count == 0:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return None
+
+        # 2. Entrenar los centroides con una muestra
+        nlist = min(nlist or choose_nlist(count), count)
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, min(count, max(TRAIN_SAMPLE, nlist)), replace=False))
+        sample = normalize_rows(np.asarray(raw[sample_rows], dtype=np.float32))
+        report(f"🧮 Entrenando {nlist} centroides con {len(sample)} covers...")
+        centroids = _spherical_kmeans(sample, nlist, KMEANS_ITERATIONS)
+        del sample
+
+        # 3. Asignar cada cover a su lista y reescribir ordenado por lista
+        assignments = _assign(raw[:count], centroids)
+        order = np.argsort(assignments, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))]).astype(np.int64)
+
+        vectors = np.lib.format.open_memmap(
+            os.path.join(tmp_path, 'vectors.npy'), mode='w+', dtype=np.float16, shape=(count, raw.shape[1])
+        )
+        for start in range(0, count, CHUNK_ROWS):
+            rows_order = order[start:start + CHUNK_ROWS]
+            vectors[start:start + len(rows_order)] = raw[np.sort(rows_order)][np.argsort(np.argsort(rows_order))]
+        vectors.flush()
+        del vectors, raw
+        os.remove(os.path.join(tmp_path, 'raw.npy'))
+
+        np.save(os.path.join(tmp_path, 'centroids.npy'), centroids.astype(np.float32))
+        np.save(os.path.join(tmp_path, 'cover_ids.npy'), cover_ids[:count][order])
+        np.save(os.path.join(tmp_path, 'info_ids.npy'), info_ids[:count][order])
+        np.save(os.path.join(tmp_path, 'offsets.npy'), offsets)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'count': int(count),
+                'dim': int(centroids.shape[1]),
+                'nlist': int(nlist),
+                'model_id': model_id,
+                'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }, f, indent=2)
+
+        # 4. Reemplazar el índice anterior
+        old_path = path + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        report(f"✅ Índice de {count} covers en {nlist} listas ({time.perf_counter() - start_time:.1f}s)")
+        return cls.load(path)
+
+    # ------------------------------------------------------------------
+    # Actualización incremental
+    # ------------------------------------------------------------------
+
+    def append(self, cover_ids: Iterable[int], info_ids: Iterable[int], embeddings) -> None:
+        """
+        Agregar covers al delta (archivo + memoria), sin reconstruir
+
+        Si la cover ya estaba indexada, la versión del delta la reemplaza.
+        """
+        cover_ids = np.asarray(list(cover_ids), dtype=np.int64)
+        info_ids = np.asarray(list(info_ids), dtype=np.int64)
+        if not len(cover_ids):
+            return
+
+        if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+            matrix = embeddings.astype(np.float32, copy=False)
+        else:
+            matrix = np.vstack([
+                decode_embedding(emb) if isinstance(emb, (str, bytes)) else np.asarray(emb, dtype=np.float32)
+                for emb in embeddings
+            ])
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Dimensión de embedding {matrix.shape[1]} distinta a la del índice {self.dim}")
+        matrix = normalize_rows(matrix).astype('<f2')
+
+        with self._lock:
+            _append_delta_files(self.path, cover_ids, info_ids, matrix)
+
+            keep = ~np.isin(self.delta_cover_ids, cover_ids)
+            self.delta_vectors = np.vstack([self.delta_vectors[keep], matrix])
+            self.delta_cover_ids = np.concatenate([self.delta_cover_ids[keep], cover_ids])
+            self.delta_info_ids = np.concatenate([self.delta_info_ids[keep], info_ids])
+            self._hidden = np.union1d(self._hidden, cover_ids)
+
+    def sync(self, session) -> int:
+        """
+        Agregar al delta las covers con embedding que no están indexadas y
+        ocultar las que ya no tienen o cambiaron de modelo (solo lee ids,
+        salvo para las nuevas)
+
+        Una cover del índice principal que quedó oculta (por ejemplo porque se
+        borró su embedding) vuelve como nueva cuando recupera el embedding. Los
+        vectores que cambian sin cambiar de id no se detectan acá: quien
+        reescribe un embedding debe llamar a add_cover_embedding.
+
+        Returns:
+            Cantidad de covers agregadas
+        """
+        from entidades.comicbook_info_cover_model import ComicbookInfoCover
+
+        current = np.fromiter(
+            (row[0] for row in session.query(ComicbookInfoCover.id_cover).filter(
+                ComicbookInfoCover.embedding.isnot(None),
+                ComicbookInfoCover.embedding_model == self.model_id
+            )),
+            dtype=np.int64
+        )
+
+        with self._lock:
+            visible_main = np.setdiff1d(np.asarray(self.cover_ids), self._hidden)
+            indexed = np.union1d(visible_main, self.delta_cover_ids)
+            removed = np.setdiff1d(indexed, current, assume_unique=True)
+            if len(removed):
+                self._hidden = np.union1d(self._hidden, removed)
+                keep = ~np.isin(self.delta_cover_ids, removed)
+                self.delta_vectors = self.delta_vectors[keep]
+                self.delta_cover_ids = self.delta_cover_ids[keep]
+                self.delta_info_ids = self.delta_info_ids[keep]
+            new_ids = np.setdiff1d(current, indexed, assume_unique=True).tolist()
+
+        added = 0
+        # Consultas por tandas para no pasar el límite de variables de SQLite
+        for start in range(0, len(new_ids), 900):
+            rows = session.query(
+                ComicbookInfoCover.id_cover,
+                ComicbookInfoCover.id_comicbook_info,
+                ComicbookInfoCover.embedding
+            ).filter(ComicbookInfoCover.id_cover.in_(new_ids[start:start + 900])).all()
+
+            matrix, positions = decode_embedding_matrix([row.embedding for row in rows])
+            if not len(positions):
+                continue
+            valid = [rows[position] for position in positions.tolist()]
+            self.append([row.id_cover for row in valid], [row.id_comicbook_info for row in valid], matrix)
+            added += len(valid)
+
+        if added:
+            print(f"🧭 Índice de covers: {added} covers nuevas agregadas al delta")
+        if self.needs_rebuild():
+            print(f"⚠️ El delta del índice de covers tiene {len(self.delta_cover_ids)} covers; "
+                  f"conviene reconstruirlo (python helpers/cover_ann_index.py --build)")
+        return added
+
+    def needs_rebuild(self) -> bool:
+        return len(self.delta_cover_ids) > REBUILD_DELTA_FRACTION * max(len(self.cover_ids), 1)
+
+    def _hidden_in_main(self) -> np.ndarray:
+        return self._hidden[np.isin(self._hidden, self.cover_ids)] if len(self._hidden) else self._hidden
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def search(self, embedding, k: int = 3, nprobe: Optional[int] = None) -> List[Tuple[int, int, float]]:
+        """
+        Las k covers más parecidas (aproximado)
+
+        Returns:
+            [(id_cover, id_comicbook_info, similaridad), ...] de mayor a menor
+        """
+        if isinstance(embedding, (str, bytes)):
+            embedding = decode_embedding(embedding)
+        if embedding is None:
+            return []
+        return self.search_many(np.asarray(embedding, dtype=np.float32)[None, :], k, nprobe)[0]
+
+    def search_many(self, embeddings, k: int = 3,
+                    nprobe: Optional[int] = None) -> List[List[Tuple[int, int, float]]]:
+        """Top-k aproximado para cada fila de una matriz (m, d)"""
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        nlist = len(self.centroids)
+        nprobe = max(1, min(nprobe or self.nprobe, nlist))
+
+        with self._lock:
+            delta_vectors = self.delta_vectors
+            delta_cover_ids = self.delta_cover_ids
+            delta_info_ids = self.delta_info_ids
+            hidden = self._hidden
+
+        # Listas más cercanas de todas las consultas con un solo producto
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(nlist), (len(queries), nlist))
+
+        delta_scores = delta_vectors.astype(np.float32) @ queries.T if len(delta_cover_ids) else None
+
+        results = []
+        for row, query in enumerate(queries):
+            # Las listas son rangos contiguos del archivo mapeado
+            ranges = [(self.offsets[l], self.offsets[l + 1]) for l in np.sort(probes[row])]
+            ranges = [(start, end) for start, end in ranges if end > start]
+
+            if ranges:
+                candidates = np.concatenate([self.vectors[start:end] for start, end in ranges])
+                cover_ids = np.concatenate([self.cover_ids[start:end] for start, end in ranges])
+                info_ids = np.concatenate([self.info_ids[start:end] for start, end in ranges])
+                scores = candidates.astype(np.float32) @ query
+                if len(hidden):
+                    visible = ~np.isin(cover_ids, hidden)
+                    cover_ids, info_ids, scores = cover_ids[visible], info_ids[visible], scores[visible]
+            else:
+                cover_ids = info_ids = np.zeros(0, dtype=np.int64)
+                scores = np.zeros(0, dtype=np.float32)
+
+            if delta_scores is not None:
+                cover_ids = np.concatenate([cover_ids, delta_cover_ids])
+                info_ids = np.concatenate([info_ids, delta_info_ids])
+                scores = np.concatenate([scores, delta_scores[:, row]])
+
+            results.append(_top_k(cover_ids, info_ids, scores, k))
+
+        return results
+
+    def best_match(self, embedding) -> Optional[Tuple[int, int, float]]:
+        """La cover más parecida, o None si el índice está vacío"""
+        results = self.search(embedding, k=1)
+        return results[0] if results else None
+
+    def search_subset(self, embedding, cover_ids: Iterable[int], k: int = 3) -> List[Tuple[int, int, float]]:
+        """Top-k exacto solo entre las covers indicadas (sin pasar por las listas)"""
+        if isinstance(embedding, (str, bytes)):
+            embedding = decode_embedding(embedding)
+        if embedding is None:
+            return []
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+        wanted = np.fromiter(cover_ids, dtype=np.int64)
+
+        with self._lock:
+            delta_vectors = self.delta_vectors
+            delta_cover_ids = self.delta_cover_ids
+            delta_info_ids = self.delta_info_ids
+            hidden = self._hidden
+
+        rows = np.flatnonzero(np.isin(self.cover_ids, wanted))
+        if len(hidden):
+            rows = rows[~np.isin(np.asarray(self.cover_ids[rows]), hidden)]
+        delta_rows = np.flatnonzero(np.isin(delta_cover_ids, wanted))
+
+        cover_ids = np.concatenate([np.asarray(self.cover_ids[rows]), delta_cover_ids[delta_rows]])
+        info_ids = np.concatenate([np.asarray(self.info_ids[rows]), delta_info_ids[delta_rows]])
+        scores = np.concatenate([
+            np.asarray(self.vectors[rows], dtype=np.float32) @ query,
+            delta_vectors[delta_rows].astype(np.float32) @ query
+        ])
+        return _top_k(cover_ids, info_ids, scores, k)
+
+    def exact_search_many(self, embeddings, k: int = 3) -> List[List[Tuple[int, int, float]]]:
+        """Top-k exacto recorriendo todo el índice por bloques (referencia para benchmarks)"""
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        best = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+                for _ in queries]
+
+        def merge(cover_ids, info_ids, block_scores):
+            for row in range(len(queries)):
+                ids, infos, scores = best[row]
+                ids = np.concatenate([ids, cover_ids])
+                infos = np.concatenate([infos, info_ids])
+                scores = np.concatenate([scores, block_scores[:, row]])
+                if len(scores) > k:
+                    top = np.argpartition(scores, -k)[-k:]
+                    ids, infos, scores = ids[top], infos[top], scores[top]
+                best[row] = (ids, infos, scores)
+
+        for start in range(0, len(self.cover_ids), CHUNK_ROWS):
+            cover_ids = np.asarray(self.cover_ids[start:start + CHUNK_ROWS])
+            info_ids = np.asarray(self.info_ids[start:start + CHUNK_ROWS])
+            block_scores = np.asarray(self.vectors[start:start + CHUNK_ROWS], dtype=np.float32) @ queries.T
+            if len(self._hidden):
+                visible = ~np.isin(cover_ids, self._hidden)
+                cover_ids, info_ids, block_scores = cover_ids[visible], info_ids[visible], block_scores[visible]
+            merge(cover_ids, info_ids, block_scores)
+
+        if len(self.delta_cover_ids):
+            merge(self.delta_cover_ids, self.delta_info_ids, self.delta_vectors.astype(np.float32) @ queries.T)
+
+        return [_top_k(ids, infos, scores, k) for ids, infos, scores in best]
+
+
+def _top_k(cover_ids: np.ndarray, info_ids: np.ndarray, scores: np.ndarray,
+           k: int) -> List[Tuple[int, int, float]]:
+    if not len(scores):
+        return []
+    k = min(k, len(scores))
+    top = np.argpartition(scores, -k)[-k:]
+    top = top[np.argsort(-scores[top])]
+    return [(int(cover_ids[i]), int(info_ids[i]), float(scores[i])) for i in top]
+
+
+def _append_delta_files(path: str, cover_ids: np.ndarray, info_ids: np.ndarray, matrix: np.ndarray) -> None:
+    with open(os.path.join(path, _DELTA_VECTORS), 'ab') as f:
+        f.write(np.ascontiguousarray(matrix, dtype='<f2').tobytes())
+    with open(os.path.join(path, _DELTA_IDS), 'ab') as f:
+        f.write(np.stack([cover_ids, info_ids], axis=1).astype('<i8').tobytes())
+
+
+# Instancia compartida por el proceso
+_ann_index = None
+_ann_index_lock = threading.Lock()
+
+
+def get_cover_ann_index(session=None, model_id: Optional[str] = None) -> Optional[CoverAnnIndex]:
+    """
+    Obtiene el índice IVF compartido si fue construido (None si no)
+
+    Con sesión, se sincroniza con la base antes de devolverlo. Con model_id,
+    devuelve None si el índice se construyó con embeddings de otro modelo.
+    """
+    global _ann_index
+    with _ann_index_lock:
+        if _ann_index is None and CoverAnnIndex.exists():
+            try:
+                _ann_index = CoverAnnIndex.load()
+            except Exception as e:
+                print(f"⚠️ No se pudo abrir el índice de covers: {e}")
+        index = _ann_index
+
+    if index is not None and model_id is not None and index.model_id != model_id:
+        print(f"⚠️ El índice de covers es de {index.model_id or 'un modelo desconocido'} y el actual es "
+              f"{model_id}; reconstruirlo (python helpers/cover_ann_index.py --build)")
+        return None
+
+    if index is not None and session is not None:
+        index.sync(session)
+    return index
+
+
+def add_cover_embedding(cover_id: int, info_id: int, embedding, model_id: Optional[str] = None) -> None:
+    """
+    Registrar el embedding de una cover recién generada en el índice en disco
+
+    No hace nada si el índice no fue construido o es de otro modelo. Si está
+    abierto en este proceso se actualiza también en memoria.
+    """
+    if not CoverAnnIndex.exists():
+        return
+
+    index = get_cover_ann_index()
+    if index is None or (model_id is not None and index.model_id != model_id):
+        return
+    try:
+        index.append([cover_id], [info_id], [embedding])
+    except Exception as e:
+        print(f"⚠️ No se pudo agregar la cover {cover_id} al índice: {e}")
+
+
+def benchmark_ann(index: CoverAnnIndex, queries: np.ndarray, k: int = 10,
+                  nprobes=(1, 4, 8, 16, 32, 64)) -> List[dict]:
+    """
+    Recall@k y latencia del índice aproximado contra la búsqueda exacta
+
+    Returns:
+        Una fila por configuración: {'nprobe', 'recall', 'mean_ms', 'p95_ms'}
+        (nprobe=None es la búsqueda exacta)
+    """
+    def timed(search):
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            results.append(search(query[None, :])[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return results, np.asarray(latencies)
+
+    exact, latencies = timed(lambda q: index.exact_search_many(q, k))
+    truth = [{cover_id for cover_id, _, _ in result} for result in exact]
+    report = [{'nprobe': None, 'recall': 1.0,
+               'mean_ms': float(latencies.mean()), 'p95_ms': float(np.percentile(latencies, 95))}]
+
+    for nprobe in nprobes:
+        if nprobe > len(index.centroids):
+            break
+        approx, latencies = timed(lambda q: index.search_many(q, k, nprobe))
+        hits = sum(len(expected & {cover_id for cover_id, _, _ in result})
+                   for expected, result in zip(truth, approx))
+        report.append({
+            'nprobe': nprobe,
+            'recall': hits / max(sum(len(expected) for expected in truth), 1),
+            'mean_ms': float(latencies.mean()),
+            'p95_ms': float(np.percentile(latencies, 95)),
+        })
+    return report
+
+
+def _benchmark_queries(session, index: CoverAnnIndex, count: int) -> np.ndarray:
+    """Consultas reales (embeddings de cómics) o, si no hay, covers con ruido"""
+    from entidades.comicbook_model import Comicbook
+
+    rows = [row[0] for row in session.query(Comicbook.embedding).filter(
+        Comicbook.embedding.isnot(None)
+    ).limit(count)]
+    matrix, _ = decode_embedding_matrix(rows)
+    if len(matrix) and matrix.shape[1] == index.dim:
+        return matrix
+
+    rng = np.random.default_rng(1)
+    rows = np.sort(rng.choice(len(index.cover_ids), min(count, len(index.cover_ids)), replace=False))
+    queries = np.asarray(index.vectors[rows], dtype=np.float32)
+    return queries + rng.normal(0, 0.02, queries.shape).astype(np.float32)
+
+
+if __name__ == "__main__":
+    # python helpers/cover_ann_index.py --build | --benchmark [consultas]
+    import sys
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).parent.parent))
+
+    from sqlalchemy.orm import sessionmaker
+    from entidades import engine
+    from helpers.db_migrations import ensure_schema
+
+    ensure_schema(engine)
+    session = sessionmaker(bind=engine)()
+
+    if "--build" in sys.argv:
+        CoverAnnIndex.build(session)
+
+    if "--benchmark" in sys.argv:
+        index = get_cover_ann_index(session)
+        if index is None:
+            print("❌ No hay índice construido (usar --build)")
+            sys.exit(1)
+
+        position = sys.argv.index("--benchmark")
+        count = int(sys.argv[position + 1]) if len(sys.argv) > position + 1 else 200
+        queries = _benchmark_queries(session, index, count)
+
+        print(f"📊 {len(index)} covers, {len(index.centroids)} listas, {len(queries)} consultas, k=10")
+        for row in benchmark_ann(index, queries):
+            label = "exacta" if row['nprobe'] is None else f"nprobe={row['nprobe']}"
+            print(f"   {label:<12} recall@10={row['recall']:.3f}  "
+                  f"media={row['mean_ms']:.2f}ms  p95={row['p95_ms']:.2f}ms")
+
+    session.close()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+cover_duplicates.py - Grupos de cómics físicos con la misma cover (embeddings)
+
+Complementa a helpers/page_hash.py: en lugar de comparar páginas, compara el
+embedding CLIP de la cover de cada cómic, que ya existe para casi toda la
+biblioteca. Sirve para encontrar distintas digitalizaciones o re-ediciones
+del mismo número aunque las páginas no se hayan indexado.
+
+Todos los pares se comparan con productos de matrices por bloques
+(BLOCK_ROWS x BLOCK_ROWS), así que la memoria queda acotada y no hay bucles
+de Python sobre pares; los pares por encima del umbral se agrupan en
+componentes conexas. El resultado se guarda en la tabla
+comicbooks_duplicates (entidades/comicbook_duplicate_model.py).
+
+Las componentes conexas encadenan: números distintos de una serie con la
+misma maqueta, o un TPB que reusa la cover del #1, pueden caer en un mismo
+grupo. Por eso cada grupo guarda la menor similaridad entre sus miembros y
+solo se marca como verificado (y se sugiere liberar espacio) si además
+coinciden las páginas: misma cantidad y, si hay hashes, el mismo contenido
+según helpers/page_hash.py.
+
+Uso:
+    python helpers/cover_duplicates.py [umbral]
+"""
+
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from helpers.cover_index import normalize_rows
+from helpers.embedding_codec import decode_embedding_matrix
+
+# Similaridad coseno mínima entre covers para considerarlas el mismo cómic
+DEFAULT_THRESHOLD = 0.95
+
+# Lado de cada bloque del producto de matrices (BLOCK_ROWS² floats por bloque)
+BLOCK_ROWS = 4096
+
+# Filas leídas de la base por consulta
+CHUNK_ROWS = 5000
+
+# Diferencia máxima de páginas entre dos archivos del mismo cómic (créditos del scanner, etc.)
+PAGE_COUNT_TOLERANCE = 2
+
+
+def load_comic_embeddings(session, model_id: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Embeddings de cover de los cómics fuera de la papelera, del modelo dado
+
+    Returns:
+        (ids int64 (n,), matriz float16 (n, d) normalizada por filas)
+    """
+    from entidades.comicbook_model import Comicbook
+
+    ids, blocks = [], []
+    last_id = 0
+    while True:
+        rows = session.query(Comicbook.id_comicbook, Comicbook.embedding).filter(
+            Comicbook.embedding.isnot(None),
+            Comicbook.embedding_model == model_id,
+            Comicbook.en_papelera == False,
+            Comicbook.id_comicbook > last_id
+        ).order_by(Comicbook.id_comicbook).limit(CHUNK_ROWS).all()
+        if not rows:
+            break
+        last_id = rows[-1].id_comicbook
+
+        matrix, positions = decode_embedding_matrix([row.embedding for row in rows])
+        if len(positions):
+            ids.append(np.asarray([rows[position].id_comicbook for position in positions.tolist()], dtype=np.int64))
+            blocks.append(normalize_rows(matrix).astype(np.float16))
+
+    if not ids:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float16)
+    return np.concatenate(ids), np.vstack(blocks)
+
+
+def find_similar_pairs(matrix: np.ndarray, threshold: float = DEFAULT_THRESHOLD,
+                       block_rows: int = BLOCK_ROWS,
+                       progress_callback=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pares de filas (i < j) con similaridad coseno >= threshold
+
+    Recorre solo el triángulo superior por bloques; cada bloque es un
+    producto float32 de block_rows x block_rows.
+
+    Returns:
+        (filas i, filas j, similaridades)
+    """
+    count = len(matrix)
+    rows_i, rows_j, scores = [], [], []
+    blocks = (count + block_rows - 1) // block_rows
+    done = 0
+
+    for start_i in range(0, count, block_rows):
+        block_i = np.asarray(matrix[start_i:start_i + block_rows], dtype=np.float32)
+        for start_j in range(start_i, count, block_rows):
+            block_j = np.asarray(matrix[start_j:start_j + block_rows], dtype=np.float32)
+            block_scores = block_i @ block_j.T
+            if start_j == start_i:
+                # Sin la diagonal ni el triángulo inferior del bloque
+                block_scores = np.triu(block_scores, k=1)
+
+            ii, jj = np.nonzero(block_scores >= threshold)
+            if len(ii):
+                rows_i.append(ii + start_i)
+                rows_j.append(jj + start_j)
+                scores.append(block_scores[ii, jj])
+
+        done += 1
+        if progress_callback:
+            progress_callback(done, blocks)
+
+    if not rows_i:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+    return np.concatenate(rows_i), np.concatenate(rows_j), np.concatenate(scores)
+
+
+def group_pairs(rows_i: np.ndarray, rows_j: np.ndarray, scores: np.ndarray) -> List[Dict[int, float]]:
+    """
+    Componentes conexas de los pares
+
+    Returns:
+        Lista de grupos {fila: mayor similaridad con otra fila del grupo}
+    """
+    parent = {}
+
+    def find(row):
+        parent.setdefault(row, row)
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    best = defaultdict(float)
+    for i, j, score in zip(rows_i.tolist(), rows_j.tolist(), scores.tolist()):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+        best[i] = max(best[i], score)
+        best[j] = max(best[j], score)
+
+    groups = defaultdict(dict)
+    for row in parent:
+        groups[find(row)][row] = best[row]
+    return list(groups.values())
+
+
+def min_pairwise_similarity(block: np.ndarray, block_rows: int = BLOCK_ROWS) -> float:
+    """Menor similaridad coseno entre dos filas cualesquiera (enlace completo del grupo)"""
+    block = np.asarray(block, dtype=np.float32)
+    minimum = 1.0
+    for start in range(0, len(block), block_rows):
+        scores = block[start:start + block_rows] @ block.T
+        # Ignorar la diagonal (cada fila consigo misma)
+        rows = np.arange(len(scores))
+        scores[rows, rows + start] = 1.0
+        minimum = min(minimum, float(scores.min()))
+    return minimum
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def find_cover_duplicates(session, threshold: float = DEFAULT_THRESHOLD, model_id: Optional[str] = None,
+                          progress_callback=None) -> List[Dict]:
+    """
+    Grupos de cómics con covers casi idénticas
+
+    Returns:
+        Lista de grupos {'comics': {id_comicbook: mayor similaridad dentro del
+        grupo}, 'min_similarity': menor similaridad entre dos miembros},
+        del más grande al más chico
+    """
+    from helpers.embedding_generator import get_active_model_id
+
+    model_id = model_id or get_active_model_id()
+    comic_ids, matrix = load_comic_embeddings(session, model_id)
+    if len(comic_ids) < 2:
+        return []
+
+    rows_i, rows_j, scores = find_similar_pairs(matrix, threshold, progress_callback=progress_callback)
+    groups = []
+    for group in group_pairs(rows_i, rows_j, scores):
+        rows = np.fromiter(group.keys(), dtype=np.int64)
+        groups.append({
+            'comics': {int(comic_ids[row]): round(float(score), 4) for row, score in group.items()},
+            'min_similarity': round(min_pairwise_similarity(matrix[rows]), 4),
+        })
+    groups.sort(key=lambda group: (-len(group['comics']), min(group['comics'])))
+    return groups
+
+
+def verify_duplicate_groups(session, groups: List[Dict], threshold: float = DEFAULT_THRESHOLD) -> int:
+    """
+    Marcar cada grupo con 'verified' si sus miembros son el mismo cómic
+
+    Un grupo se verifica si todos los pares superan el umbral (no solo por
+    encadenamiento), todos los cómics tienen páginas indexadas con cantidades
+    parecidas (PAGE_COUNT_TOLERANCE) y, cuando hay hashes de página para dos
+    o más miembros, helpers/page_hash.py los ubica en un mismo grupo de contenido.
+
+    Returns:
+        Cantidad de grupos verificados
+    """
+    from sqlalchemy import func
+    from entidades.comicbook_detail_model import Comicbook_Detail
+    from helpers.page_hash import PageHashIndex
+
+    comic_ids = [comic_id for group in groups for comic_id in group['comics']]
+    page_counts = {}
+    for start in range(0, len(comic_ids), 900):
+        for comic_id, pages in session.query(
+            Comicbook_Detail.comicbook_id, func.count(Comicbook_Detail.id_detail)
+        ).filter(
+            Comicbook_Detail.comicbook_id.in_(comic_ids[start:start + 900])
+        ).group_by(Comicbook_Detail.comicbook_id):
+            page_counts[comic_id] = pages
+
+    verified = 0
+    for group in groups:
+        members = list(group['comics'])
+        counts = [page_counts.get(comic_id) for comic_id in members]
+        ok = (
+            group['min_similarity'] >= threshold
+            and all(counts)
+            and max(counts) - min(counts) <= PAGE_COUNT_TOLERANCE
+        )
+        if ok:
+            index = PageHashIndex.from_session(session, members)
+            hashed = set(index.pages_per_comic)
+            if len(hashed) >= 2:
+                content_groups = index.find_duplicate_comics()
+                ok = any(hashed <= set(content) for content in content_groups)
+        group['verified'] = bool(ok)
+        verified += group['verified']
+    return verified
+
+
+def save_duplicate_groups(session, groups: List[Dict], threshold: float, model_id: str) -> int:
+    """
+    Reemplazar el contenido de comicbooks_duplicates con los grupos dados
+
+    Returns:
+        Cantidad de filas guardadas
+    """
+    from entidades.comicbook_duplicate_model import ComicbookDuplicate
+    from entidades.comicbook_model import Comicbook
+
+    comic_ids = [comic_id for group in groups for comic_id in group['comics']]
+    paths = {}
+    # Consultas por tandas para no pasar el límite de variables de SQLite
+    for start in range(0, len(comic_ids), 900):
+        for comic_id, path in session.query(Comicbook.id_comicbook, Comicbook.path).filter(
+            Comicbook.id_comicbook.in_(comic_ids[start:start + 900])
+        ):
+            paths[comic_id] = path
+
+    fecha = time.strftime('%Y-%m-%d %H:%M:%S')
+    rows = [
+        {
+            'grupo': number,
+            'id_comicbook': comic_id,
+            'similaridad': similarity,
+            'similaridad_minima': group['min_similarity'],
+            'verificado': group.get('verified', False),
+            'tamanio_bytes': _file_size(paths.get(comic_id, '')),
+            'umbral': threshold,
+            'embedding_model': model_id,
+            'fecha': fecha,
+        }
+        for number, group in enumerate(groups, 1)
+        for comic_id, similarity in group['comics'].items()
+    ]
+
+    session.query(ComicbookDuplicate).delete()
+    session.bulk_insert_mappings(ComicbookDuplicate, rows)
+    session.commit()
+    return len(rows)
+
+
+def run_duplicate_clustering(session, threshold: float = DEFAULT_THRESHOLD,
+                             progress_callback=None) -> List[Dict]:
+    """Buscar los grupos de duplicados, verificarlos por páginas y guardarlos en comicbooks_duplicates"""
+    from helpers.embedding_generator import get_active_model_id
+
+    model_id = get_active_model_id()
+    start = time.perf_counter()
+    groups = find_cover_duplicates(session, threshold, model_id, progress_callback)
+    verified = verify_duplicate_groups(session, groups, threshold)
+    saved = save_duplicate_groups(session, groups, threshold, model_id)
+    print(f"🔁 {len(groups)} grupos de duplicados por cover ({verified} verificados por páginas, "
+          f"{saved} cómics, umbral {threshold}) en {time.perf_counter() - start:.1f}s")
+    return groups
+
+
+def load_duplicate_groups(session) -> List[Dict]:
+    """
+    Grupos guardados por la última corrida, para mostrar en la interfaz
+
+    Dentro de cada grupo el primer cómic es el archivo más grande (el que se
+    sugiere conservar). 'reclaimable_bytes' es lo que se liberaría borrando
+    el resto, y es 0 mientras el grupo no esté verificado por páginas: sin
+    eso solo son covers parecidas, no necesariamente el mismo cómic.
+
+    Returns:
+        [{'grupo', 'comics': [(Comicbook, similaridad, tamanio_bytes), ...],
+          'min_similarity', 'verified', 'reclaimable_bytes'}, ...]
+        primero los verificados, ordenados por espacio a liberar
+    """
+    from entidades.comicbook_duplicate_model import ComicbookDuplicate
+
+    by_group = defaultdict(list)
+    group_info = {}
+    for row in session.query(ComicbookDuplicate).order_by(ComicbookDuplicate.grupo).all():
+        if row.comicbook is not None:
+            by_group[row.grupo].append((row.comicbook, row.similaridad, row.tamanio_bytes))
+            group_info[row.grupo] = (row.similaridad_minima, bool(row.verificado))
+
+    groups = []
+    for number, comics in by_group.items():
+        comics.sort(key=lambda item: -item[2])
+        min_similarity, verified = group_info[number]
+        groups.append({
+            'grupo': number,
+            'comics': comics,
+            'min_similarity': min_similarity,
+            'verified': verified,
+            'reclaimable_bytes': sum(size for _, _, size in comics[1:]) if verified else 0,
+        })
+    groups.sort(key=lambda group: (not group['verified'], -group['reclaimable_bytes']))
+    return groups
+
+
+if __name__ == "__main__":
+    from sqlalchemy.orm import sessionmaker
+    from entidades import engine
+    from helpers.db_migrations import ensure_schema
+
+    ensure_schema(engine)
+    session = sessionmaker(bind=engine)()
+
+    threshold = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_THRESHOLD
+    run_duplicate_clustering(
+        session, threshold,
+        progress_callback=lambda done, total: print(f"   Bloques: {done}/{total}", end="\r")
+    )
+
+    total_reclaimable = 0
+    for group in load_duplicate_groups(session):
+        total_reclaimable += group['reclaimable_bytes']
+        if group['verified']:
+            status = f"{group['reclaimable_bytes'] / 2 ** 20:.0f} MB a liberar"
+        else:
+            status = "sin verificar por páginas, revisar a mano"
+        print(f"\n🔁 Grupo {group['grupo']} (similaridad mínima {group['min_similarity']:.3f}, {status})")
+        for comic, similarity, size in group['comics']:
+            print(f"   {similarity:.3f}  {size / 2 ** 20:8.1f} MB  {comic.path}")
+    print(f"\n💾 Espacio a liberar conservando el archivo más grande de cada grupo verificado: "
+          f"{total_reclaimable / 2 ** 30:.2f} GB")
+    session.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+cover_index.py - Índice en memoria de los embeddings de covers de ComicVine
+
+Todas las covers con embedding se guardan en una sola matriz float32 (n, d)
+normalizada por filas, junto con los arrays de id_cover e id_comicbook_info.
+Buscar las k más parecidas es un producto matriz-vector y un argpartition,
+en lugar de un np.dot por candidata.
+
+El índice se comparte dentro del proceso (get_cover_index) y refresh() solo
+lee de la base las covers que recibieron embedding desde la última vez.
+Solo contiene covers de un modelo (embedding_model): vectores de modelos
+distintos no son comparables.
+"""
+
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from helpers.embedding_codec import decode_embedding, decode_embedding_matrix
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalizar cada fila a norma 1 (las filas nulas quedan en cero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class CoverIndex:
+    """
+    Matriz de embeddings de covers para búsqueda top-k
+
+    Uso:
+        index = get_cover_index(session)
+        for cover_id, info_id, similarity in index.search(embedding, k=3):
+            ...
+    """
+
+    def __init__(self, model_id: Optional[str] = None):
+        self.model_id = model_id
+        self.cover_ids = np.zeros(0, dtype=np.int64)
+        self.info_ids = np.zeros(0, dtype=np.int64)
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.cover_ids)
+
+    @classmethod
+    def from_session(cls, session, model_id: Optional[str] = None) -> "CoverIndex":
+        """Construir el índice con todas las covers que tienen embedding (del modelo dado)"""
+        index = cls(model_id)
+        index.refresh(session)
+        return index
+
+    def refresh(self, session) -> int:
+        """
+        Sincronizar con la base: agregar covers nuevas y quitar las borradas
+
+        Solo se leen los ids de las covers con embedding; los BLOBs se cargan
+        únicamente para las que todavía no están en el índice. Con model_id,
+        las covers de otro modelo cuentan como borradas.
+
+        Returns:
+            Cantidad de covers agregadas
+        """
+        from entidades.comicbook_info_cover_model import ComicbookInfoCover
+
+        query = session.query(ComicbookInfoCover.id_cover).filter(ComicbookInfoCover.embedding.isnot(None))
+        if self.model_id is not None:
+            query = query.filter(ComicbookInfoCover.embedding_model == self.model_id)
+        current_ids = np.fromiter((row[0] for row in query), dtype=np.int64)
+
+        with self._lock:
+            removed = ~np.isin(self.cover_ids, current_ids)
+            if removed.any():
+                self._keep(~removed)
+
+            new_ids = current_ids[~np.isin(current_ids, self.cover_ids)].tolist()
+
+        added = 0
+        # Consultas por tandas para no pasar el límite de variables de SQLite
+        for start in range(0, len(new_ids), 900):
+            rows = session.query(
+                ComicbookInfoCover.id_cover,
+                ComicbookInfoCover.id_comicbook_info,
+                ComicbookInfoCover.embedding
+            ).filter(ComicbookInfoCover.id_cover.in_(new_ids[start:start + 900])).all()
+
+            matrix, positions = decode_embedding_matrix([row.embedding for row in rows])
+            if not len(positions):
+                continue
+            valid = [rows[position] for position in positions.tolist()]
+            self.add([row.id_cover for row in valid], [row.id_comicbook_info for row in valid], matrix)
+            added += len(valid)
+
+        return added
+
+    def add(self, cover_ids: Iterable[int], info_ids: Iterable[int], embeddings) -> None:
+        """
+        Agregar (o reemplazar) covers con sus embeddings ya calculados
+
+        Args:
+            cover_ids: id_cover de cada fila
+            info_ids: id_comicbook_info de cada fila
+            embeddings: matriz (n, d), lista de vectores o valores guardados en la BD
+        """
+        cover_ids = np.asarray(list(cover_ids), dtype=np.int64)
+        info_ids = np.asarray(list(info_ids), dtype=np.int64)
+        if not len(cover_ids):
+            return
+
+        if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+            matrix = embeddings.astype(np.float32, copy=False)
+        else:
+            matrix = np.vstack([
+                decode_embedding(emb) if isinstance(emb, (str, bytes)) else np.asarray(emb, dtype=np.float32)
+                for emb in embeddings
+            ]).astype(np.float32, copy=False)
+        matrix = normalize_rows(matrix)
+
+        with self._lock:
+            if len(self.cover_ids) and matrix.shape[1] != self.matrix.shape[1]:
+                raise ValueError(
+                    f"Dimensión de embedding {matrix.shape[1]} distinta a la del índice {self.matrix.shape[1]}"
+                )
+
+            replaced = np.isin(self.cover_ids, cover_ids)
+            if replaced.any():
+                self._keep(~replaced)
+
+            if len(self.cover_ids):
+                self.cover_ids = np.concatenate([self.cover_ids, cover_ids])
+                self.info_ids = np.concatenate([self.info_ids, info_ids])
+                self.matrix = np.vstack([self.matrix, matrix])
+            else:
+                self.cover_ids, self.info_ids, self.matrix = cover_ids, info_ids, matrix
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self.cover_ids = self.cover_ids[mask]
+        self.info_ids = self.info_ids[mask]
+        self.matrix = self.matrix[mask]
+
+    def search(self, embedding, k: int = 3) -> List[Tuple[int, int, float]]:
+        """
+        Las k covers más parecidas a un embedding
+
+        Returns:
+            [(id_cover, id_comicbook_info, similaridad), ...] de mayor a menor
+        """
+        if isinstance(embedding, (str, bytes)):
+            embedding = decode_embedding(embedding)
+        if embedding is None:
+            return []
+        return self.search_many(np.asarray(embedding, dtype=np.float32)[None, :], k)[0]
+
+    def search_many(self, embeddings, k: int = 3) -> List[List[Tuple[int, int, float]]]:
+        """
+        Top-k para varios embeddings con un solo producto de matrices
+
+        Args:
+            embeddings: matriz (m, d) float32
+
+        Returns:
+            Una lista de resultados por fila, como en search()
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+
+        with self._lock:
+            cover_ids, info_ids, matrix = self.cover_ids, self.info_ids, self.matrix
+
+        if not len(cover_ids) or not len(queries):
+            return [[] for _ in range(len(queries))]
+
+        scores = queries @ matrix.T
+        k = min(k, scores.shape[1])
+
+        # argpartition deja las k mejores al final sin ordenar todo
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [(int(cover_ids[col]), int(info_ids[col]), float(score))
+             for col, score in zip(row_cols, row_scores)]
+            for row_cols, row_scores in zip(top, top_scores)
+        ]
+
+    def search_subset(self, embedding, cover_ids: Iterable[int], k: int = 3) -> List[Tuple[int, int, float]]:
+        """
+        Top-k exacto solo entre las covers indicadas (p. ej. las del número
+        deducido del nombre de archivo)
+        """
+        if isinstance(embedding, (str, bytes)):
+            embedding = decode_embedding(embedding)
+        if embedding is None:
+            return []
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+
+        with self._lock:
+            rows = np.flatnonzero(np.isin(self.cover_ids, np.fromiter(cover_ids, dtype=np.int64)))
+            subset_covers, subset_infos = self.cover_ids[rows], self.info_ids[rows]
+            subset = self.matrix[rows]
+
+        if not len(rows):
+            return []
+        scores = subset @ query
+        k = min(k, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top])]
+        return [(int(subset_covers[i]), int(subset_infos[i]), float(scores[i])) for i in top]
+
+    def best_match(self, embedding) -> Optional[Tuple[int, int, float]]:
+        """La cover más parecida, o None si el índice está vacío"""
+        results = self.search(embedding, k=1)
+        return results[0] if results else None
+
+
+# Instancia compartida por el proceso
+_cover_index = None
+_cover_index_lock = threading.Lock()
+
+
+def get_cover_index(session, model_id: Optional[str] = None):
+    """
+    Obtiene el índice compartido, sincronizado con la base
+
+    Si se construyó el índice aproximado en disco (helpers/cover_ann_index.py
+    --build) se usa ese, que no necesita cargar todos los embeddings; los dos
+    exponen search/search_many/best_match. Solo incluye covers del modelo
+    dado (por defecto el del generador activo o el configurado).
+    """
+    from helpers.cover_ann_index import get_cover_ann_index
+    from helpers.embedding_generator import get_active_model_id
+
+    model_id = model_id or get_active_model_id()
+    ann_index = get_cover_ann_index(session, model_id)
+    if ann_index is not None:
+        return ann_index
+
+    global _cover_index
+    with _cover_index_lock:
+        if _cover_index is None or _cover_index.model_id != model_id:
+            _cover_index = CoverIndex(model_id)
+        index = _cover_index
+    index.refresh(session)
+    return index
+
+
+def release_cover_index():
+    """Libera la matriz de covers de memoria"""
+    global _cover_index
+    with _cover_index_lock:
+        _cover_index = None
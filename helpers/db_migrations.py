@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Migraciones livianas del esquema de la base de datos.
+
+SQLAlchemy create_all() crea tablas nuevas pero no agrega columnas a tablas
+existentes. Acá se registran las columnas agregadas después de la creación
+original para que tanto la aplicación como los scripts de línea de comandos
+las creen si faltan.
+"""
+
+from sqlalchemy import inspect as sa_inspect, text
+
+# tabla -> {columna: definición SQL}
+SCHEMA_COLUMNS = {
+    'setups': {
+        'clip_threads': 'INTEGER NOT NULL DEFAULT 0',
+        'clip_batch_size': 'INTEGER NOT NULL DEFAULT 16',
+        'clip_backend': "VARCHAR NOT NULL DEFAULT 'torch'",
+        'clip_idle_timeout': 'INTEGER NOT NULL DEFAULT 300',
+    },
+    'comicbooks_detail': {
+        'ancho': 'INTEGER',
+        'alto': 'INTEGER',
+        'formato_imagen': 'VARCHAR',
+        'doble_pagina': 'BOOLEAN NOT NULL DEFAULT 0',
+        'phash': 'VARCHAR(16)',
+    },
+    'comicbooks': {
+        'embedding_model': 'VARCHAR',
+    },
+    'comicbooks_info_covers': {
+        'embedding_model': 'VARCHAR',
+    },
+    'comicbooks_duplicates': {
+        'similaridad_minima': 'FLOAT NOT NULL DEFAULT 0.0',
+        'verificado': 'BOOLEAN NOT NULL DEFAULT 0',
+    },
+}
+
+# tabla -> clave primaria, para las tablas con columna embedding
+EMBEDDING_TABLES = {
+    'comicbooks': 'id_comicbook',
+    'comicbooks_info_covers': 'id_cover',
+}
+
+# Modelo con el que se generaron los embeddings anteriores a embedding_model
+# (CLIP ViT-B/32 en PyTorch fp32, el único backend que existía)
+LEGACY_EMBEDDING_MODEL = 'openai/clip-vit-base-patch32:torch'
+
+# índice -> (tabla, columnas), para las búsquedas por serie y número del nombre de archivo
+SCHEMA_INDEXES = {
+    'ix_comicbooks_info_numero_volume': ('comicbooks_info', 'numero, id_volume'),
+    'ix_comicbooks_info_id_volume': ('comicbooks_info', 'id_volume'),
+    'ix_comicbooks_info_covers_info': ('comicbooks_info_covers', 'id_comicbook_info'),
+    'ix_comicbooks_info_covers_embedding_model': ('comicbooks_info_covers', 'embedding_model'),
+    'ix_comicbooks_embedding_model': ('comicbooks', 'embedding_model'),
+}
+
+
+def ensure_column(engine, table_name, column_name, column_ddl):
+    """Agregar una columna si la tabla existe y no la tiene. Devuelve True si la agregó."""
+    inspector = sa_inspect(engine)
+    if table_name not in inspector.get_table_names():
+        return False
+
+    columns = [col['name'] for col in inspector.get_columns(table_name)]
+    if column_name in columns:
+        return False
+
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}"))
+    print(f"Migración: columna {column_name} añadida a {table_name}")
+    return True
+
+
+def ensure_index(engine, index_name, table_name, columns):
+    """Crear un índice si la tabla existe (CREATE INDEX IF NOT EXISTS)"""
+    if table_name not in sa_inspect(engine).get_table_names():
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+
+
+def migrate_json_embeddings(engine, table_name, id_column, batch_size=1000):
+    """
+    Convertir los embeddings guardados como JSON al formato binario
+
+    SQLite guarda el BLOB tal cual en la columna declarada como texto, así
+    que basta con reescribir los valores; typeof() distingue las filas viejas.
+
+    Returns:
+        Cantidad de filas convertidas
+    """
+    if table_name not in sa_inspect(engine).get_table_names():
+        return 0
+
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE {table_name} SET embedding = NULL WHERE embedding = ''"))
+        pending = conn.execute(text(
+            f"SELECT COUNT(*) FROM {table_name} WHERE typeof(embedding) = 'text'"
+        )).scalar()
+    if not pending:
+        return 0
+
+    from helpers.embedding_codec import encode_embedding
+
+    converted = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                f"SELECT {id_column}, embedding FROM {table_name} "
+                f"WHERE typeof(embedding) = 'text' AND {id_column} > :last_id "
+                f"ORDER BY {id_column} LIMIT :limit"
+            ), {'last_id': last_id, 'limit': batch_size}).fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, value in rows:
+                try:
+                    updates.append({'id': row_id, 'embedding': encode_embedding(value)})
+                except (ValueError, TypeError) as e:
+                    print(f"Embedding inválido en {table_name} #{row_id}: {e}")
+                    updates.append({'id': row_id, 'embedding': None})
+
+            conn.execute(text(
+                f"UPDATE {table_name} SET embedding = :embedding WHERE {id_column} = :id"
+            ), updates)
+            converted += len(updates)
+            last_id = rows[-1][0]
+
+    print(f"Migración: {converted} embeddings de {table_name} convertidos a binario")
+    return converted
+
+
+def backfill_embedding_model(engine, table_name, model_id=LEGACY_EMBEDDING_MODEL):
+    """Marcar con el modelo original los embeddings guardados antes de embedding_model"""
+    if table_name not in sa_inspect(engine).get_table_names():
+        return 0
+    with engine.begin() as conn:
+        updated = conn.execute(text(
+            f"UPDATE {table_name} SET embedding_model = :model_id "
+            f"WHERE embedding IS NOT NULL AND embedding_model IS NULL"
+        ), {'model_id': model_id}).rowcount
+    if updated:
+        print(f"Migración: {updated} embeddings de {table_name} marcados como {model_id}")
+    return updated
+
+
+def ensure_schema(engine):
+    """Crear tablas nuevas y columnas e índices agregados que falten"""
+    from entidades import Base
+    # Modelos que ninguna otra entidad importa: registrarlos antes de create_all
+    import entidades.comicbook_duplicate_model  # noqa: F401
+    Base.metadata.create_all(engine)
+
+    for table_name, columns in SCHEMA_COLUMNS.items():
+        for column_name, column_ddl in columns.items():
+            try:
+                ensure_column(engine, table_name, column_name, column_ddl)
+            except Exception as e:
+                print(f"Migración {table_name}.{column_name}: {e}")
+
+    for index_name, (table_name, columns) in SCHEMA_INDEXES.items():
+        try:
+            ensure_index(engine, index_name, table_name, columns)
+        except Exception as e:
+            print(f"Migración índice {index_name}: {e}")
+
+    for table_name, id_column in EMBEDDING_TABLES.items():
+        try:
+            migrate_json_embeddings(engine, table_name, id_column)
+            backfill_embedding_model(engine, table_name)
+        except Exception as e:
+            print(f"Migración de embeddings de {table_name}: {e}")
@@ -184,6 +184,7 @@ class DownloadManager(GObject.GObject):
                         if not comic_info: return False
 
                         changes_made = False
+                        updated_covers = []
                         for item in results_list:
                             url = item.get('url')
                             embedding_json = item.get('embedding')
@@ -198,12 +199,23 @@ class DownloadManager(GObject.GObject):
                                 comic_info.portadas.append(cover_record)
                                 changes_made = True
                             
-                            if embedding_json and cover_record.embedding != embedding_json:
-                                cover_record.embedding = embedding_json
-                                changes_made = True
+                            if embedding_json:
+                                # El modelo se etiqueta aunque el vector no cambie, para
+                                # corregir filas viejas sin modelo o con uno anterior
+                                if (cover_record.embedding != embedding_json
+                                        or cover_record.embedding_model != item.get('embedding_model')):
+                                    cover_record.embedding = embedding_json
+                                    cover_record.embedding_model = item.get('embedding_model')
+                                    updated_covers.append(cover_record)
+                                    changes_made = True
                                     
                         if changes_made:
                             self.main_session.commit()
+                            # Mantener al día el índice de covers en disco (si existe)
+                            from helpers.cover_ann_index import add_cover_embedding
+                            for cover_record in updated_covers:
+                                add_cover_embedding(cover_record.id_cover, cover_record.id_comicbook_info,
+                                                    cover_record.embedding, cover_record.embedding_model)
                     except Exception as e:
                         print(f"Error guardando cover en DM callback: {e}")
                         self.main_session.rollback()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+embedding_cache.py - Caché de embeddings por contenido de imagen
+
+Guarda el embedding ya codificado (helpers/embedding_codec.py) de cada
+imagen bajo la clave (sha256 del archivo, modelo). Volver a sincronizar un
+volumen descarga o encuentra las mismas covers, y con el caché solo se
+corre CLIP sobre las imágenes realmente nuevas.
+
+Vive en una base SQLite aparte (data/embedding_cache.db) con su propia
+conexión, para que los hilos de descarga puedan consultarlo sin tocar la
+sesión de la base principal.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+CACHE_PATH = os.path.join('data', 'embedding_cache.db')
+
+# Bloque de lectura para el hash
+HASH_CHUNK = 1024 * 1024
+
+
+def hash_file(path: str) -> Optional[str]:
+    """sha256 del contenido del archivo, o None si no se puede leer"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+    except OSError as e:
+        print(f"Error leyendo {path} para el caché de embeddings: {e}")
+        return None
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """Caché (content_hash, model_id) -> embedding codificado"""
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    content_hash TEXT NOT NULL,
+                    model_id TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (content_hash, model_id)
+                ) WITHOUT ROWID
+            """)
+            self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, content_hashes: Iterable[str], model_id: str) -> Dict[str, bytes]:
+        """Embeddings guardados para los hashes dados ({hash: bytes}, solo los encontrados)"""
+        content_hashes = list(dict.fromkeys(h for h in content_hashes if h))
+        found = {}
+        with self._lock:
+            # Tandas para no pasar el límite de variables de SQLite
+            for start in range(0, len(content_hashes), 900):
+                chunk = content_hashes[start:start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                for content_hash, embedding in self._conn.execute(
+                    f"SELECT content_hash, embedding FROM embedding_cache "
+                    f"WHERE model_id = ? AND content_hash IN ({placeholders})",
+                    [model_id, *chunk]
+                ):
+                    found[content_hash] = bytes(embedding)
+        self.hits += len(found)
+        self.misses += len(content_hashes) - len(found)
+        return found
+
+    def put_many(self, embeddings: Dict[str, bytes], model_id: str) -> None:
+        """Guardar embeddings ya codificados ({hash: bytes})"""
+        rows = [(content_hash, model_id, embedding, time.time())
+                for content_hash, embedding in embeddings.items() if content_hash and embedding]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (content_hash, model_id, embedding, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+
+# Instancia compartida por el proceso
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+embedding_codec.py - Codificación binaria de embeddings para la base de datos
+
+Los embeddings se guardan como BLOB: un byte de formato seguido de los
+valores crudos en little-endian. Decodificar es un np.frombuffer en lugar
+de un json.loads por fila. Solo un vector float32 suelto se lee sin copia
+(vista sobre el BLOB); float16, el formato por defecto, se convierte a
+float32, y una matriz de muchas filas siempre se arma con una copia.
+
+    byte 0     formato (FORMAT_FLOAT32 / FORMAT_FLOAT16)
+    bytes 1..  valores
+
+Las filas viejas guardadas como texto JSON se siguen leyendo; la migración
+de db_migrations las convierte al formato binario.
+
+No depende de torch/CLIP: las ventanas de clasificación lo usan sin cargar el modelo.
+"""
+
+import json
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_FLOAT32 = 1
+FORMAT_FLOAT16 = 2
+
+_DTYPES = {
+    FORMAT_FLOAT32: np.dtype('<f4'),
+    FORMAT_FLOAT16: np.dtype('<f2'),
+}
+
+# float16 ocupa la mitad (1 KB por vector de 512) y el error en la similitud
+# coseno (~1e-3) no cambia qué cover es la más parecida
+DEFAULT_FORMAT = FORMAT_FLOAT16
+
+
+def encode_embedding(embedding, storage_format: int = DEFAULT_FORMAT) -> Optional[bytes]:
+    """
+    Codificar un embedding (lista, array o JSON) para guardarlo en la BD
+
+    Returns:
+        bytes con el byte de formato y los valores, o None si no hay embedding
+    """
+    if embedding is None:
+        return None
+    if isinstance(embedding, str):
+        if not embedding:
+            return None
+        embedding = json.loads(embedding)
+
+    values = np.asarray(embedding, dtype=_DTYPES[storage_format]).ravel()
+    return bytes([storage_format]) + values.tobytes()
+
+
+def is_encoded(value) -> bool:
+    """True si el valor ya está en formato binario"""
+    return isinstance(value, (bytes, bytearray, memoryview)) and len(value) > 0 and value[0] in _DTYPES
+
+
+def decode_embedding(value) -> Optional[np.ndarray]:
+    """
+    Decodificar un embedding guardado (binario o JSON viejo)
+
+    Returns:
+        numpy array 1D; para float32 es una vista de solo lectura sobre el
+        buffer (sin copia), para float16 se convierte a float32
+    """
+    if value is None or len(value) == 0:
+        return None
+
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32)
+
+    storage_format = value[0]
+    dtype = _DTYPES.get(storage_format)
+    if dtype is None:
+        raise ValueError(f"Formato de embedding desconocido: {storage_format}")
+
+    vector = np.frombuffer(value, dtype=dtype, offset=1)
+    if dtype != np.float32:
+        vector = vector.astype(np.float32)
+    return vector
+
+
+def decode_embedding_matrix(values: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decodificar muchos embeddings a una matriz contigua float32 (n, d)
+
+    Si todos están en el mismo formato binario, se concatenan los buffers y
+    se interpretan con un solo np.frombuffer (una copia; float16 suma la
+    conversión a float32); si no, se decodifica fila por fila.
+
+    Returns:
+        (matriz, posiciones): posiciones son los índices de `values` que
+        tenían un embedding válido, en el orden de las filas de la matriz
+    """
+    positions = [index for index, value in enumerate(values) if value is not None and len(value) > 0]
+    if not positions:
+        return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    first = values[positions[0]]
+    if is_encoded(first):
+        storage_format, size = first[0], len(first)
+        if all(is_encoded(values[i]) and values[i][0] == storage_format and len(values[i]) == size
+               for i in positions):
+            dtype = _DTYPES[storage_format]
+            dimensions = (size - 1) // dtype.itemsize
+            # Quitar el byte de formato de cada fila y leer todo de una vez
+            buffer = b"".join(bytes(values[i])[1:] for i in positions)
+            matrix = np.frombuffer(buffer, dtype=dtype).reshape(len(positions), dimensions)
+            return np.ascontiguousarray(matrix, dtype=np.float32), np.asarray(positions, dtype=np.int64)
+
+    rows: List[np.ndarray] = []
+    valid: List[int] = []
+    for index in positions:
+        try:
+            rows.append(decode_embedding(values[index]))
+            valid.append(index)
+        except Exception as e:
+            print(f"Embedding inválido en la posición {index}: {e}")
+
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    return np.vstack(rows).astype(np.float32, copy=False), np.asarray(valid, dtype=np.int64)
@@ -3,19 +3,157 @@ Generador de embeddings de imágenes usando CLIP.
 Permite comparar similaridad visual entre covers de comics.
 """
 
+import functools
 import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
 import numpy as np
-from PIL import Image
-import torch
-from transformers import CLIPProcessor, CLIPModel
 
+from helpers.embedding_codec import decode_embedding, encode_embedding
+
+# torch, transformers y PIL se importan al cargar el modelo: los clientes del
+# servicio de embeddings (helpers/embedding_service.py) no los necesitan
+
+
+# Imágenes por forward pass en generate_embeddings (si no hay configuración)
+DEFAULT_BATCH_SIZE = 16
+
+# Modelo de HuggingFace (modelo pequeño para velocidad)
+MODEL_NAME = "openai/clip-vit-base-patch32"
+
+
+def get_model_id():
+    """
+    Identificador del modelo + backend configurado, sin cargar el modelo.
+
+    Para marcar embeddings usar el model_id del generador, que refleja el
+    backend efectivamente cargado.
+
+    Los backends cuantizados dan embeddings levemente distintos, así que
+    forman parte del id (ej: 'openai/clip-vit-base-patch32:torch').
+    """
+    backend = 'torch'
+    try:
+        from helpers.config_helper import ConfigHelper
+        backend = ConfigHelper.get_clip_backend()
+    except Exception:
+        pass
+    return f"{MODEL_NAME}:{backend}"
+
+
+class EmbeddingUtils:
+    """Operaciones sobre embeddings que no necesitan el modelo CLIP."""
+
+    def embedding_to_json(self, embedding):
+        """Convierte un embedding a string JSON (formato viejo, usar encode_embedding para la DB)."""
+        if embedding is None:
+            return None
+        return json.dumps(embedding)
+
+    def json_to_embedding(self, json_str):
+        """Convierte un embedding guardado (binario o JSON) a numpy array."""
+        return decode_embedding(json_str)
+
+    def encode_embedding(self, embedding):
+        """Convierte un embedding al formato binario para guardar en DB."""
+        return encode_embedding(embedding)
+
+    def decode_embedding(self, value):
+        """Convierte un embedding guardado en DB a numpy array float32."""
+        return decode_embedding(value)
+
+    def calculate_similarity(self, embedding1, embedding2):
+        """
+        Calcula similaridad coseno entre dos embeddings.
+
+        Args:
+            embedding1, embedding2: Pueden ser listas, numpy arrays, JSON strings o bytes de la DB
+
+        Returns:
+            Float entre 0 y 1 (1 = idénticos, 0 = completamente diferentes)
+        """
+        # Convertir a numpy arrays si es necesario
+        if isinstance(embedding1, (str, bytes)):
+            embedding1 = decode_embedding(embedding1)
+        if isinstance(embedding2, (str, bytes)):
+            embedding2 = decode_embedding(embedding2)
+
+        if embedding1 is None or embedding2 is None:
+            return 0.0
+
+        emb1 = np.array(embedding1)
+        emb2 = np.array(embedding2)
+
+        # Cosine similarity (ya están normalizados, así que es solo el producto punto)
+        similarity = np.dot(emb1, emb2)
 
-class EmbeddingGenerator:
+        return float(similarity)
+
+    def find_most_similar(self, query_embedding, candidate_embeddings, model_id=None):
+        """
+        Encuentra el embedding más similar de una lista de candidatos.
+
+        Args:
+            query_embedding: Embedding a buscar (lista, array o JSON)
+            candidate_embeddings: Lista de tuplas (id, embedding) o (id, embedding, embedding_model)
+            model_id: Modelo del query; si se indica, se descartan los candidatos de otro modelo
+
+        Returns:
+            Tupla (id, similarity_score) del más similar
+            None si no hay candidatos
+        """
+        if model_id is not None:
+            candidate_embeddings = [
+                candidate for candidate in candidate_embeddings
+                if len(candidate) < 3 or candidate[2] == model_id
+            ]
+        if not candidate_embeddings:
+            return None
+
+        # Convertir query a numpy
+        if isinstance(query_embedding, (str, bytes)):
+            query_embedding = decode_embedding(query_embedding)
+
+        if query_embedding is None:
+            return None
+
+        # Una sola multiplicación contra la matriz de candidatos
+        # (para búsquedas repetidas usar helpers.cover_index.CoverIndex)
+        candidate_ids = [candidate[0] for candidate in candidate_embeddings]
+        matrix = np.vstack([
+            decode_embedding(emb) if isinstance(emb, (str, bytes)) else np.asarray(emb, dtype=np.float32)
+            for emb in (candidate[1] for candidate in candidate_embeddings)
+        ])
+        similarities = matrix @ np.asarray(query_embedding, dtype=np.float32)
+
+        best = int(np.argmax(similarities))
+        return (candidate_ids[best], float(similarities[best]))
+
+
+def _uses_model(method):
+    """Carga el modelo si hace falta y lo marca en uso (no se libera por inactividad) durante la llamada."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with model_lifecycle.in_use():
+            self._ensure_loaded()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class EmbeddingGenerator(EmbeddingUtils):
     """Genera embeddings de imágenes usando el modelo CLIP de OpenAI."""
 
     _instance = None
     _model = None
     _processor = None
+    _backend = None
+    _model_id = None  # Id del último backend cargado (se conserva al liberar el modelo)
+    batch_size = DEFAULT_BATCH_SIZE
+    last_timings = {}  # ms por imagen y etapa de la última llamada a generate_embeddings
 
     def __new__(cls):
         """Singleton para no cargar el modelo múltiples veces."""
@@ -25,59 +163,115 @@ class EmbeddingGenerator:
 
     def __init__(self):
         """Inicializa el modelo CLIP si no está cargado."""
+        self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        """Cargar el modelo si no está en memoria (por ejemplo tras liberarlo por inactividad)."""
         if self._model is None:
-            print("Cargando modelo CLIP...")
-            # Usar modelo pequeño para velocidad
-            model_name = "openai/clip-vit-base-patch32"
-            
+            with model_lifecycle.lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._load()
+                    model_lifecycle.record_load(time.perf_counter() - start)
+
+    def _load(self):
+        """Cargar modelo y processor de CLIP y aplicar la configuración de rendimiento."""
+        import torch
+        from transformers import CLIPProcessor, CLIPModel
+
+        print("Cargando modelo CLIP...")
+        model_name = MODEL_NAME
+        
+        try:
+            # Intentar cargar localmente primero y sin convertir a safetensors (evita timeouts)
+            print("   Intentando cargar CLIP desde caché local...")
+            self._model = CLIPModel.from_pretrained(model_name, local_files_only=True, use_safetensors=False)
+            self._processor = CLIPProcessor.from_pretrained(model_name, local_files_only=True, use_safetensors=False)
+            print("   ✓ Cargado desde caché local")
+        except Exception as e:
+            print(f"   ⚠️ No encontrado en caché local o error: {e}")
+            print("   Descargando modelo (esto puede tardar)...")
+            # Fallback a descarga normal pero evitando la conversión automática si es posible
+            self._model = CLIPModel.from_pretrained(model_name, use_safetensors=False)
+            self._processor = CLIPProcessor.from_pretrained(model_name, use_safetensors=False)
+
+        # Verificar compatibilidad de GPU con versión de PyTorch
+        # PyTorch 2.x con CUDA 11.8+: soporta CUDA capability >= 3.7
+        # Esto incluye GTX 1070 (6.1), RTX 2000/3000/4000, etc.
+        use_gpu = False
+        if torch.cuda.is_available():
             try:
-                # Intentar cargar localmente primero y sin convertir a safetensors (evita timeouts)
-                print("   Intentando cargar CLIP desde caché local...")
-                self._model = CLIPModel.from_pretrained(model_name, local_files_only=True, use_safetensors=False)
-                self._processor = CLIPProcessor.from_pretrained(model_name, local_files_only=True, use_safetensors=False)
-                print("   ✓ Cargado desde caché local")
+                capability = torch.cuda.get_device_capability(0)
+                major, minor = capability
+                cuda_version = float(f"{major}.{minor}")
+
+                # Verificar versión de PyTorch
+                torch_version = torch.__version__.split('+')[0]
+                torch_major = int(torch_version.split('.')[0])
+
+                # PyTorch 2.x con CUDA 11.8+ funciona bien con capability >= 3.7
+                # La GTX 1070 (6.1) funciona perfectamente
+                if cuda_version >= 3.7:
+                    use_gpu = True
+                    gpu_name = torch.cuda.get_device_name(0)
+                    print(f"GPU detectada: {gpu_name} (CUDA capability {cuda_version}, PyTorch {torch_version})")
+                else:
+                    print(f"⚠️ GPU con CUDA capability {cuda_version} muy antigua")
+                    print("   Usando CPU")
             except Exception as e:
-                print(f"   ⚠️ No encontrado en caché local o error: {e}")
-                print("   Descargando modelo (esto puede tardar)...")
-                # Fallback a descarga normal pero evitando la conversión automática si es posible
-                self._model = CLIPModel.from_pretrained(model_name, use_safetensors=False)
-                self._processor = CLIPProcessor.from_pretrained(model_name, use_safetensors=False)
-
-            # Verificar compatibilidad de GPU con versión de PyTorch
-            # PyTorch 2.x con CUDA 11.8+: soporta CUDA capability >= 3.7
-            # Esto incluye GTX 1070 (6.1), RTX 2000/3000/4000, etc.
-            use_gpu = False
-            if torch.cuda.is_available():
-                try:
-                    capability = torch.cuda.get_device_capability(0)
-                    major, minor = capability
-                    cuda_version = float(f"{major}.{minor}")
-
-                    # Verificar versión de PyTorch
-                    torch_version = torch.__version__.split('+')[0]
-                    torch_major = int(torch_version.split('.')[0])
-
-                    # PyTorch 2.x con CUDA 11.8+ funciona bien con capability >= 3.7
-                    # La GTX 1070 (6.1) funciona perfectamente
-                    if cuda_version >= 3.7:
-                        use_gpu = True
-                        gpu_name = torch.cuda.get_device_name(0)
-                        print(f"GPU detectada: {gpu_name} (CUDA capability {cuda_version}, PyTorch {torch_version})")
-                    else:
-                        print(f"⚠️ GPU con CUDA capability {cuda_version} muy antigua")
-                        print("   Usando CPU")
-                except Exception as e:
-                    print(f"⚠️ Error verificando GPU: {e}")
+                print(f"⚠️ Error verificando GPU: {e}")
 
-            self.device = "cuda" if use_gpu else "cpu"
-            self._model.to(self.device)
-            self._model.eval()
+        self.device = "cuda" if use_gpu else "cpu"
+        self._model.to(self.device)
+        self._model.eval()
 
-            if self.device == "cuda":
-                print(f"✓ Modelo CLIP cargado en GPU")
-            else:
-                print(f"✓ Modelo CLIP cargado en CPU")
+        if self.device == "cuda":
+            print(f"✓ Modelo CLIP cargado en GPU")
+        else:
+            print(f"✓ Modelo CLIP cargado en CPU")
+
+        self._load_performance_config()
 
+    def _load_performance_config(self):
+        """Aplicar hilos de CPU y tamaño de lote configurados en Setup"""
+        threads = 0
+        backend = 'torch'
+        try:
+            from helpers.config_helper import ConfigHelper
+            threads = ConfigHelper.get_clip_threads()
+            self.batch_size = max(1, ConfigHelper.get_clip_batch_size())
+            backend = ConfigHelper.get_clip_backend()
+        except Exception as e:
+            print(f"⚠️ No se pudo leer la configuración de CLIP: {e}")
+        self.configure_threads(threads)
+        self.configure_backend(backend, threads)
+
+    def configure_backend(self, name, num_threads=0):
+        """
+        Elegir el backend de inferencia (ver helpers/clip_backends.py).
+
+        Args:
+            name: 'torch', 'torch_int8', 'onnx' u 'onnx_int8'
+            num_threads: Hilos para ONNX Runtime (0 = automático)
+        """
+        from helpers.clip_backends import create_backend
+        self._backend = create_backend(name, self._model, self.device, num_threads)
+        EmbeddingGenerator._model_id = f"{MODEL_NAME}:{self._backend.name}"
+        print(f"   Backend de inferencia CLIP: {self._backend.name}")
+
+    def configure_threads(self, num_threads):
+        """
+        Fijar los hilos que usa PyTorch en CPU (torch.set_num_threads).
+
+        Args:
+            num_threads: Cantidad de hilos; 0 o None deja el valor por defecto de PyTorch
+        """
+        import torch
+        if num_threads and num_threads > 0:
+            torch.set_num_threads(int(num_threads))
+        print(f"   Hilos de CPU para CLIP: {torch.get_num_threads()}")
+
+    @_uses_model
     def generate_embedding(self, image_path):
         """
         Genera un embedding vectorial para una imagen.
@@ -89,136 +283,420 @@ class EmbeddingGenerator:
             Lista de floats representando el embedding (512 dimensiones)
             None si hay error
         """
+        from PIL import Image
         try:
             with Image.open(image_path) as raw:
                 image = raw.convert("RGB")
 
-            inputs = self._processor(images=image, return_tensors="pt")
-            del image
+            return self._embed_images([image])[0].tolist()
 
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        except Exception as e:
+            print(f"Error generando embedding para {image_path}: {e}")
+            return None
 
-            with torch.no_grad():
-                image_features = self._model.get_image_features(**inputs)
+    @_uses_model
+    def generate_embeddings(self, image_paths, batch_size=None):
+        """
+        Genera embeddings para varias imágenes, agrupando el preprocesado y
+        el forward pass del modelo en lotes.
 
-            del inputs
+        Args:
+            image_paths: Lista de rutas a imágenes
+            batch_size: Imágenes por forward pass (por defecto el configurado)
 
-            # Versiones recientes de transformers pueden devolver un objeto en vez de tensor
-            if not isinstance(image_features, torch.Tensor):
-                image_features = image_features.pooler_output if hasattr(image_features, 'pooler_output') else image_features.last_hidden_state[:, 0, :]
+        Returns:
+            Lista con un embedding (lista de floats) por ruta, en el mismo orden;
+            None en las posiciones que no se pudieron procesar
+        """
+        from helpers.image_prefetch import PrefetchLoader
+        batch_size = max(1, batch_size or self.batch_size)
+        results = [None] * len(image_paths)
+
+        # Decodificación y preprocesado en hilos, adelantados al modelo
+        loader = PrefetchLoader(image_paths, batch_size, self._preprocess_image)
+        for indices, pixel_values in loader:
+            start = time.perf_counter()
+            try:
+                features = self._embed_pixels(pixel_values)
+                for index, embedding in zip(indices, features):
+                    results[index] = embedding.tolist()
+            except Exception as e:
+                # Si falla el lote (ej: memoria de GPU) se reintenta imagen por imagen
+                print(f"Error en lote de embeddings, reintentando de a una: {e}")
+                for index, pixels in zip(indices, pixel_values):
+                    try:
+                        results[index] = self._embed_pixels(pixels[None])[0].tolist()
+                    except Exception as e:
+                        print(f"Error generando embedding para {image_paths[index]}: {e}")
+            loader.timer.add('inference', time.perf_counter() - start)
+            loader.timer.images += len(indices)
+
+        self.last_timings = loader.timer.summary()
+        if len(image_paths) > batch_size:
+            print(f"   ⏱️  Embeddings de {len(image_paths)} imágenes: {loader.timer.format()}")
+        return results
+
+    def _preprocess_image(self, image):
+        """Imagen PIL RGB -> pixel_values (3, 224, 224) float32"""
+        return self._processor(images=image, return_tensors="np")['pixel_values'][0]
+
+    def _embed_pixels(self, pixel_values):
+        """
+        Forward pass sobre pixel_values ya preprocesados.
 
-            # Normalizar el embedding (importante para cosine similarity)
-            image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+        Returns:
+            numpy array float32 (n, 512) con los embeddings normalizados
+        """
+        if self._backend is None:
+            from helpers.clip_backends import TorchBackend
+            self._backend = TorchBackend(self._model, self.device)
+            EmbeddingGenerator._model_id = f"{MODEL_NAME}:{self._backend.name}"
+        embeddings = self._backend.image_features(pixel_values)
 
-            embedding = image_features.cpu().numpy()[0].tolist()
-            del image_features
+        # Normalizar el embedding (importante para cosine similarity)
+        return (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)).astype(np.float32)
 
-            return embedding
+    def _embed_images(self, images):
+        """
+        Forward pass de CLIP sobre una lista de imágenes PIL ya en RGB.
 
-        except Exception as e:
-            print(f"Error generando embedding para {image_path}: {e}")
-            return None
+        Returns:
+            numpy array float32 (n, 512) con los embeddings normalizados
+        """
+        pixel_values = self._processor(images=images, return_tensors="np")['pixel_values']
+        return self._embed_pixels(pixel_values)
 
-    def unload(self):
-        """Libera el modelo CLIP de memoria."""
+    def unload(self, reason=""):
+        """Libera el modelo CLIP de memoria (se vuelve a cargar solo si se usa de nuevo)."""
         import gc
-        EmbeddingGenerator._model = None
-        EmbeddingGenerator._processor = None
-        EmbeddingGenerator._instance = None
-        self._model = None
-        self._processor = None
-        gc.collect()
-        print("Modelo CLIP liberado de memoria")
-
-    def embedding_to_json(self, embedding):
-        """Convierte un embedding a string JSON para guardar en DB."""
-        if embedding is None:
-            return None
-        return json.dumps(embedding)
-
-    def json_to_embedding(self, json_str):
-        """Convierte un string JSON a numpy array."""
-        if not json_str:
-            return None
-        return np.array(json.loads(json_str))
+        with model_lifecycle.lock:
+            if self._model is None:
+                return
+            start = time.perf_counter()
+            EmbeddingGenerator._model = None
+            EmbeddingGenerator._processor = None
+            EmbeddingGenerator._backend = None
+            self._model = None
+            self._processor = None
+            self._backend = None
+            gc.collect()
+            if 'torch' in sys.modules and sys.modules['torch'].cuda.is_available():
+                sys.modules['torch'].cuda.empty_cache()
+            _trim_heap()
+            model_lifecycle.record_unload(time.perf_counter() - start, reason)
+
+    @property
+    def is_loaded(self):
+        return self._model is not None
+
+    @property
+    def model_id(self):
+        """
+        Id del modelo + backend que realmente genera los embeddings.
 
-    def calculate_similarity(self, embedding1, embedding2):
+        Puede diferir de get_model_id(): create_backend vuelve a torch si el
+        backend configurado no está disponible (o con GPU). Es el valor que se
+        guarda en embedding_model; sin modelo cargado todavía, el configurado.
         """
-        Calcula similaridad coseno entre dos embeddings.
+        return self._model_id or get_model_id()
 
-        Args:
-            embedding1, embedding2: Pueden ser listas, numpy arrays o JSON strings
+    def resolve_model_id(self):
+        """model_id con el modelo cargado (para decidir qué filas están desactualizadas)."""
+        self._ensure_loaded()
+        return self.model_id
 
-        Returns:
-            Float entre 0 y 1 (1 = idénticos, 0 = completamente diferentes)
-        """
-        # Convertir a numpy arrays si es necesario
-        if isinstance(embedding1, str):
-            embedding1 = self.json_to_embedding(embedding1)
-        if isinstance(embedding2, str):
-            embedding2 = self.json_to_embedding(embedding2)
 
-        if embedding1 is None or embedding2 is None:
-            return 0.0
+# Segundos sin uso tras los que se libera el modelo (si no hay configuración)
+DEFAULT_IDLE_TIMEOUT = 300
 
-        emb1 = np.array(embedding1)
-        emb2 = np.array(embedding2)
 
-        # Cosine similarity (ya están normalizados, así que es solo el producto punto)
-        similarity = np.dot(emb1, emb2)
+def _rss_mb():
+    """Memoria residente actual del proceso en MB (None si no se puede leer)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
 
-        return float(similarity)
 
-    def find_most_similar(self, query_embedding, candidate_embeddings):
-        """
-        Encuentra el embedding más similar de una lista de candidatos.
+def _peak_rss_mb():
+    """Pico de memoria residente del proceso en MB (None si no se puede leer)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB, macOS en bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
 
-        Args:
-            query_embedding: Embedding a buscar (lista, array o JSON)
-            candidate_embeddings: Lista de tuplas (id, embedding)
 
-        Returns:
-            Tupla (id, similarity_score) del más similar
-            None si no hay candidatos
-        """
-        if not candidate_embeddings:
-            return None
+def _trim_heap():
+    """Devolver al sistema la memoria libre del heap (glibc), para que el RSS baje de verdad"""
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
 
-        # Convertir query a numpy
-        if isinstance(query_embedding, str):
-            query_embedding = self.json_to_embedding(query_embedding)
 
-        if query_embedding is None:
-            return None
+class ModelLifecycle:
+    """
+    Ciclo de vida del modelo CLIP de este proceso.
 
-        query = np.array(query_embedding)
+    - warm_up(): carga en segundo plano al abrir una ventana que va a generar embeddings
+    - in_use(): mientras dure, el modelo no se libera
+    - tras idle_timeout segundos sin uso se libera (Setup.clip_idle_timeout, 0 = nunca)
+    - stats(): tiempos de carga/liberación y memoria (RSS actual y pico)
+    """
 
-        best_match = None
-        best_similarity = -1
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.idle_timeout = None  # None = leer de la configuración
+        self.active = 0
+        self.last_used = time.time()
+        self.loads = 0
+        self.unloads = 0
+        self.last_load_seconds = None
+        self.last_unload_seconds = None
+        self._timer = None
+        self._unload_requested = False
+        self._warm_up_thread = None
+
+    def get_idle_timeout(self):
+        if self.idle_timeout is None:
+            try:
+                from helpers.config_helper import ConfigHelper
+                self.idle_timeout = ConfigHelper.get_clip_idle_timeout()
+            except Exception:
+                self.idle_timeout = DEFAULT_IDLE_TIMEOUT
+        return self.idle_timeout
+
+    def is_loaded(self):
+        generator = EmbeddingGenerator._instance
+        return generator is not None and generator.is_loaded
+
+    @contextmanager
+    def in_use(self):
+        with self.lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.last_used = time.time()
+                if self.active == 0:
+                    if self._unload_requested:
+                        self._unload_now("liberado al terminar el uso en curso")
+                    else:
+                        self._schedule()
 
-        for candidate_id, candidate_emb in candidate_embeddings:
-            similarity = self.calculate_similarity(query, candidate_emb)
+    def warm_up(self, callback=None):
+        """
+        Cargar el modelo en segundo plano (no hace nada si ya está cargado o cargándose).
 
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = (candidate_id, similarity)
+        Args:
+            callback: Función llamada con el generador cuando está listo
+        """
+        with self.lock:
+            if self._warm_up_thread is not None and self._warm_up_thread.is_alive():
+                return self._warm_up_thread
 
-        return best_match
+            def run():
+                try:
+                    generator = get_embedding_generator()
+                    if callback:
+                        callback(generator)
+                except Exception as e:
+                    print(f"⚠️ Error precargando CLIP: {e}")
+
+            self._warm_up_thread = threading.Thread(target=run, daemon=True, name="clip-warm-up")
+            self._warm_up_thread.start()
+            return self._warm_up_thread
 
+    def request_unload(self):
+        """Liberar ya, o al terminar el uso en curso si otro hilo lo está usando"""
+        with self.lock:
+            if self.active:
+                self._unload_requested = True
+            else:
+                self._unload_now("liberado a pedido")
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        timeout = self.get_idle_timeout()
+        if timeout and timeout > 0 and self.is_loaded():
+            self._timer = threading.Timer(timeout, self._on_idle)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_idle(self):
+        with self.lock:
+            timeout = self.get_idle_timeout()
+            if self.active or not timeout or not self.is_loaded():
+                return
+            idle = time.time() - self.last_used
+            if idle < timeout:
+                self._schedule()
+                return
+            self._unload_now(f"tras {idle:.0f}s sin uso")
+
+    def _unload_now(self, reason):
+        self._unload_requested = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        generator = EmbeddingGenerator._instance
+        if generator is not None:
+            generator.unload(reason)
+
+    def memory_report(self):
+        rss, peak = _rss_mb(), _peak_rss_mb()
+        parts = []
+        if rss is not None:
+            parts.append(f"RSS {rss:.0f} MB")
+        if peak is not None:
+            parts.append(f"pico {peak:.0f} MB")
+        return ", ".join(parts)
+
+    def record_load(self, seconds):
+        self.loads += 1
+        self.last_load_seconds = seconds
+        self.last_used = time.time()
+        print(f"⏱️  CLIP cargado en {seconds:.1f}s ({self.memory_report()})")
+        self._schedule()
+
+    def record_unload(self, seconds, reason=""):
+        self.unloads += 1
+        self.last_unload_seconds = seconds
+        print(f"💤 CLIP liberado{' ' + reason if reason else ''} en {seconds:.2f}s ({self.memory_report()})")
+
+    def stats(self):
+        rss, peak = _rss_mb(), _peak_rss_mb()
+        return {
+            'loaded': self.is_loaded(),
+            'active': self.active,
+            'idle_seconds': round(time.time() - self.last_used, 1),
+            'idle_timeout': self.get_idle_timeout(),
+            'loads': self.loads,
+            'unloads': self.unloads,
+            'last_load_seconds': self.last_load_seconds,
+            'last_unload_seconds': self.last_unload_seconds,
+            'rss_mb': round(rss, 1) if rss is not None else None,
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+        }
+
+
+model_lifecycle = ModelLifecycle()
 
 # Instancia global
 _embedding_generator = None
 
-def get_embedding_generator():
-    """Obtiene la instancia singleton del generador de embeddings."""
+def get_embedding_generator(local=False):
+    """
+    Obtiene la instancia singleton del generador de embeddings.
+
+    Si el servicio de embeddings (helpers/embedding_service.py) está
+    corriendo, devuelve un cliente con la misma interfaz en lugar de cargar
+    CLIP en este proceso.
+
+    Args:
+        local: Forzar el modelo en proceso (lo usa el propio servicio)
+    """
     global _embedding_generator
-    if _embedding_generator is None:
-        _embedding_generator = EmbeddingGenerator()
-    return _embedding_generator
+    # Un solo hilo crea o carga el modelo; los demás esperan y reciben el mismo
+    with model_lifecycle.lock:
+        if local:
+            if not isinstance(_embedding_generator, EmbeddingGenerator):
+                _embedding_generator = EmbeddingGenerator()
+        elif _embedding_generator is None:
+            from helpers.embedding_service import connect_embedding_service
+            client = connect_embedding_service()
+            if client is not None:
+                print("🧠 Usando el servicio de embeddings compartido")
+                _embedding_generator = client
+            else:
+                _embedding_generator = EmbeddingGenerator()
+
+        if isinstance(_embedding_generator, EmbeddingGenerator):
+            _embedding_generator._ensure_loaded()
+        return _embedding_generator
+
+def get_active_model_id():
+    """model_id del generador ya creado en este proceso (local o servicio), o el configurado; no carga CLIP."""
+    generator = _embedding_generator
+    return generator.model_id if generator is not None else get_model_id()
+
+def warm_up_embedding_generator(callback=None):
+    """Precargar CLIP en segundo plano (ver ModelLifecycle.warm_up)."""
+    return model_lifecycle.warm_up(callback)
 
 def release_embedding_generator():
-    """Libera el modelo CLIP de memoria completamente."""
+    """Libera el modelo CLIP de memoria (al terminar el uso en curso, si lo hay)."""
     global _embedding_generator
-    if _embedding_generator is not None:
-        _embedding_generator.unload()
+    with model_lifecycle.lock:
+        generator = _embedding_generator
         _embedding_generator = None
+    if isinstance(generator, EmbeddingGenerator):
+        model_lifecycle.request_unload()
+    elif generator is not None:
+        generator.unload()
+
+
+def benchmark_embeddings(image_paths, batch_sizes=(1, 8, 16, 32), num_threads=None):
+    """
+    Medir imágenes/segundo de generate_embedding (una por llamada) contra
+    generate_embeddings con distintos tamaños de lote.
+
+    Returns:
+        Dict {'single': img/s, 'batch_<n>': img/s, 'stages_<n>': ms por etapa,
+              'threads': hilos usados}
+    """
+    import torch
+    emb_gen = get_embedding_generator()
+    if num_threads:
+        emb_gen.configure_threads(num_threads)
+
+    # Calentar el modelo para no medir la primera inicialización
+    emb_gen.generate_embeddings(image_paths[:2], batch_size=2)
+
+    report = {'images': len(image_paths), 'threads': torch.get_num_threads(), 'device': emb_gen.device}
+
+    start = time.perf_counter()
+    for image_path in image_paths:
+        emb_gen.generate_embedding(image_path)
+    report['single'] = round(len(image_paths) / (time.perf_counter() - start), 2)
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        emb_gen.generate_embeddings(image_paths, batch_size=batch_size)
+        report[f'batch_{batch_size}'] = round(len(image_paths) / (time.perf_counter() - start), 2)
+        report[f'stages_{batch_size}'] = dict(emb_gen.last_timings)
+
+    return report
+
+
+if __name__ == "__main__":
+    # Benchmark: python helpers/embedding_generator.py --benchmark <carpeta_de_imagenes> [hilos]
+    from pathlib import Path
+
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        sys.path.append(str(Path(__file__).parent.parent))
+        images = sorted(
+            str(path) for path in Path(sys.argv[2]).rglob("*")
+            if path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp')
+        )[:256]
+        threads = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+        print(f"🧪 Benchmark de embeddings CLIP sobre {len(images)} imágenes")
+        report = benchmark_embeddings(images, num_threads=threads)
+        print(f"   - Dispositivo: {report['device']}, hilos: {report['threads']}")
+        print(f"   - Una por llamada: {report['single']} img/s")
+        for key, value in report.items():
+            if key.startswith('batch_'):
+                print(f"   - Lote de {key[6:]}: {value} img/s (x{value / report['single']:.2f})")
+                stages = report.get(f'stages_{key[6:]}', {})
+                if stages:
+                    print("       " + ", ".join(f"{stage} {ms:.1f}ms" for stage, ms in stages.items()) + " por imagen")
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+embedding_service.py - Servicio local de embeddings CLIP por socket Unix
+
+Un solo proceso mantiene el modelo cargado y atiende a la aplicación y a los
+scripts de línea de comandos, en lugar de que cada uno cargue su propia copia
+(y de que la inferencia compita con la interfaz GTK por el GIL).
+
+    python helpers/embedding_service.py [--idle-timeout SEGUNDOS]
+
+- Cola de pedidos con lotes entre clientes: los pedidos que llegan dentro de
+  BATCH_WAIT_SECONDS se procesan juntos en generate_embeddings.
+- El modelo se libera tras `idle_timeout` segundos sin uso y se vuelve a
+  cargar con el siguiente pedido.
+- Operaciones: embed, model_id, health, metrics, shutdown. La respuesta de
+  embed incluye el model_id del backend que generó los vectores.
+
+Protocolo (por conexión, pedidos en secuencia):
+    4 bytes big-endian con el largo de la cabecera, cabecera JSON y luego
+    `payload_bytes` bytes (los embeddings float32 de las filas válidas).
+
+Del lado cliente, get_embedding_generator() usa EmbeddingClient si el
+servicio responde, y si no (o si se cae) genera en proceso como siempre.
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from helpers.embedding_generator import EmbeddingUtils, DEFAULT_BATCH_SIZE
+
+# Espera máxima para juntar pedidos de distintos clientes en un lote
+BATCH_WAIT_SECONDS = 0.02
+
+# Segundos sin pedidos antes de liberar el modelo (0 = nunca)
+DEFAULT_IDLE_TIMEOUT = 600
+
+# Timeout del cliente para conectar / por pedido (cada pedido es de a lo sumo
+# batch_size imágenes, más lo que tenga en cola el servicio)
+CONNECT_TIMEOUT = 1.0
+REQUEST_TIMEOUT = 600
+
+
+def get_socket_path() -> str:
+    """Ruta del socket (BABELCOMICS_EMBEDDING_SOCKET o XDG_RUNTIME_DIR / temporal)"""
+    override = os.environ.get('BABELCOMICS_EMBEDDING_SOCKET')
+    if override:
+        return override
+    base = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(base, f"babelcomics-embeddings-{os.getuid()}.sock")
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Conexión cerrada")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock, header: dict, payload: bytes = b"") -> None:
+    header = dict(header, payload_bytes=len(payload))
+    data = json.dumps(header).encode('utf-8')
+    sock.sendall(struct.pack('>I', len(data)) + data + payload)
+
+
+def recv_message(sock):
+    """Leer un mensaje: (cabecera, payload)"""
+    (length,) = struct.unpack('>I', _recv_exact(sock, 4))
+    header = json.loads(_recv_exact(sock, length).decode('utf-8'))
+    payload = _recv_exact(sock, header.get('payload_bytes', 0)) if header.get('payload_bytes') else b""
+    return header, payload
+
+
+class _EmbedJob:
+    """Pedido de un cliente esperando su parte del lote"""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.results = None
+        self.model_id = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingServer:
+    """Modelo CLIP compartido detrás de un socket Unix"""
+
+    def __init__(self, socket_path: Optional[str] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.socket_path = socket_path or get_socket_path()
+        self.idle_timeout = idle_timeout
+        # La liberación por inactividad la decide el servidor (_unload_if_idle), no el temporizador del proceso
+        from helpers.embedding_generator import model_lifecycle
+        model_lifecycle.idle_timeout = 0
+        self.jobs = queue.Queue()
+        self.generator = None
+        self.started_at = time.time()
+        self.last_used = time.time()
+        self.running = False
+        self._server = None
+        self.metrics = {
+            'requests': 0,
+            'images': 0,
+            'batches': 0,
+            'failed_images': 0,
+            'model_loads': 0,
+            'model_unloads': 0,
+            'inference_seconds': 0.0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0,
+        }
+        self._metrics_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Modelo y lotes
+    # ------------------------------------------------------------------
+
+    def _get_generator(self):
+        if self.generator is None:
+            from helpers.embedding_generator import get_embedding_generator
+            self.generator = get_embedding_generator(local=True)
+            with self._metrics_lock:
+                self.metrics['model_loads'] += 1
+        return self.generator
+
+    def _unload_if_idle(self):
+        if (self.generator is not None and self.idle_timeout
+                and time.time() - self.last_used > self.idle_timeout):
+            from helpers.embedding_generator import release_embedding_generator
+            release_embedding_generator()
+            self.generator = None
+            with self._metrics_lock:
+                self.metrics['model_unloads'] += 1
+            print(f"💤 Modelo liberado tras {self.idle_timeout:.0f}s sin pedidos")
+
+    def _worker(self):
+        """Juntar pedidos de varios clientes y procesarlos en un solo lote"""
+        while self.running:
+            try:
+                first = self.jobs.get(timeout=1.0)
+            except queue.Empty:
+                self._unload_if_idle()
+                continue
+
+            jobs = [first]
+            batch_size = self.generator.batch_size if self.generator else DEFAULT_BATCH_SIZE
+            images = len(first.paths)
+            deadline = time.monotonic() + BATCH_WAIT_SECONDS
+            while images < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.jobs.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                images += len(job.paths)
+
+            paths = [path for job in jobs for path in job.paths]
+            start = time.perf_counter()
+            try:
+                generator = self._get_generator()
+                results = generator.generate_embeddings(paths)
+                model_id = generator.model_id
+            except Exception as e:
+                print(f"❌ Error generando lote de {len(paths)} embeddings: {e}")
+                for job in jobs:
+                    job.error = str(e)
+                    job.done.set()
+                continue
+            elapsed = time.perf_counter() - start
+            self.last_used = time.time()
+
+            with self._metrics_lock:
+                self.metrics['batches'] += 1
+                self.metrics['images'] += len(paths)
+                self.metrics['failed_images'] += sum(1 for result in results if result is None)
+                self.metrics['inference_seconds'] += elapsed
+                self.metrics['last_batch_size'] = len(paths)
+                self.metrics['last_batch_ms'] = round(elapsed * 1000, 1)
+
+            offset = 0
+            for job in jobs:
+                job.results = results[offset:offset + len(job.paths)]
+                job.model_id = model_id
+                offset += len(job.paths)
+                job.done.set()
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def embed(self, paths: List[str]):
+        job = _EmbedJob(paths)
+        self.jobs.put(job)
+        job.done.wait()
+        if job.error:
+            raise RuntimeError(job.error)
+        return job.results, job.model_id
+
+    def model_id(self) -> str:
+        """Id del backend que usa el servicio (carga el modelo si hace falta)"""
+        return self._get_generator().model_id
+
+    def health(self) -> dict:
+        return {
+            'ok': True,
+            'pid': os.getpid(),
+            'model_loaded': self.generator is not None,
+            'device': getattr(self.generator, 'device', None),
+            'model_id': self.generator.model_id if self.generator is not None else None,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+        }
+
+    def get_metrics(self) -> dict:
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        metrics['queue_depth'] = self.jobs.qsize()
+        metrics['idle_seconds'] = round(time.time() - self.last_used, 1)
+        metrics['images_per_second'] = round(
+            metrics['images'] / metrics['inference_seconds'], 2
+        ) if metrics['inference_seconds'] else 0.0
+        metrics.update(self.health())
+
+        # Tiempos de carga/liberación y memoria del proceso del servicio
+        from helpers.embedding_generator import model_lifecycle
+        metrics['model'] = model_lifecycle.stats()
+        return metrics
+
+    def handle(self, header: dict):
+        """Resolver un pedido: (cabecera de respuesta, payload)"""
+        op = header.get('op')
+        with self._metrics_lock:
+            self.metrics['requests'] += 1
+
+        if op == 'embed':
+            results, model_id = self.embed(header.get('paths', []))
+            valid = [result is not None for result in results]
+            rows = [result for result in results if result is not None]
+            payload = np.asarray(rows, dtype='<f4').tobytes() if rows else b""
+            dim = len(rows[0]) if rows else 0
+            return {'ok': True, 'valid': valid, 'dim': dim, 'model_id': model_id}, payload
+        if op == 'model_id':
+            return {'ok': True, 'model_id': self.model_id()}, b""
+        if op == 'health':
+            return self.health(), b""
+        if op == 'metrics':
+            return dict(self.get_metrics(), ok=True), b""
+        if op == 'shutdown':
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {'ok': True}, b""
+        return {'ok': False, 'error': f"Operación desconocida: {op}"}, b""
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            if _ping(self.socket_path):
+                raise RuntimeError(f"Ya hay un servicio de embeddings en {self.socket_path}")
+            os.remove(self.socket_path)
+
+        service = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        header, _ = recv_message(self.request)
+                    except (ConnectionError, OSError, ValueError):
+                        return
+                    try:
+                        response, payload = service.handle(header)
+                    except Exception as e:
+                        response, payload = {'ok': False, 'error': str(e)}, b""
+                    try:
+                        send_message(self.request, response, payload)
+                    except OSError:
+                        return
+
+        self._server = _UnixServer(self.socket_path, Handler)
+        os.chmod(self.socket_path, 0o600)
+        self.running = True
+        threading.Thread(target=self._worker, daemon=True).start()
+
+        print(f"🧠 Servicio de embeddings escuchando en {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self.running = False
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            print("🛑 Servicio de embeddings detenido")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def _ping(socket_path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(socket_path)
+            send_message(sock, {'op': 'health'})
+            header, _ = recv_message(sock)
+            return bool(header.get('ok'))
+    except (OSError, ValueError):
+        return False
+
+
+class EmbeddingClient(EmbeddingUtils):
+    """
+    Cliente del servicio con la misma interfaz que EmbeddingGenerator
+
+    Si el servicio deja de responder, genera en proceso con EmbeddingGenerator
+    (cargando el modelo recién en ese momento).
+    """
+
+    device = 'service'
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or get_socket_path()
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self._sock = None
+        self._lock = threading.Lock()
+        self._fallback = None
+        self._model_id = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(self.socket_path)
+        sock.settimeout(REQUEST_TIMEOUT)
+        return sock
+
+    def request(self, header: dict):
+        """
+        Enviar un pedido y devolver (cabecera, payload)
+
+        Se reconecta una vez solo si falla la conexión o el envío, o si una
+        conexión reutilizada resulta cerrada sin respuesta (el servicio se
+        reinició y nunca recibió el pedido). Un timeout esperando la respuesta
+        no se reintenta: el servicio puede seguir calculando ese pedido.
+        """
+        with self._lock:
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    send_message(self._sock, header)
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+                    continue
+
+                try:
+                    return recv_message(self._sock)
+                except socket.timeout:
+                    self._close()
+                    raise
+                except ConnectionError:
+                    self._close()
+                    if attempt or not reused:
+                        raise
+                except OSError:
+                    self._close()
+                    raise
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def ping(self) -> bool:
+        try:
+            header, _ = self.request({'op': 'health'})
+            if header.get('model_id'):
+                self._model_id = header['model_id']
+            return bool(header.get('ok'))
+        except (OSError, ConnectionError, ValueError):
+            return False
+
+    @property
+    def model_id(self):
+        """Id del backend que generó los últimos embeddings (el del servicio, o el local si se cayó)"""
+        if self._fallback is not None:
+            return self._fallback.model_id
+        if self._model_id:
+            return self._model_id
+        from helpers.embedding_generator import get_model_id
+        return get_model_id()
+
+    def resolve_model_id(self):
+        """Preguntar al servicio qué backend usa (carga el modelo allá si hace falta)"""
+        if self._fallback is None:
+            try:
+                header, _ = self.request({'op': 'model_id'})
+                if header.get('ok'):
+                    self._model_id = header['model_id']
+            except (OSError, ConnectionError, ValueError) as e:
+                print(f"⚠️ Error en el servicio de embeddings: {e}")
+                self._local()
+        return self.model_id
+
+    def metrics(self) -> dict:
+        header, _ = self.request({'op': 'metrics'})
+        return header
+
+    def _local(self):
+        if self._fallback is None:
+            print("⚠️ Servicio de embeddings no disponible, generando en este proceso")
+            from helpers.embedding_generator import get_embedding_generator
+            self._fallback = get_embedding_generator(local=True)
+        return self._fallback
+
+    def generate_embeddings(self, image_paths, batch_size=None):
+        """
+        Embeddings de varias imágenes (listas de floats, None si fallaron)
+
+        Se piden de a batch_size imágenes: un pedido enorme (todas las covers
+        pendientes de un script) no deja esperando a la interfaz detrás suyo
+        en la cola del servicio, y un corte solo repite el lote en curso.
+        """
+        chunk = max(1, batch_size or self.batch_size)
+        results = []
+        for start in range(0, len(image_paths), chunk):
+            paths = image_paths[start:start + chunk]
+            if self._fallback is not None:
+                # El servicio se cayó en un lote anterior: el resto en proceso
+                results.extend(self._fallback.generate_embeddings(image_paths[start:], batch_size))
+                break
+            results.extend(self._embed_chunk(paths, batch_size))
+        return results
+
+    def _embed_chunk(self, image_paths, batch_size=None):
+        try:
+            header, payload = self.request({
+                'op': 'embed',
+                'paths': [os.path.abspath(path) for path in image_paths]
+            })
+            if not header.get('ok'):
+                raise RuntimeError(header.get('error', 'error desconocido'))
+        except (OSError, ConnectionError, ValueError, RuntimeError) as e:
+            print(f"⚠️ Error en el servicio de embeddings: {e}")
+            return self._local().generate_embeddings(image_paths, batch_size)
+
+        self._model_id = header.get('model_id') or self._model_id
+        dim = header.get('dim', 0)
+        rows = np.frombuffer(payload, dtype='<f4').reshape(-1, dim) if dim else []
+        results = []
+        row = 0
+        for valid in header.get('valid', []):
+            if valid:
+                results.append(rows[row].tolist())
+                row += 1
+            else:
+                results.append(None)
+        return results
+
+    def generate_embedding(self, image_path):
+        return self.generate_embeddings([image_path])[0]
+
+    def configure_threads(self, num_threads):
+        """Los hilos los maneja el servicio"""
+
+    def unload(self):
+        """Cerrar la conexión (el servicio libera el modelo por inactividad)"""
+        self._close()
+        if self._fallback is not None:
+            self._fallback.unload()
+            self._fallback = None
+
+
+def connect_embedding_service(socket_path: Optional[str] = None) -> Optional[EmbeddingClient]:
+    """Cliente conectado si el servicio está corriendo, o None"""
+    socket_path = socket_path or get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    client = EmbeddingClient(socket_path)
+    return client if client.ping() else None
+
+
+if __name__ == "__main__":
+    # python helpers/embedding_service.py [--idle-timeout 600] | --status | --stop
+    if "--status" in sys.argv or "--stop" in sys.argv:
+        client = connect_embedding_service()
+        if client is None:
+            print("❌ El servicio de embeddings no está corriendo")
+            sys.exit(1)
+        if "--stop" in sys.argv:
+            client.request({'op': 'shutdown'})
+            print("🛑 Servicio detenido")
+        else:
+            for key, value in client.metrics().items():
+                print(f"   {key}: {value}")
+        sys.exit(0)
+
+    idle_timeout = DEFAULT_IDLE_TIMEOUT
+    if "--idle-timeout" in sys.argv:
+        idle_timeout = float(sys.argv[sys.argv.index("--idle-timeout") + 1])
+
+    EmbeddingServer(idle_timeout=idle_timeout).serve_forever()
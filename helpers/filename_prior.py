@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+filename_prior.py - Candidatas de cover a partir del nombre del archivo
+
+El nombre del archivo casi siempre trae la serie y el número
+("Batman 045 (2018).cbz"). Con eso se buscan las covers de los issues con
+ese número en volúmenes cuyo nombre coincide, y la búsqueda visual se hace
+primero sobre ese subconjunto. Solo si la mejor similaridad queda baja se
+busca en el índice completo.
+
+El número se resuelve con el índice de comicbooks_info (numero, id_volume) y
+el nombre de la serie se compara con LIKE solo sobre esos volúmenes. Sin
+número (o si con número no hay covers) el nombre se busca recorriendo la
+tabla de volúmenes: un LIKE '%palabra%' no puede usar índices.
+
+Para el número se usan los mismos patrones que la catalogación:
+Setup.custom_regexes, Setup.expresion_regular_numero y los genéricos.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+# Patrones genéricos de número (mismos que la ventana de catalogación)
+DEFAULT_NUMBER_PATTERNS = [
+    r'#([0-9]+[A-Za-z]*)',
+    r'\s([0-9]+[A-Za-z]*)\s',
+    r'\s([0-9]+[A-Za-z]*)$',
+]
+
+# Marcas de volumen ("Vol. 2", "Volume 3", "v2"): no son el número del issue
+VOLUME_PATTERN = re.compile(r'\b(vol(ume)?\.?\s*\d+|v\d+)\b', re.IGNORECASE)
+
+# Palabras que no sirven para identificar la serie
+STOP_WORDS = {'the', 'a', 'an', 'of', 'and', 'vol', 'volume', 'el', 'la', 'los', 'las', 'de', 'del', 'y'}
+
+# Máximo de volúmenes aceptados para una serie (nombres demasiado genéricos no filtran)
+MAX_SERIES_VOLUMES = 200
+
+
+@dataclass
+class FilenameHint:
+    """Serie y número deducidos del nombre de archivo"""
+    series: Optional[str] = None
+    number: Optional[str] = None
+    series_words: List[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.number or self.series_words)
+
+    def describe(self) -> str:
+        parts = []
+        if self.series:
+            parts.append(self.series)
+        if self.number:
+            parts.append(f"#{self.number}")
+        return " ".join(parts)
+
+
+def normalize_number(number: str) -> str:
+    """Quitar ceros a la izquierda conservando letras ("007" -> "7", "012A" -> "12A")"""
+    match = re.match(r'^0*(\d.*)$', number)
+    return match.group(1) if match else number
+
+
+def load_number_patterns(setup) -> List[str]:
+    """Patrones de número configurados (custom_regexes, expresion_regular_numero) + genéricos"""
+    patterns = []
+    if setup is not None:
+        if setup.custom_regexes:
+            try:
+                patterns.extend(json.loads(setup.custom_regexes))
+            except (ValueError, TypeError):
+                pass
+        if setup.expresion_regular_numero:
+            patterns.append(setup.expresion_regular_numero)
+    return patterns + DEFAULT_NUMBER_PATTERNS
+
+
+def parse_comic_filename(filename: str, patterns: Sequence[str]) -> FilenameHint:
+    """
+    Deducir serie y número de un nombre de archivo
+
+    El número es el grupo 1 del primer patrón que coincide; la serie es el
+    texto anterior, sin año, etiquetas entre paréntesis/corchetes ni separadores.
+    Las marcas de volumen se quitan antes de buscar el número, para que
+    "X-Men Vol. 2 012" no dé el issue 2. Un patrón inválido se ignora.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    readable = re.sub(r'[_.]+', ' ', name)
+    readable = re.sub(r'\s+', ' ', VOLUME_PATTERN.sub(' ', readable)).strip()
+
+    hint = FilenameHint()
+    series_text = readable
+    for pattern in patterns:
+        try:
+            match = re.search(pattern, readable)
+        except re.error:
+            continue
+        if match and match.groups() and match.group(1):
+            hint.number = normalize_number(match.group(1))
+            series_text = readable[:match.start(1)]
+            break
+
+    series_text = re.sub(r'\([^)]*\)|\[[^\]]*\]', ' ', series_text)
+    series_text = re.sub(r'[#\-–:]+', ' ', series_text)
+    series_text = re.sub(r'\s+', ' ', series_text).strip()
+
+    if series_text:
+        hint.series = series_text
+        hint.series_words = [
+            word for word in re.findall(r'\w+', series_text.lower())
+            if word not in STOP_WORDS and len(word) > 1
+        ]
+    return hint
+
+
+def find_candidate_covers(session, hint: FilenameHint) -> Tuple[List[int], str]:
+    """
+    Ids de covers que coinciden con la pista del nombre
+
+    Returns:
+        (ids de covers, nivel) con nivel 'serie+número', 'serie', 'número' o ''
+    """
+    from entidades.comicbook_info_model import ComicbookInfo
+    from entidades.comicbook_info_cover_model import ComicbookInfoCover
+    from entidades.volume_model import Volume
+
+    name_filters = [Volume.nombre.ilike(f"%{word}%") for word in hint.series_words]
+
+    def covers_query():
+        return session.query(ComicbookInfoCover.id_cover).join(
+            ComicbookInfo, ComicbookInfo.id_comicbook_info == ComicbookInfoCover.id_comicbook_info
+        ).filter(ComicbookInfoCover.embedding.isnot(None))
+
+    def covers_for(*filters):
+        return [row[0] for row in covers_query().filter(*filters)]
+
+    # Primero el número (indexado) y el nombre solo sobre los volúmenes que lo tienen
+    if name_filters and hint.number:
+        covers = [row[0] for row in covers_query().join(
+            Volume, Volume.id_volume == ComicbookInfo.id_volume
+        ).filter(ComicbookInfo.numero == hint.number, *name_filters)]
+        if covers:
+            return covers, 'serie+número'
+
+    # Solo la serie: recorre los volúmenes (LIKE sin índice)
+    volume_ids = []
+    if name_filters:
+        query = session.query(Volume.id_volume).filter(*name_filters)
+        volume_ids = [row[0] for row in query.limit(MAX_SERIES_VOLUMES + 1)]
+        if len(volume_ids) > MAX_SERIES_VOLUMES:
+            volume_ids = []
+    if volume_ids:
+        covers = covers_for(ComicbookInfo.id_volume.in_(volume_ids))
+        if covers:
+            return covers, 'serie'
+    if hint.number:
+        covers = covers_for(ComicbookInfo.numero == hint.number)
+        if covers:
+            return covers, 'número'
+    return [], ''
+
+
+class HybridCoverMatcher:
+    """
+    Búsqueda visual acotada por el nombre del archivo, con respaldo global
+
+    Uso:
+        matcher = HybridCoverMatcher(session, cover_index)
+        matches, source = matcher.match(comic.path, embedding, min_score=0.75)
+    """
+
+    def __init__(self, session, cover_index, setup=None):
+        self.session = session
+        self.cover_index = cover_index
+        if setup is None:
+            from entidades.setup_model import Setup
+            setup = session.query(Setup).first()
+        self.patterns = load_number_patterns(setup)
+
+    def match(self, filename: str, embedding, k: int = 3,
+              min_score: float = 0.75) -> Tuple[List[Tuple[int, int, float]], str]:
+        """
+        Returns:
+            (resultados como en CoverIndex.search, origen) donde origen describe
+            el subconjunto usado ("Batman #45 (serie+número, 12 covers)") o
+            'global' si se buscó en todo el índice
+        """
+        hint = parse_comic_filename(filename, self.patterns)
+        if hint:
+            cover_ids, level = find_candidate_covers(self.session, hint)
+            if cover_ids:
+                results = self.cover_index.search_subset(embedding, cover_ids, k)
+                if results and results[0][2] >= min_score:
+                    return results, f"{hint.describe()} ({level}, {len(cover_ids)} covers)"
+
+        return self.cover_index.search(embedding, k), 'global'
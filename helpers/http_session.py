@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+http_session.py - Sesión HTTP compartida con reintentos para ComicVine
+
+Todas las consultas a la API y las descargas de imágenes usan la misma
+requests.Session: las conexiones TCP/TLS quedan abiertas (keep-alive) en un
+pool dimensionado para los hilos que descargan en paralelo, en lugar de
+pagar un handshake nuevo por cada request.
+
+Los errores transitorios (5xx, 429/420 y caídas de conexión) se reintentan
+con backoff exponencial con jitter; si el servidor manda Retry-After se
+respeta ese tiempo. Cada intento (reintentos incluidos) pasa antes por el
+limitador compartido de helpers/rate_limiter.py. get_http_stats() cuenta
+requests, conexiones nuevas (el resto reutilizó una del pool) y reintentos.
+
+Uso:
+    python helpers/http_session.py URL [veces]
+"""
+
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from helpers.rate_limiter import get_rate_limiter
+
+# Conexiones abiertas por host (ComicVineClient.MAX_WORKERS + descargas de covers)
+POOL_SIZE = 16
+
+# Hosts distintos con pool propio (API, imágenes, CDN)
+POOL_HOSTS = 8
+
+# Timeout (conexión, lectura) cuando el llamador no pasa uno
+DEFAULT_TIMEOUT = (10, 30)
+
+# Reintentos después del primer intento
+MAX_RETRIES = 4
+
+# Backoff: espera aleatoria entre 0 y BACKOFF_BASE * 2^intento, hasta BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# Un Retry-After más largo que esto no se espera: se devuelve la respuesta
+RETRY_AFTER_MAX = 120.0
+
+# 420 es el "Enhance your calm" que a veces devuelve ComicVine por exceso de requests
+RETRY_STATUSES = frozenset({420, 429, 500, 502, 503, 504})
+
+
+class HttpStats:
+    """Contadores del proceso (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = {'requests': 0, 'connections': 0, 'retries': 0, 'failures': 0}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self.counts)
+        counts['reused'] = max(0, counts['requests'] - counts['connections'])
+        return counts
+
+
+http_stats = HttpStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        http_stats.increment('connections')
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        http_stats.increment('connections')
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter que cuenta las conexiones nuevas que abre urllib3"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Sesión compartida por el proceso
+
+    El pool de urllib3 es thread-safe; los headers se pasan en cada request
+    en lugar de modificar session.headers desde varios hilos.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Sin pool_block: requests no pasa pool_timeout, así que una respuesta en
+                # stream sin cerrar dejaría a los demás hilos esperando para siempre.
+                # Con más hilos que POOL_SIZE se abre una conexión extra que no se guarda
+                adapter = _PooledAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos a esperar según un header Retry-After (segundos o fecha HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Espera antes del reintento número attempt (0 = primer reintento), con jitter completo"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request_with_retry(method: str, url: str, max_retries: int = MAX_RETRIES,
+                       resource: Optional[str] = None, **kwargs) -> requests.Response:
+    """
+    Hacer un request con la sesión compartida, reintentando errores transitorios
+
+    resource es el recurso de la API de ComicVine para el cupo por hora
+    (None para imágenes). Acepta los mismos kwargs que requests.Session.request.
+    Devuelve la última respuesta (el llamador sigue usando raise_for_status) y
+    relanza la excepción de conexión/timeout si se agotan los reintentos.
+    """
+    session = get_http_session()
+    limiter = get_rate_limiter()
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+    attempt = 0
+    while True:
+        limiter.acquire(resource)
+        http_stats.increment('requests')
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.exceptions.SSLError:
+            # Un certificado inválido no se arregla reintentando; el llamador decide
+            http_stats.increment('failures')
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= max_retries:
+                http_stats.increment('failures')
+                raise
+            delay = backoff_delay(attempt)
+            print(f"🔁 Reintentando {url} en {delay:.1f}s ({attempt + 1}/{max_retries}): {e}")
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if attempt >= max_retries or (retry_after is not None and retry_after > RETRY_AFTER_MAX):
+                http_stats.increment('failures')
+                return response
+
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            print(f"🔁 HTTP {response.status_code} en {url}, reintentando en {delay:.1f}s "
+                  f"({attempt + 1}/{max_retries})")
+            # Devolver la conexión al pool antes de esperar
+            response.close()
+
+        http_stats.increment('retries')
+        attempt += 1
+        time.sleep(delay)
+
+
+def get_http_stats() -> Dict[str, int]:
+    """{'requests', 'connections', 'reused', 'retries', 'failures'} desde que arrancó el proceso"""
+    return http_stats.snapshot()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python helpers/http_session.py URL [veces]")
+        sys.exit(1)
+
+    url = sys.argv[1]
+    times = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for _ in range(times):
+        start = time.perf_counter()
+        response = request_with_retry('GET', url)
+        response.content
+        print(f"   HTTP {response.status_code} en {(time.perf_counter() - start) * 1000:.0f}ms")
+    print(f"📊 {get_http_stats()}")
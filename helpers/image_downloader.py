@@ -1,9 +1,15 @@
 # helpers/image_downloader.py
 import os
+import sys
 import requests
+from pathlib import Path
 from urllib.parse import urlparse
 from PIL import Image # <--- 1. Importamos la librería de imágenes
 
+sys.path.append(str(Path(__file__).parent.parent))
+
+from helpers.http_session import request_with_retry
+
 
 def _build_api_image_url(image_url: str) -> str | None:
     """Convierte una URL de /a/uploads/ al endpoint /api/image/ de ComicVine."""
@@ -71,14 +77,17 @@ def download_image(image_url, destination_folder, filename=None, resize_height=N
 
     for candidate_url in urls_to_try:
         try:
-            response = requests.get(candidate_url, stream=True, headers=headers, timeout=30)
+            response = request_with_retry('GET', candidate_url, stream=True, headers=headers, timeout=30)
             response.raise_for_status()
             if candidate_url != image_url:
                 print(f"INFO: Descargando {filename} a través de la API de ComicVine")
             break
         except requests.exceptions.HTTPError as http_exc:
             last_error = http_exc
-            status = http_exc.response.status_code if http_exc.response else 'unknown'
+            # Respuesta en stream: cerrarla devuelve la conexión al pool compartido
+            response.close()
+            response = None
+            status = http_exc.response.status_code if http_exc.response is not None else 'unknown'
             if status in (403, 404) and candidate_url == image_url and fallback_url:
                 # Intentaremos con la URL de la API en el siguiente ciclo
                 continue
@@ -95,10 +104,10 @@ def download_image(image_url, destination_folder, filename=None, resize_height=N
         return None
 
     try:
-        with open(file_path, 'wb') as f:
+        with response, open(file_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
-    except IOError as e:
+    except (IOError, requests.exceptions.RequestException) as e:
         print(f"Error al guardar la imagen en {file_path}: {e}")
         return None
 
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+image_header.py - Lectura de dimensiones y formato desde la cabecera de una imagen
+
+Lee solo los primeros bytes necesarios de un stream (por ejemplo un miembro
+abierto dentro de un ZIP/RAR) para obtener ancho, alto y formato, sin
+decodificar los píxeles. Soporta JPEG, PNG, GIF, BMP y WebP.
+"""
+
+import struct
+from typing import Optional, Tuple
+
+# Máximo de bytes a recorrer buscando el marcador SOF de un JPEG
+# (los segmentos EXIF/ICC pueden ocupar varias decenas de KB)
+MAX_JPEG_HEADER_BYTES = 512 * 1024
+
+# Marcadores JPEG "Start Of Frame" que contienen las dimensiones
+_JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF
+}
+
+
+def _read_exact(stream, size: int) -> bytes:
+    """Leer exactamente `size` bytes (los streams comprimidos pueden devolver menos)"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_jpeg_size(stream, consumed: int) -> Optional[Tuple[int, int]]:
+    """Recorrer los segmentos JPEG hasta el SOF sin leer los datos de imagen"""
+    while consumed < MAX_JPEG_HEADER_BYTES:
+        # Buscar el próximo 0xFF (puede haber bytes de relleno)
+        byte = _read_exact(stream, 1)
+        consumed += 1
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+
+        marker = _read_exact(stream, 1)
+        consumed += 1
+        while marker == b'\xff':
+            marker = _read_exact(stream, 1)
+            consumed += 1
+        if not marker:
+            return None
+
+        code = marker[0]
+        # Marcadores sin longitud (RSTn, TEM)
+        if 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue
+        # Inicio de datos de imagen o fin: no hubo SOF
+        if code in (0xD9, 0xDA):
+            return None
+
+        length_bytes = _read_exact(stream, 2)
+        consumed += 2
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+
+        if code in _JPEG_SOF_MARKERS:
+            data = _read_exact(stream, 5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+
+        # Saltar el segmento (APPn, DQT, DHT, ...)
+        skipped = _read_exact(stream, length - 2)
+        consumed += len(skipped)
+        if len(skipped) < length - 2:
+            return None
+
+    return None
+
+
+def read_image_header(stream) -> Optional[Tuple[str, int, int]]:
+    """
+    Obtener (formato, ancho, alto) leyendo solo la cabecera
+
+    Args:
+        stream: Objeto con read() posicionado al inicio de la imagen
+
+    Returns:
+        ('jpeg'|'png'|'gif'|'bmp'|'webp', ancho, alto) o None si no se reconoce
+    """
+    try:
+        head = _read_exact(stream, 32)
+
+        if head[:3] == b'\xff\xd8\xff':
+            # Volver a interpretar desde después del SOI (2 bytes)
+            rest = _PrefixedStream(head[2:], stream)
+            size = _read_jpeg_size(rest, len(head))
+            return ('jpeg', size[0], size[1]) if size else None
+
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            width, height = struct.unpack(">II", head[16:24])
+            return 'png', width, height
+
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            width, height = struct.unpack("<HH", head[6:10])
+            return 'gif', width, height
+
+        if head[:2] == b'BM' and len(head) >= 26:
+            width, height = struct.unpack("<ii", head[18:26])
+            return 'bmp', width, abs(height)
+
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            chunk = head[12:16]
+            if chunk == b'VP8 ':
+                width, height = struct.unpack("<HH", head[26:30])
+                return 'webp', width & 0x3FFF, height & 0x3FFF
+            if chunk == b'VP8L':
+                b0, b1, b2, b3 = head[21:25]
+                width = 1 + (((b1 & 0x3F) << 8) | b0)
+                height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+                return 'webp', width, height
+            if chunk == b'VP8X':
+                width = 1 + int.from_bytes(head[24:27], "little")
+                height = 1 + int.from_bytes(head[27:30], "little")
+                return 'webp', width, height
+
+    except Exception as e:
+        print(f"Error leyendo cabecera de imagen: {e}")
+
+    return None
+
+
+class _PrefixedStream:
+    """Stream que primero devuelve bytes ya leídos y luego sigue con el original"""
+
+    def __init__(self, prefix: bytes, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data, self._prefix = self._prefix + self._stream.read(), b""
+            return data
+        if self._prefix:
+            data, self._prefix = self._prefix[:size], self._prefix[size:]
+            if len(data) < size:
+                data += self._stream.read(size - len(data))
+            return data
+        return self._stream.read(size)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+image_prefetch.py - Carga anticipada de imágenes para el modelo CLIP
+
+Mientras el modelo procesa un lote, un pool de hilos decodifica (PIL) y
+preprocesa (resize + normalización del CLIPProcessor) las imágenes de los
+lotes siguientes. PIL libera el GIL al decodificar y redimensionar, así que
+los hilos alcanzan sin el costo de serializar arrays entre procesos.
+
+La cantidad de imágenes en vuelo está acotada (prefetch_batches lotes), para
+que una lista de miles de rutas no termine entera en memoria.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Hilos de decodificación por defecto
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Lotes preparados por adelantado
+DEFAULT_PREFETCH_BATCHES = 2
+
+
+class StageTimer:
+    """
+    Tiempo acumulado por etapa (decode, preprocess, wait, inference)
+
+    decode y preprocess suman el tiempo de todos los hilos del pool; wait es
+    lo que el hilo del modelo estuvo esperando imágenes (si es alto, faltan
+    hilos de decodificación o el disco es el cuello de botella).
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.images = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def summary(self) -> Dict[str, float]:
+        """Milisegundos por etapa y por imagen"""
+        with self._lock:
+            images = max(self.images, 1)
+            return {stage: round(total * 1000 / images, 2) for stage, total in self.seconds.items()}
+
+    def format(self) -> str:
+        return ", ".join(f"{stage} {ms:.1f}ms" for stage, ms in self.summary().items()) + " por imagen"
+
+
+def _load(path: str, preprocess: Callable, timer: StageTimer) -> Optional[np.ndarray]:
+    from PIL import Image
+
+    start = time.perf_counter()
+    try:
+        with Image.open(path) as raw:
+            image = raw.convert("RGB")
+    except Exception as e:
+        print(f"Error abriendo imagen {path}: {e}")
+        return None
+    decoded = time.perf_counter()
+
+    try:
+        pixels = preprocess(image)
+    except Exception as e:
+        print(f"Error preprocesando imagen {path}: {e}")
+        return None
+    finally:
+        timer.add('decode', decoded - start)
+        timer.add('preprocess', time.perf_counter() - decoded)
+    return pixels
+
+
+class PrefetchLoader:
+    """
+    Iterador de lotes (índices, pixel_values) preparados en segundo plano
+
+    Uso:
+        loader = PrefetchLoader(paths, 16, preprocess)
+        for indices, pixel_values in loader:
+            ...  # inferencia; el pool ya está preparando los próximos lotes
+        print(loader.timer.format())
+    """
+
+    def __init__(self, paths: Sequence[str], batch_size: int, preprocess: Callable,
+                 workers: int = DEFAULT_WORKERS, prefetch_batches: int = DEFAULT_PREFETCH_BATCHES,
+                 timer: Optional[StageTimer] = None):
+        """
+        Args:
+            paths: Rutas de las imágenes
+            batch_size: Imágenes por lote entregado
+            preprocess: Función imagen PIL RGB -> array (3, H, W) float32
+            workers: Hilos de decodificación
+            prefetch_batches: Lotes como máximo en preparación
+        """
+        self.paths = list(paths)
+        self.batch_size = max(1, batch_size)
+        self.preprocess = preprocess
+        self.workers = max(1, workers)
+        self.max_pending = self.batch_size * max(1, prefetch_batches)
+        self.timer = timer or StageTimer()
+
+    def __iter__(self) -> Iterator[Tuple[List[int], np.ndarray]]:
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="clip-prefetch") as pool:
+            pending = deque()
+            remaining = iter(enumerate(self.paths))
+
+            def fill():
+                while len(pending) < self.max_pending:
+                    item = next(remaining, None)
+                    if item is None:
+                        return
+                    index, path = item
+                    pending.append((index, pool.submit(_load, path, self.preprocess, self.timer)))
+
+            fill()
+            indices, rows = [], []
+            while pending:
+                index, future = pending.popleft()
+                start = time.perf_counter()
+                pixels = future.result()
+                self.timer.add('wait', time.perf_counter() - start)
+                fill()
+
+                if pixels is not None:
+                    indices.append(index)
+                    rows.append(pixels)
+                if len(rows) == self.batch_size:
+                    yield indices, np.stack(rows)
+                    indices, rows = [], []
+
+            if rows:
+                yield indices, np.stack(rows)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+page_hash.py - Hash perceptual por página y búsqueda de cómics duplicados
+
+Cada página se resume en un dHash de 64 bits (diferencias de brillo entre
+píxeles vecinos de la imagen reducida a 9x8), que se mantiene casi igual
+entre distintas digitalizaciones o recompresiones de la misma página.
+
+Para no comparar todos los pares de páginas, el índice usa multi-index
+hashing: el hash se divide en bandas y solo se comparan páginas que
+coinciden exactamente en alguna banda. Con B bandas, dos hashes a distancia
+de Hamming menor que B comparten al menos una banda; a nivel de cómic eso
+alcanza de sobra, porque un duplicado coincide en decenas de páginas.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Tamaño del hash: (HASH_SIZE + 1) x HASH_SIZE píxeles -> HASH_SIZE² bits
+HASH_SIZE = 8
+
+# Hashes con muy pocos o demasiados bits en 1 vienen de páginas casi lisas
+# (blancas, negras): coinciden entre cómics distintos y no se indexan
+MIN_INFORMATIVE_BITS = 8
+MAX_INFORMATIVE_BITS = 56
+
+
+def compute_dhash(img) -> int:
+    """dHash de 64 bits de una imagen PIL (sirve la ya reducida para el thumbnail)"""
+    from PIL import Image
+    small = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hash_to_hex(value: int) -> str:
+    """Hash a texto para Comicbook_Detail.phash (16 dígitos hex)"""
+    return f"{value:016x}"
+
+
+def hex_to_hash(text: str) -> int:
+    return int(text, 16)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Bits en 1 de cada uint64"""
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class PageHashIndex:
+    """
+    Índice multi-banda de hashes de páginas
+
+    Uso:
+        index = PageHashIndex.from_session(session)
+        groups = index.find_duplicate_comics()
+    """
+
+    def __init__(self, comic_ids: Sequence[int], hashes: Sequence[int],
+                 bands: int = 3, max_bucket: int = 64):
+        """
+        Args:
+            comic_ids: Cómic de cada página
+            hashes: dHash de cada página (mismo orden)
+            bands: Cantidad de bandas (distancia garantizada = bands - 1)
+            max_bucket: Valores de banda compartidos por más páginas que esto se
+                        ignoran (créditos de scanners, publicidades repetidas)
+        """
+        self.bands = bands
+        self.max_bucket = max_bucket
+
+        comic_ids = np.asarray(comic_ids, dtype=np.int64)
+        hashes = np.asarray([int(h) for h in hashes], dtype=np.uint64)
+
+        # Páginas totales por cómic (incluidas las lisas, para el puntaje)
+        unique_comics, counts = np.unique(comic_ids, return_counts=True)
+        self.pages_per_comic = dict(zip(unique_comics.tolist(), counts.tolist()))
+
+        bits = _popcount(hashes) if len(hashes) else np.zeros(0, dtype=np.int64)
+        informative = (bits >= MIN_INFORMATIVE_BITS) & (bits <= MAX_INFORMATIVE_BITS)
+        self.comic_ids = comic_ids[informative]
+        self.hashes = hashes[informative]
+
+        # Límites de cada banda sobre los 64 bits (ej: 3 bandas -> 21, 21, 22)
+        width = 64 // bands
+        self._band_shifts = [band * width for band in range(bands)]
+        self._band_masks = [
+            np.uint64((1 << (64 - shift if band == bands - 1 else width)) - 1)
+            for band, shift in enumerate(self._band_shifts)
+        ]
+
+    @classmethod
+    def from_session(cls, session, comic_ids: Optional[List[int]] = None, **kwargs) -> "PageHashIndex":
+        """Construir el índice con los hashes guardados en Comicbook_Detail"""
+        from entidades.comicbook_detail_model import Comicbook_Detail
+
+        query = session.query(Comicbook_Detail.comicbook_id, Comicbook_Detail.phash).filter(
+            Comicbook_Detail.phash.isnot(None)
+        )
+        if comic_ids:
+            query = query.filter(Comicbook_Detail.comicbook_id.in_(comic_ids))
+
+        rows = query.all()
+        return cls(
+            [comic_id for comic_id, _ in rows],
+            [hex_to_hash(phash) for _, phash in rows],
+            **kwargs
+        )
+
+    def _candidate_pairs(self) -> np.ndarray:
+        """Pares (i, j) de páginas de cómics distintos que comparten alguna banda"""
+        pairs = []
+        for shift, mask in zip(self._band_shifts, self._band_masks):
+            keys = (self.hashes >> np.uint64(shift)) & mask
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+
+            # Descartar buckets sobrepoblados
+            _, sizes = np.unique(sorted_keys, return_counts=True)
+            bucket_size = np.repeat(sizes, sizes)
+            valid = bucket_size <= self.max_bucket
+
+            # Páginas del mismo bucket quedan contiguas: comparar cada una con
+            # las siguientes d posiciones, para d = 1 .. tamaño del bucket - 1
+            for offset in range(1, min(self.max_bucket, len(order))):
+                same = (sorted_keys[:-offset] == sorted_keys[offset:]) & valid[:-offset]
+                if not same.any():
+                    break
+                pairs.append(np.stack([order[:-offset][same], order[offset:][same]], axis=1))
+
+        if not pairs:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        pairs = np.concatenate(pairs)
+        pairs = pairs[self.comic_ids[pairs[:, 0]] != self.comic_ids[pairs[:, 1]]]
+        pairs.sort(axis=1)
+        return np.unique(pairs, axis=0)
+
+    def find_similar_pages(self, max_distance: int = 4) -> np.ndarray:
+        """Pares de páginas (i, j) a distancia de Hamming <= max_distance"""
+        pairs = self._candidate_pairs()
+        if not len(pairs):
+            return pairs
+        distances = _popcount(self.hashes[pairs[:, 0]] ^ self.hashes[pairs[:, 1]])
+        return pairs[distances <= max_distance]
+
+    def find_duplicate_pairs(self, max_distance: int = 4,
+                             min_shared: float = 0.5) -> List[Tuple[int, int, float]]:
+        """
+        Pares de cómics que comparten una fracción de páginas similares
+
+        Args:
+            max_distance: Distancia de Hamming máxima entre páginas "iguales"
+            min_shared: Fracción mínima de páginas del cómic más corto que
+                        tienen que aparecer en el otro
+
+        Returns:
+            [(comic_a, comic_b, fracción), ...] con comic_a < comic_b
+        """
+        pages = self.find_similar_pages(max_distance)
+
+        # Páginas distintas del cómic a que encontraron pareja en el cómic b
+        matched = defaultdict(set)
+        for i, j in pages.tolist():
+            comic_i, comic_j = int(self.comic_ids[i]), int(self.comic_ids[j])
+            if comic_i > comic_j:
+                comic_i, comic_j, i, j = comic_j, comic_i, j, i
+            matched[(comic_i, comic_j)].add(i)
+
+        results = []
+        for (comic_a, comic_b), page_indices in matched.items():
+            shortest = min(self.pages_per_comic[comic_a], self.pages_per_comic[comic_b])
+            shared = min(1.0, len(page_indices) / shortest)
+            if shared >= min_shared:
+                results.append((comic_a, comic_b, round(shared, 3)))
+
+        results.sort(key=lambda item: -item[2])
+        return results
+
+    def find_duplicate_comics(self, max_distance: int = 4,
+                              min_shared: float = 0.5) -> List[List[int]]:
+        """Grupos de cómics con el mismo contenido (componentes conexas de los pares)"""
+        parent = {}
+
+        def find(comic_id):
+            parent.setdefault(comic_id, comic_id)
+            while parent[comic_id] != comic_id:
+                parent[comic_id] = parent[parent[comic_id]]
+                comic_id = parent[comic_id]
+            return comic_id
+
+        for comic_a, comic_b, _ in self.find_duplicate_pairs(max_distance, min_shared):
+            root_a, root_b = find(comic_a), find(comic_b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = defaultdict(list)
+        for comic_id in parent:
+            groups[find(comic_id)].append(comic_id)
+        return sorted((sorted(group) for group in groups.values()), key=lambda group: group[0])
+
+
+def find_content_duplicates(session, comic_ids: Optional[List[int]] = None,
+                            **kwargs) -> Dict[int, List[int]]:
+    """
+    Duplicados por contenido de cada cómic
+
+    Returns:
+        {comic_id: [otros comic_id con el mismo contenido]}
+    """
+    index = PageHashIndex.from_session(session, comic_ids)
+    duplicates = {}
+    for group in index.find_duplicate_comics(**kwargs):
+        for comic_id in group:
+            duplicates[comic_id] = [other for other in group if other != comic_id]
+    return duplicates
+
+
+def backfill_page_hashes(session, batch_size: int = 2000,
+                         comic_ids: Optional[List[int]] = None) -> int:
+    """
+    Calcular el hash de páginas ya indexadas a partir de sus thumbnails
+
+    El dHash se calcula sobre una imagen de 9x8, así que el thumbnail de
+    150x200 da el mismo resultado que la página original y no hace falta
+    volver a abrir el cómic.
+
+    Args:
+        comic_ids: Limitar a estos cómics (por defecto todas las páginas sin hash)
+
+    Returns:
+        Cantidad de páginas actualizadas
+    """
+    import os
+    from PIL import Image
+    from entidades.comicbook_detail_model import Comicbook_Detail
+    from helpers.comic_extractor import ComicExtractor
+
+    # Ids por tandas para no pasar el límite de variables de SQLite
+    if comic_ids is None:
+        id_chunks = [None]
+    else:
+        comic_ids = list(comic_ids)
+        id_chunks = [comic_ids[start:start + 900] for start in range(0, len(comic_ids), 900)]
+
+    updated = 0
+    for chunk in id_chunks:
+        last_id = 0
+        while True:
+            query = session.query(Comicbook_Detail).filter(
+                Comicbook_Detail.phash.is_(None),
+                Comicbook_Detail.id_detail > last_id
+            )
+            if chunk is not None:
+                query = query.filter(Comicbook_Detail.comicbook_id.in_(chunk))
+            pages = query.order_by(Comicbook_Detail.id_detail).limit(batch_size).all()
+            if not pages:
+                break
+
+            for page in pages:
+                thumbnail_path = os.path.join(
+                    ComicExtractor.get_page_thumbnail_dir(page.comicbook_id),
+                    ComicExtractor.get_page_thumbnail_filename(page.ordenPagina)
+                )
+                if not os.path.exists(thumbnail_path):
+                    continue
+                try:
+                    with Image.open(thumbnail_path) as img:
+                        page.phash = hash_to_hex(compute_dhash(img))
+                    updated += 1
+                except Exception as e:
+                    print(f"Error calculando hash de {thumbnail_path}: {e}")
+
+            last_id = pages[-1].id_detail
+            session.commit()
+
+    return updated
+
+
+if __name__ == "__main__":
+    # Reporte de duplicados: python helpers/page_hash.py [--backfill]
+    import sys
+    import time
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).parent.parent))
+
+    from sqlalchemy.orm import sessionmaker
+    from entidades import engine
+
+    session = sessionmaker(bind=engine)()
+
+    if "--backfill" in sys.argv:
+        from helpers.db_migrations import ensure_schema
+        ensure_schema(engine)
+        print(f"🔢 Hashes calculados desde thumbnails: {backfill_page_hashes(session)}")
+
+    start = time.perf_counter()
+    index = PageHashIndex.from_session(session)
+    loaded = time.perf_counter()
+    groups = index.find_duplicate_comics()
+    elapsed = time.perf_counter()
+
+    print(f"📊 {len(index.hashes)} páginas indexadas de {len(index.pages_per_comic)} cómics "
+          f"(carga {loaded - start:.2f}s, búsqueda {elapsed - loaded:.2f}s)")
+    for group in groups:
+        print(f"   🔁 {group}")
+    session.close()
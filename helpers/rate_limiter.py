@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+rate_limiter.py - Límite de requests a ComicVine compartido por todo el proceso
+
+Un token bucket único (thread-safe) por el que pasan todas las consultas a la
+API y las descargas de imágenes (helpers/http_session.request_with_retry).
+El ritmo sale de Setup.rate_limit_interval: un token cada intervalo, con una
+ráfaga corta de BURST tokens para aprovechar el tiempo ocioso.
+
+Quien no encuentra token reserva el siguiente y duerme fuera del lock, así
+los hilos de un ThreadPoolExecutor salen espaciados y en orden de llegada en
+vez de despertarse todos juntos.
+
+Además ComicVine limita cada recurso de la API (volumes, issues, ...) a 200
+requests por hora; para las consultas a la API se lleva una ventana de la
+última hora por recurso y se espera antes de pasarse del cupo.
+
+Uso:
+    python helpers/rate_limiter.py   # estado del limitador
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Intervalo por defecto si no se puede leer Setup (igual que Setup.rate_limit_interval)
+DEFAULT_INTERVAL = 0.5
+
+# Tokens acumulables cuando no hay tráfico
+BURST = 3
+
+# ComicVine permite 200 requests por recurso y hora; margen por otros clientes con la misma key
+HOURLY_QUOTA = 195
+QUOTA_WINDOW = 3600.0
+
+
+class TokenBucket:
+    """
+    Token bucket con reserva: acquire() nunca duerme con el lock tomado
+
+    Los tokens pueden quedar negativos; cada llamador espera lo que le toca
+    según su lugar en la fila.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, burst: int = BURST,
+                 hourly_quota: int = HOURLY_QUOTA):
+        self._lock = threading.Lock()
+        self.hourly_quota = hourly_quota
+        self.configure(interval, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._windows: Dict[str, deque] = {}
+        self.stats = {'acquired': 0, 'waited': 0, 'wait_seconds': 0.0, 'quota_waits': 0}
+
+    def configure(self, interval: float, burst: Optional[int] = None) -> None:
+        """Cambiar el ritmo (segundos entre requests) sin perder la fila actual"""
+        with self._lock:
+            self.interval = max(float(interval), 0.01)
+            self.rate = 1.0 / self.interval
+            if burst is not None:
+                self.burst = max(int(burst), 1)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _quota_ready(self, resource: str, start: float) -> float:
+        """Momento (>= start) en que el recurso vuelve a tener cupo en la última hora"""
+        window = self._windows.setdefault(resource, deque())
+        while window and window[0] <= start - QUOTA_WINDOW:
+            window.popleft()
+        if len(window) < self.hourly_quota:
+            return start
+        return max(start, window[len(window) - self.hourly_quota] + QUOTA_WINDOW)
+
+    def reserve(self, resource: Optional[str] = None) -> float:
+        """
+        Reservar el próximo turno
+
+        Returns:
+            Segundos a esperar antes de hacer el request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            start = now if self._tokens >= 0 else now + (-self._tokens) / self.rate
+
+            if resource:
+                quota_start = self._quota_ready(resource, start)
+                if quota_start > start:
+                    self.stats['quota_waits'] += 1
+                    start = quota_start
+                self._windows[resource].append(start)
+
+            wait = start - now
+            self.stats['acquired'] += 1
+            if wait > 0:
+                self.stats['waited'] += 1
+                self.stats['wait_seconds'] += wait
+            return wait
+
+    def acquire(self, resource: Optional[str] = None) -> float:
+        """
+        Esperar turno para un request
+
+        Args:
+            resource: Recurso de la API ('volumes', 'issue', ...) para el cupo
+                por hora; None para imágenes y otros requests sin cupo
+
+        Returns:
+            Segundos esperados
+        """
+        wait = self.reserve(resource)
+        if wait > 0:
+            if wait > 60:
+                print(f"⏳ Cupo por hora de '{resource}' agotado en ComicVine, esperando {wait / 60:.0f} min")
+            time.sleep(wait)
+        return wait
+
+    def remaining_quota(self) -> Dict[str, int]:
+        """Requests que le quedan a cada recurso en la hora actual"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                resource: self.hourly_quota - sum(1 for stamp in window if stamp > now - QUOTA_WINDOW)
+                for resource, window in self._windows.items()
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def _configured_interval() -> float:
+    try:
+        from helpers.config_helper import ConfigHelper
+        return float(ConfigHelper.get_rate_limit_interval() or DEFAULT_INTERVAL)
+    except Exception as e:
+        print(f"⚠️ No se pudo leer rate_limit_interval, usando {DEFAULT_INTERVAL}s: {e}")
+        return DEFAULT_INTERVAL
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Limitador compartido por el proceso, configurado desde Setup.rate_limit_interval"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucket(_configured_interval())
+    return _limiter
+
+
+def set_rate_limit_interval(interval: float) -> None:
+    """Aplicar un nuevo intervalo (por ejemplo desde la ventana de configuración)"""
+    get_rate_limiter().configure(interval)
+
+
+def api_resource(endpoint: str) -> str:
+    """Recurso de la API para el cupo por hora ('volume/4050-1/' -> 'volume')"""
+    return endpoint.strip('/').split('/', 1)[0].split('?', 1)[0]
+
+
+if __name__ == "__main__":
+    limiter = get_rate_limiter()
+    print(f"⏱️  Intervalo: {limiter.interval}s ({limiter.rate:.2f} req/s), ráfaga {limiter.burst}")
+    print(f"📊 Cupo por recurso: {limiter.hourly_quota} requests/hora")
+
+    start = time.perf_counter()
+    for _ in range(limiter.burst + 3):
+        limiter.acquire('volumes')
+    print(f"   {limiter.burst + 3} turnos en {time.perf_counter() - start:.2f}s")
+    print(f"   Cupo restante: {limiter.remaining_quota()}")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+reader_metrics.py - Métricas de latencia de cambio de página del lector
+
+Registra cuánto tarda cada etapa de un cambio de página (lectura de disco,
+decodificación, escalado, creación de textura y total hasta el primer
+frame pintado) en ventanas deslizantes, calcula percentiles/histogramas y
+guarda un volcado JSON por sesión de lectura para poder reportar p50/p95
+por formato de archivo (zip, rar, 7z).
+"""
+
+import os
+import json
+import time
+import glob
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+# Directorio donde se guardan los volcados de cada sesión del lector
+METRICS_DIR = os.path.expanduser("~/.cache/babelcomics/reader_metrics")
+
+# Límites de los buckets del histograma (ms)
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentil por interpolación lineal (fraction entre 0.0 y 1.0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    weight = position - lower
+    return ordered[lower] * (1 - weight) + ordered[upper] * weight
+
+
+def build_histogram(values: List[float], buckets=HISTOGRAM_BUCKETS_MS) -> Dict[str, int]:
+    """Contar muestras por bucket: {'<=5': n, ..., '>2500': n}"""
+    histogram = {f"<={limit}": 0 for limit in buckets}
+    histogram[f">{buckets[-1]}"] = 0
+    for value in values:
+        for limit in buckets:
+            if value <= limit:
+                histogram[f"<={limit}"] += 1
+                break
+        else:
+            histogram[f">{buckets[-1]}"] += 1
+    return histogram
+
+
+class PageTurnMetrics:
+    """Ventanas deslizantes de tiempos por etapa de cambio de página"""
+
+    # Etapas medidas, en el orden en que ocurren
+    STAGES = ('disk_read', 'decode', 'scale', 'texture', 'total', 'preload')
+
+    def __init__(self, comic_format: Optional[str] = None, window_size: int = 500):
+        """
+        Args:
+            comic_format: Formato del archivo ('zip', 'rar', '7z', ...)
+            window_size: Cantidad de muestras que se conservan por etapa
+        """
+        self.comic_format = comic_format
+        self.window_size = window_size
+        self.started_at = time.time()
+        self._samples = {stage: deque(maxlen=window_size) for stage in self.STAGES}
+        self._lock = threading.Lock()  # preload_page registra desde otros hilos
+
+    def record(self, stage: str, elapsed_ms: float):
+        """Agregar una muestra (en milisegundos) a una etapa"""
+        with self._lock:
+            self._samples[stage].append(elapsed_ms)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Medir un bloque: `with metrics.measure('decode'): ...`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000)
+
+    def get_samples(self, stage: str) -> List[float]:
+        """Copia de las muestras actuales de una etapa"""
+        with self._lock:
+            return list(self._samples[stage])
+
+    def get_last(self, stage: str) -> Optional[float]:
+        """Última muestra de una etapa, o None"""
+        with self._lock:
+            samples = self._samples[stage]
+            return samples[-1] if samples else None
+
+    def get_stage_summary(self, stage: str) -> dict:
+        """Resumen de una etapa: cantidad, p50, p95 y máximo"""
+        samples = self.get_samples(stage)
+        return {
+            'count': len(samples),
+            'p50_ms': round(percentile(samples, 0.50), 2),
+            'p95_ms': round(percentile(samples, 0.95), 2),
+            'max_ms': round(max(samples), 2) if samples else 0.0,
+        }
+
+    def get_summary(self) -> dict:
+        """Resumen completo con histogramas, listo para serializar"""
+        stages = {}
+        for stage in self.STAGES:
+            summary = self.get_stage_summary(stage)
+            summary['histogram'] = build_histogram(self.get_samples(stage))
+            stages[stage] = summary
+
+        return {
+            'format': self.comic_format,
+            'started_at': self.started_at,
+            'duration_s': round(time.time() - self.started_at, 1),
+            'window_size': self.window_size,
+            'stages': stages,
+        }
+
+    def format_overlay_text(self) -> str:
+        """Texto corto para el overlay de rendimiento del lector"""
+        lines = [f"Formato: {self.comic_format or '?'}"]
+        for stage in self.STAGES:
+            last = self.get_last(stage)
+            if last is None:
+                continue
+            summary = self.get_stage_summary(stage)
+            lines.append(
+                f"{stage:<9} {last:7.1f} ms  p50 {summary['p50_ms']:7.1f}  "
+                f"p95 {summary['p95_ms']:7.1f}  (n={summary['count']})"
+            )
+        return "\n".join(lines)
+
+    def dump_json(self, comic_path: str = "", metrics_dir: str = METRICS_DIR) -> Optional[str]:
+        """Guardar el resumen de la sesión en un archivo JSON; devuelve la ruta"""
+        if self.get_stage_summary('total')['count'] == 0:
+            return None
+
+        try:
+            os.makedirs(metrics_dir, exist_ok=True)
+            data = self.get_summary()
+            data['comic'] = os.path.basename(comic_path) if comic_path else ""
+
+            filename = f"{time.strftime('%Y%m%d_%H%M%S')}_{self.comic_format or 'unknown'}_{os.getpid()}.json"
+            path = os.path.join(metrics_dir, filename)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            return path
+        except Exception as e:
+            print(f"Error guardando métricas del lector: {e}")
+            return None
+
+
+def summarize_metrics_by_format(metrics_dir: str = METRICS_DIR) -> Dict[str, dict]:
+    """
+    Combinar los volcados de todas las sesiones y reportar por formato.
+
+    Como cada volcado solo guarda percentiles, el p50/p95 por formato es la
+    media ponderada por cantidad de muestras de cada sesión (aproximación).
+    """
+    totals = {}
+    for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Ignorando volcado inválido {path}: {e}")
+            continue
+
+        comic_format = data.get('format') or 'unknown'
+        per_format = totals.setdefault(comic_format, {'sessions': 0, 'stages': {}})
+        per_format['sessions'] += 1
+
+        for stage, summary in data.get('stages', {}).items():
+            count = summary.get('count', 0)
+            if not count:
+                continue
+            acc = per_format['stages'].setdefault(stage, {'count': 0, 'p50_sum': 0.0, 'p95_sum': 0.0})
+            acc['count'] += count
+            acc['p50_sum'] += summary.get('p50_ms', 0.0) * count
+            acc['p95_sum'] += summary.get('p95_ms', 0.0) * count
+
+    report = {}
+    for comic_format, per_format in totals.items():
+        stages = {}
+        for stage, acc in per_format['stages'].items():
+            stages[stage] = {
+                'count': acc['count'],
+                'p50_ms': round(acc['p50_sum'] / acc['count'], 2),
+                'p95_ms': round(acc['p95_sum'] / acc['count'], 2),
+            }
+        report[comic_format] = {'sessions': per_format['sessions'], 'stages': stages}
+    return report
+
+
+if __name__ == "__main__":
+    # Reporte de latencias por formato a partir de las sesiones guardadas
+    report = summarize_metrics_by_format()
+    if not report:
+        print(f"No hay métricas guardadas en {METRICS_DIR}")
+    for comic_format, data in sorted(report.items()):
+        print(f"\n📊 {comic_format} ({data['sessions']} sesiones)")
+        for stage in PageTurnMetrics.STAGES:
+            summary = data['stages'].get(stage)
+            if summary:
+                print(f"   {stage:<9} p50 {summary['p50_ms']:8.1f} ms   "
+                      f"p95 {summary['p95_ms']:8.1f} ms   (n={summary['count']})")
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+reembed_job.py - Regenerar embeddings hechos con otro modelo
+
+Cada embedding guarda el id del modelo que lo generó (embedding_model, ver
+helpers/embedding_generator.get_model_id). Al cambiar de modelo o de backend
+los vectores viejos dejan de ser comparables con los nuevos; este job los
+regenera en segundo plano, primero las covers de ComicVine (sin ellas el
+clasificador no encuentra nada) y después los comics, en lotes de CLIP.
+
+Uso:
+    python helpers/reembed_job.py           # regenerar todo lo pendiente
+    python helpers/reembed_job.py --status  # solo contar pendientes
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import and_, create_engine, or_
+from sqlalchemy.orm import sessionmaker
+
+from entidades.comicbook_info_cover_model import ComicbookInfoCover
+from entidades.comicbook_model import Comicbook
+
+# Filas leídas de la base por vuelta (se mandan a CLIP en lotes de batch_size)
+PAGE_SIZE = 256
+
+
+def stale_embedding_filter(model_class, model_id, include_missing=False):
+    """
+    Condición SQLAlchemy de filas con embedding de otro modelo
+
+    Args:
+        model_class: Comicbook o ComicbookInfoCover
+        model_id: Id del modelo actual
+        include_missing: Incluir también las filas sin embedding
+    """
+    stale = and_(
+        model_class.embedding.isnot(None),
+        or_(model_class.embedding_model.is_(None), model_class.embedding_model != model_id)
+    )
+    if include_missing:
+        return or_(model_class.embedding.is_(None), stale)
+    return stale
+
+
+def _cover_path(cover):
+    path = cover.obtener_ruta_local()
+    return None if "Comic_sin_caratula" in path else path
+
+
+def _comic_path(comic):
+    path = comic.obtener_cover()
+    return None if "Comic_sin_caratula" in path else path
+
+
+# (nombre, modelo, columna id, ruta de la imagen) en orden de prioridad
+TARGETS = (
+    ('covers', ComicbookInfoCover, ComicbookInfoCover.id_cover, _cover_path),
+    ('comics', Comicbook, Comicbook.id_comicbook, _comic_path),
+)
+
+
+class ReembedJob:
+    """
+    Regenera los embeddings desactualizados, por lotes y en orden de prioridad
+
+    Uso:
+        job = ReembedJob(progress_callback=lambda kind, done, total: ...)
+        job.start()   # en un hilo; job.stop() lo corta al terminar el lote actual
+    """
+
+    def __init__(self, db_path=os.path.join('data', 'babelcomics.db'), progress_callback=None):
+        self.db_path = db_path
+        self.progress_callback = progress_callback
+        self.model_id = None
+        self.stats = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _session(self):
+        engine = create_engine(f'sqlite:///{self.db_path}')
+        return sessionmaker(bind=engine)()
+
+    def pending_counts(self, session, model_id):
+        """Filas desactualizadas por tipo ({'covers': n, 'comics': n})"""
+        return {
+            kind: session.query(id_column).filter(stale_embedding_filter(model_class, model_id)).count()
+            for kind, model_class, id_column, _ in TARGETS
+        }
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True, name="reembed-job")
+        self._thread.start()
+        return self._thread
+
+    def stop(self, wait=False):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def run(self):
+        """
+        Regenerar todo lo pendiente (bloqueante)
+
+        Returns:
+            {'covers': {'done', 'skipped', 'errors'}, 'comics': {...}, 'seconds'}
+        """
+        from helpers.embedding_generator import get_embedding_generator, get_model_id
+
+        started = time.perf_counter()
+        session = self._session()
+        try:
+            emb_gen = get_embedding_generator()
+
+            # Un modelo ya cargado en el proceso puede seguir con el backend anterior
+            backend = get_model_id().split(':', 1)[-1]
+            if getattr(emb_gen, '_backend', None) is not None and emb_gen._backend.name != backend:
+                emb_gen.configure_backend(backend)
+
+            # Id del backend que realmente quedó cargado: si create_backend volvió a
+            # torch (o el servicio sigue con otro backend) no se re-embebe con el
+            # mismo modelo ni se marcan vectores torch como de otro backend
+            self.model_id = emb_gen.resolve_model_id()
+            pending = self.pending_counts(session, self.model_id)
+            print(f"🔁 Re-embedding a {self.model_id}: {pending['covers']} covers, {pending['comics']} comics")
+            if not any(pending.values()):
+                return self.stats
+
+            for kind, model_class, id_column, image_path in TARGETS:
+                if self._stop.is_set():
+                    break
+                self.stats[kind] = self._run_target(
+                    session, emb_gen, kind, model_class, id_column, image_path, pending[kind]
+                )
+        finally:
+            session.close()
+
+        self.stats['seconds'] = round(time.perf_counter() - started, 1)
+        print(f"✅ Re-embedding terminado en {self.stats['seconds']}s: "
+              + ", ".join(f"{kind} {row['done']} (omitidas {row['skipped']}, errores {row['errors']})"
+                          for kind, row in self.stats.items() if isinstance(row, dict)))
+        return self.stats
+
+    def _run_target(self, session, emb_gen, kind, model_class, id_column, image_path, total):
+        from helpers.cover_ann_index import add_cover_embedding
+
+        stats = {'done': 0, 'skipped': 0, 'errors': 0}
+        last_id = 0
+        while not self._stop.is_set():
+            # Paginación por id: las filas omitidas siguen desactualizadas y no se repiten
+            rows = session.query(model_class).filter(
+                stale_embedding_filter(model_class, self.model_id),
+                id_column > last_id
+            ).order_by(id_column).limit(PAGE_SIZE).all()
+            if not rows:
+                break
+            last_id = getattr(rows[-1], id_column.key)
+
+            ready = []
+            for row in rows:
+                path = image_path(row)
+                if path and os.path.exists(path):
+                    ready.append((row, path))
+                else:
+                    stats['skipped'] += 1
+
+            for start in range(0, len(ready), emb_gen.batch_size):
+                if self._stop.is_set():
+                    break
+                batch = ready[start:start + emb_gen.batch_size]
+                try:
+                    embeddings = emb_gen.generate_embeddings([path for _, path in batch])
+                except Exception as e:
+                    print(f"⚠️ Error generando lote de {kind}: {e}")
+                    embeddings = [None] * len(batch)
+
+                for (row, _), embedding in zip(batch, embeddings):
+                    if embedding is None:
+                        stats['errors'] += 1
+                        continue
+                    row.embedding = emb_gen.encode_embedding(embedding)
+                    row.embedding_model = emb_gen.model_id
+                    stats['done'] += 1
+                    if model_class is ComicbookInfoCover:
+                        add_cover_embedding(row.id_cover, row.id_comicbook_info, embedding, emb_gen.model_id)
+
+            session.commit()
+            if self.progress_callback:
+                self.progress_callback(kind, stats['done'] + stats['skipped'] + stats['errors'], total)
+
+        return stats
+
+
+# Job compartido por el proceso
+_reembed_job = None
+_reembed_job_lock = threading.Lock()
+
+
+def start_reembed_job(progress_callback=None):
+    """Iniciar (o reiniciar con el modelo actual) el re-embedding en segundo plano"""
+    global _reembed_job
+    with _reembed_job_lock:
+        if _reembed_job is not None and _reembed_job.is_running():
+            _reembed_job.stop(wait=True)
+        _reembed_job = ReembedJob(progress_callback=progress_callback)
+        _reembed_job.start()
+        return _reembed_job
+
+
+if __name__ == "__main__":
+    from helpers.db_migrations import ensure_schema
+    from helpers.embedding_generator import get_model_id
+
+    job = ReembedJob()
+    ensure_schema(create_engine(f'sqlite:///{job.db_path}'))
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--status':
+        session = job._session()
+        model_id = get_model_id()
+        counts = job.pending_counts(session, model_id)
+        session.close()
+        print(f"Modelo configurado: {model_id}")
+        print(f"   Covers desactualizadas: {counts['covers']}")
+        print(f"   Comics desactualizados: {counts['comics']}")
+        sys.exit(0)
+
+    job.progress_callback = lambda kind, done, total: print(f"   {kind}: {done}/{total}")
+    job.run()
@@ -193,7 +193,8 @@ def open_comic_reader(physical_comic):
             reader = open_comic_with_reader(
                 comic_path=physical_comic.path,
                 comic_title=comic_title,
-                parent_window=None  # Permitir que el lector sea independiente
+                parent_window=None,  # Permitir que el lector sea independiente
+                comic_id=physical_comic.id_comicbook
             )
             if reader:
                 print(f"✅ Lector abierto para: {comic_title}")
@@ -16,19 +16,26 @@ class VolumeRepository(BaseRepository):
                 print(f"⚠️ No se puede generar embedding: imagen no existe en {image_path}")
                 return False
 
-            # Evitar cargar el modelo si la imagen no existe o si ya tiene embedding
-            if cover_record.embedding:
+            from helpers.embedding_generator import get_active_model_id, get_embedding_generator
+
+            # Evitar cargar el modelo si la imagen no existe o si ya tiene embedding del modelo actual
+            model_id = get_active_model_id()
+            if cover_record.embedding and cover_record.embedding_model == model_id:
                 print(f"✓ Cover ya tiene embedding, omitiendo...")
                 return True
 
-            from helpers.embedding_generator import get_embedding_generator
-
             emb_gen = get_embedding_generator()
             embedding = emb_gen.generate_embedding(image_path)
 
             if embedding is not None:
-                cover_record.embedding = emb_gen.embedding_to_json(embedding)
+                model_id = emb_gen.model_id
+                cover_record.embedding = emb_gen.encode_embedding(embedding)
+                cover_record.embedding_model = model_id
                 self.session.flush()  # Usar flush en vez de commit para no cerrar la transacción padre
+
+                # Mantener al día el índice de covers en disco (si existe)
+                from helpers.cover_ann_index import add_cover_embedding
+                add_cover_embedding(cover_record.id_cover, cover_record.id_comicbook_info, embedding, model_id)
                 print(f"✓ Embedding generado para cover {cover_record.id_cover}")
                 return True
             else:
@@ -646,6 +653,7 @@ class VolumeRepository(BaseRepository):
 
             downloaded_count = 0
             embeddings_generated = 0
+            embeddings_cached = 0
             
             # Parametros constantes para pasar a workers
             volume_id = volume.id_volume
@@ -682,7 +690,9 @@ class VolumeRepository(BaseRepository):
                             for item in result['results']:
                                 if item.get('downloaded'):
                                     downloaded_count += 1
-                                if item.get('embedding'):
+                                if item.get('embedding_cached'):
+                                    embeddings_cached += 1
+                                elif item.get('embedding'):
                                     embeddings_generated += 1
                             
                             # DELEGAR PERSISTENCIA:
@@ -701,7 +711,8 @@ class VolumeRepository(BaseRepository):
                     except Exception as e:
                         print(f"❌ Error procesando resultados para issue #{issue_num}: {e}")
             
-            final_message = f"✅ Finalizado: {downloaded_count} descargas, {embeddings_generated} embeddings calculados"
+            final_message = (f"✅ Finalizado: {downloaded_count} descargas, {embeddings_generated} embeddings calculados, "
+                             f"{embeddings_cached} desde caché")
             print(final_message)
             if progress_callback:
                 try:
@@ -723,12 +734,10 @@ class VolumeRepository(BaseRepository):
         Solo descarga archivos y calcula embeddings.
         """
         import os
-        import time
         from helpers.image_downloader import download_image
-        
-        # Delay para rate limiting
-        time.sleep(0.3)
-        
+
+        # El rate limiting lo hace download_image con el limitador compartido (helpers/rate_limiter.py)
+
         issue_number = str(issue_data.get('issue_number', ''))
         result_pkg = {
             'issue_number': issue_number,
@@ -773,40 +782,69 @@ class VolumeRepository(BaseRepository):
                         filename = f"{name}_variant_{j+1}.{ext}"
                     urls_to_process.append((img_url, filename))
             
-            # Procesar
+            # Procesar: primero descargar todas las imágenes del issue
+            downloaded_files = []
             for url, filename in urls_to_process:
                 file_path = os.path.join(covers_folder, filename)
                 downloaded = False
-                embedding_json = None
                 
                 # Descargar si no existe
                 if not os.path.exists(file_path):
                     path = download_image(url, covers_folder, filename, resize_height=400)
                     if path:
                         downloaded = True
+
+                downloaded_files.append((url, file_path, downloaded))
                 
-                # Generar embedding si el archivo existe (siempre intentamos generarlo si está ahí 
-                # y dejamos que el callback decida si guardarlo o no, o lo generamos solo si se descargó.
-                # Para ser robustos: generamos si acabamos de descargar O si existe.
-                # El callback verificará si ya tiene embedding en DB para no sobrescribir inútilmente).
-                
-                # Optimización: Solo generar si descargamos O si queremos asegurar que exista.
-                # Como no sabemos el estado de la DB aquí, generamos el embedding. 
-                # Es costoso (CPU), pero seguro.
-                if os.path.exists(file_path):
-                    try:
+            # Optimización: las imágenes ya embebidas (mismo contenido y modelo) salen
+            # del caché; el resto va en un solo lote de CLIP, y si todas estaban en
+            # caché el modelo ni se carga.
+            existing_paths = [file_path for _, file_path, _ in downloaded_files if os.path.exists(file_path)]
+            embeddings_by_path = {}
+            model_by_path = {}
+            cached_paths = set()
+            if existing_paths:
+                try:
+                    from helpers.embedding_cache import get_embedding_cache, hash_file
+                    from helpers.embedding_generator import get_active_model_id
+
+                    cache = get_embedding_cache()
+                    model_id = get_active_model_id()
+                    hashes = {file_path: hash_file(file_path) for file_path in existing_paths}
+                    cached = cache.get_many(hashes.values(), model_id)
+
+                    missing = []
+                    for file_path in existing_paths:
+                        if hashes[file_path] in cached:
+                            embeddings_by_path[file_path] = cached[hashes[file_path]]
+                            model_by_path[file_path] = model_id
+                            cached_paths.add(file_path)
+                        else:
+                            missing.append(file_path)
+
+                    if missing:
                         from helpers.embedding_generator import get_embedding_generator
                         emb_gen = get_embedding_generator()
-                        emb = emb_gen.generate_embedding(file_path)
-                        if emb:
-                            embedding_json = emb_gen.embedding_to_json(emb)
-                    except Exception as e:
-                        print(f"⚠️ Error generando embedding {filename}: {e}")
+                        new_entries = {}
+                        embeddings = emb_gen.generate_embeddings(missing)
+                        # El backend cargado puede no ser el configurado: se guarda el real
+                        generated_model = emb_gen.model_id
+                        for file_path, emb in zip(missing, embeddings):
+                            if emb:
+                                embeddings_by_path[file_path] = emb_gen.encode_embedding(emb)
+                                model_by_path[file_path] = generated_model
+                                new_entries[hashes[file_path]] = embeddings_by_path[file_path]
+                        cache.put_many(new_entries, generated_model)
+                except Exception as e:
+                    print(f"⚠️ Error generando embeddings del issue #{issue_number}: {e}")
 
+            for url, file_path, downloaded in downloaded_files:
                 result_pkg['results'].append({
                     'url': url,
                     'path': file_path,
-                    'embedding': embedding_json,
+                    'embedding': embeddings_by_path.get(file_path),
+                    'embedding_model': model_by_path.get(file_path),
+                    'embedding_cached': file_path in cached_paths,
                     'downloaded': downloaded
                 })
                 
@@ -148,6 +148,7 @@ class ShortcutsHelpWindow(Gtk.ShortcutsWindow):
             ("p", "Ajustar a la página"),
             ("F11", "Pantalla completa"),
             ("t", "Mostrar/ocultar barra lateral"),
+            ("<Control>i", "Mostrar/ocultar métricas de rendimiento"),
             ("Escape", "Cerrar lector"),
         ]
 
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Pruebas del formato binario de embeddings y de la migración JSON -> BLOB.
+
+No necesita CLIP ni la base de la aplicación: la migración se prueba sobre
+una base SQLite temporal.
+Uso: python test_embedding_codec.py
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from helpers.embedding_codec import (
+    FORMAT_FLOAT16, FORMAT_FLOAT32, decode_embedding, decode_embedding_matrix,
+    encode_embedding, is_encoded
+)
+from helpers.db_migrations import LEGACY_EMBEDDING_MODEL, backfill_embedding_model, migrate_json_embeddings
+
+DIMENSIONS = 512
+
+
+def _random_embedding(seed=0):
+    return np.random.default_rng(seed).standard_normal(DIMENSIONS).astype(np.float32)
+
+
+def test_round_trip_float32():
+    """float32 se recupera exacto y sin copia"""
+    embedding = _random_embedding()
+    blob = encode_embedding(embedding, FORMAT_FLOAT32)
+
+    assert blob[0] == FORMAT_FLOAT32
+    assert len(blob) == 1 + DIMENSIONS * 4
+    decoded = decode_embedding(blob)
+    assert decoded.dtype == np.float32
+    assert np.array_equal(decoded, embedding)
+    # Vista de solo lectura sobre el BLOB
+    assert not decoded.flags.writeable
+
+
+def test_round_trip_float16():
+    """float16 ocupa la mitad y pierde precisión solo en el orden de 1e-3"""
+    embedding = _random_embedding()
+    blob = encode_embedding(embedding, FORMAT_FLOAT16)
+
+    assert blob[0] == FORMAT_FLOAT16
+    assert len(blob) == 1 + DIMENSIONS * 2
+    decoded = decode_embedding(blob)
+    assert decoded.dtype == np.float32
+    assert np.allclose(decoded, embedding, rtol=1e-3, atol=1e-3)
+
+
+def test_legacy_json():
+    """Los embeddings viejos en JSON se siguen leyendo y se pueden recodificar"""
+    embedding = _random_embedding()
+    legacy = json.dumps(embedding.tolist())
+
+    assert not is_encoded(legacy)
+    assert np.allclose(decode_embedding(legacy), embedding)
+    assert np.array_equal(decode_embedding(encode_embedding(legacy, FORMAT_FLOAT32)), embedding)
+    assert encode_embedding("") is None
+    assert encode_embedding(None) is None
+    assert decode_embedding(None) is None
+
+
+def test_bad_format_byte():
+    """Un byte de formato desconocido es un error, no un vector basura"""
+    blob = bytes([99]) + _random_embedding().tobytes()
+
+    assert not is_encoded(blob)
+    try:
+        decode_embedding(blob)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("decode_embedding aceptó un formato desconocido")
+
+
+def test_decode_matrix():
+    """Mismo formato: una sola lectura; formatos mezclados y vacíos: fila por fila"""
+    embeddings = [_random_embedding(seed) for seed in range(4)]
+
+    same_format = [encode_embedding(e, FORMAT_FLOAT32) for e in embeddings]
+    matrix, positions = decode_embedding_matrix(same_format)
+    assert matrix.shape == (4, DIMENSIONS)
+    assert matrix.flags.c_contiguous
+    assert positions.tolist() == [0, 1, 2, 3]
+    assert np.array_equal(matrix, np.vstack(embeddings))
+
+    mixed = [
+        encode_embedding(embeddings[0], FORMAT_FLOAT16),
+        None,
+        json.dumps(embeddings[2].tolist()),
+        encode_embedding(embeddings[3], FORMAT_FLOAT32),
+    ]
+    matrix, positions = decode_embedding_matrix(mixed)
+    assert positions.tolist() == [0, 2, 3]
+    assert np.allclose(matrix[0], embeddings[0], rtol=1e-3, atol=1e-3)
+    assert np.allclose(matrix[1], embeddings[2])
+    assert np.array_equal(matrix[2], embeddings[3])
+
+
+def test_migrate_json_embeddings():
+    """La migración convierte JSON a BLOB en su lugar y marca el modelo original"""
+    embeddings = [_random_embedding(seed) for seed in range(5)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(temp_dir, 'test.db')}")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE comicbooks_info_covers ("
+                "id_cover INTEGER PRIMARY KEY, embedding TEXT, embedding_model VARCHAR)"
+            ))
+            rows = [{'id': i + 1, 'embedding': json.dumps(e.tolist())} for i, e in enumerate(embeddings)]
+            rows.append({'id': 6, 'embedding': ''})
+            rows.append({'id': 7, 'embedding': None})
+            rows.append({'id': 8, 'embedding': 'no es json'})
+            conn.execute(text(
+                "INSERT INTO comicbooks_info_covers (id_cover, embedding) VALUES (:id, :embedding)"
+            ), rows)
+
+        # batch_size chico para recorrer varias tandas
+        converted = migrate_json_embeddings(engine, 'comicbooks_info_covers', 'id_cover', batch_size=2)
+        assert converted == 6
+
+        with engine.begin() as conn:
+            stored = dict(conn.execute(text(
+                "SELECT id_cover, embedding FROM comicbooks_info_covers"
+            )).fetchall())
+            types = dict(conn.execute(text(
+                "SELECT id_cover, typeof(embedding) FROM comicbooks_info_covers"
+            )).fetchall())
+
+        for index, embedding in enumerate(embeddings, 1):
+            assert types[index] == 'blob'
+            assert np.allclose(decode_embedding(stored[index]), embedding, rtol=1e-3, atol=1e-3)
+        # Vacío -> NULL; JSON inválido -> NULL (se regenera después)
+        assert stored[6] is None and stored[7] is None and stored[8] is None
+
+        # Una segunda corrida no encuentra nada que convertir
+        assert migrate_json_embeddings(engine, 'comicbooks_info_covers', 'id_cover') == 0
+
+        assert backfill_embedding_model(engine, 'comicbooks_info_covers') == 5
+        with engine.begin() as conn:
+            models = dict(conn.execute(text(
+                "SELECT id_cover, embedding_model FROM comicbooks_info_covers"
+            )).fetchall())
+        assert all(models[index] == LEGACY_EMBEDDING_MODEL for index in range(1, 6))
+        assert models[6] is None
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    tests = [
+        test_round_trip_float32,
+        test_round_trip_float16,
+        test_legacy_json,
+        test_bad_format_byte,
+        test_decode_matrix,
+        test_migrate_json_embeddings,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"⊗ {test.__name__}: {e}")
+    exit(1 if failed else 0)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Pruebas del parser de serie y número del nombre de archivo (helpers/filename_prior).
+
+Es lógica pura: no necesita base de datos ni CLIP.
+Uso: python test_filename_prior.py
+"""
+
+from types import SimpleNamespace
+
+from helpers.filename_prior import (
+    DEFAULT_NUMBER_PATTERNS, load_number_patterns, normalize_number, parse_comic_filename
+)
+
+
+def _parse(filename, patterns=DEFAULT_NUMBER_PATTERNS):
+    return parse_comic_filename(filename, patterns)
+
+
+def test_leading_zeros():
+    """Los ceros a la izquierda no cuentan, las letras de variante sí"""
+    assert normalize_number("007") == "7"
+    assert normalize_number("012A") == "12A"
+    assert normalize_number("0") == "0"
+    assert normalize_number("100") == "100"
+
+    hint = _parse("Batman 045 (2018).cbz")
+    assert hint.number == "45"
+    assert hint.series == "Batman"
+    assert _parse("Daredevil 007A.cbz").number == "7A"
+
+
+def test_hash_number():
+    """#N tiene prioridad y el # no queda en la serie"""
+    hint = _parse("Spider-Man #7.cbr")
+    assert hint.number == "7"
+    assert hint.series == "Spider Man"
+    assert hint.series_words == ["spider", "man"]
+
+
+def test_volume_markers():
+    """Vol. N / Volume N / vN no se toman como número ni quedan en la serie"""
+    hint = _parse("X-Men Vol. 2 012 [Digital].cbz")
+    assert hint.number == "12"
+    assert hint.series == "X Men"
+
+    hint = _parse("Saga v2 003 (2014).cbz")
+    assert hint.number == "3"
+    assert hint.series == "Saga"
+
+    hint = _parse("Batman Volume 3 #5.cbz")
+    assert hint.number == "5"
+    assert hint.series == "Batman"
+
+
+def test_year_and_tags_removed():
+    """Año y etiquetas entre paréntesis/corchetes no forman parte de la serie"""
+    hint = _parse("Batman (2016) 045 [Digital] (Zone-Empire).cbz")
+    assert hint.number == "45"
+    assert hint.series == "Batman"
+
+    hint = _parse("Y the Last Man 010 (of 60) (2003).cbz")
+    assert hint.number == "10"
+    assert hint.series_words == ["last", "man"]
+
+
+def test_separators_and_stop_words():
+    """Guiones bajos y puntos son espacios; las palabras vacías no filtran la serie"""
+    hint = _parse("The_Walking_Dead_100.cbz")
+    assert hint.number == "100"
+    assert hint.series == "The Walking Dead"
+    assert hint.series_words == ["walking", "dead"]
+
+
+def test_no_number():
+    """Sin número la pista solo trae la serie"""
+    hint = _parse("Watchmen (1987).cbz")
+    assert hint.number is None
+    assert hint.series == "Watchmen"
+    assert bool(hint)
+    assert not _parse("(2018).cbz")
+
+
+def test_broken_custom_regex():
+    """Un patrón inválido se ignora y se sigue con el siguiente"""
+    hint = _parse("Batman 045.cbz", ["([", r"Batman (\d+)"] + DEFAULT_NUMBER_PATTERNS)
+    assert hint.number == "45"
+
+    setup = SimpleNamespace(custom_regexes='no es json', expresion_regular_numero=None)
+    assert load_number_patterns(setup) == DEFAULT_NUMBER_PATTERNS
+
+    setup = SimpleNamespace(custom_regexes='["([", "issue (\\\\d+)"]', expresion_regular_numero=r"n(\d+)")
+    patterns = load_number_patterns(setup)
+    assert patterns[:3] == ["([", r"issue (\d+)", r"n(\d+)"]
+    assert _parse("Conan issue 012.cbz", patterns).number == "12"
+
+    assert load_number_patterns(None) == DEFAULT_NUMBER_PATTERNS
+
+
+if __name__ == "__main__":
+    tests = [
+        test_leading_zeros,
+        test_hash_number,
+        test_volume_markers,
+        test_year_and_tags_removed,
+        test_separators_and_stop_words,
+        test_no_number,
+        test_broken_custom_regex,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"⊗ {test.__name__}: {e!r}")
+    exit(1 if failed else 0)
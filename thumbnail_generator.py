@@ -11,16 +11,35 @@ from gi.repository import GLib
 
 # Importar worker
 try:
-    from thumbnail_worker import generate_thumbnail_task
+    from thumbnail_worker import generate_thumbnail_task, generate_thumbnails_batch
     WORKER_AVAILABLE = True
 except ImportError:
     WORKER_AVAILABLE = False
     print("Error importando thumbnail_worker.py")
 
+from helpers.archive_tools import get_archive_format, get_archive_tool
+
+
+def _served_by_7z_batch(path):
+    """
+    True si una sola invocación de 7z puede leer este archivo junto con otros
+
+    Con unrar (preferido para CBR) cada archivo es un proceso aparte: agruparlos
+    en una tarea los leería en serie y perdería el paralelismo del pool.
+    """
+    archive_format = get_archive_format(path)
+    tool = get_archive_tool(archive_format) if archive_format else None
+    return tool is not None and tool[0] == '7z'
+
+
 class ThumbnailGenerator:
     """
     Generador de thumbnails usando ProcessPoolExecutor para no bloquear la UI.
     """
+
+    # Máximo de CBR/CB7 por tarea del pool y espera para juntar el lote (ms)
+    ARCHIVE_BATCH_SIZE = 32
+    ARCHIVE_BATCH_DELAY_MS = 50
     
     def __init__(self, cache_dir=None):
         # Configuración de rutas
@@ -39,6 +58,11 @@ class ThumbnailGenerator:
         # Mantener sesión de BD para smart covers
         self.session = None
 
+        # Lote pendiente de CBR/CB7: [(source, target, cover_info, callback), ...]
+        self._archive_batch = []
+        self._archive_batch_lock = threading.Lock()
+        self._archive_batch_source = None
+
     def set_session(self, session):
         """Configurar sesión de base de datos para lógica inteligente"""
         self.session = session
@@ -70,6 +94,11 @@ class ThumbnailGenerator:
         if item_type == "comics" and self.session:
             cover_info = self._resolve_smart_cover_metadata(item_id, item_path)
             
+        # CBR/CB7 que lee 7z: juntar varios pedidos para extraerlos con un solo proceso
+        if _served_by_7z_batch(str(item_path)):
+            self._queue_archive_thumbnail(str(item_path), str(thumbnail_path), cover_info, callback)
+            return
+
         # Enviar tarea al pool
         future = self.executor.submit(
             generate_thumbnail_task, 
@@ -97,6 +126,59 @@ class ThumbnailGenerator:
             print(f"Excepción en worker: {e}")
             GLib.idle_add(callback, None)
         
+    def _queue_archive_thumbnail(self, source_path, target_path, cover_info, callback):
+        """Agregar un CBR/CB7 al lote pendiente y programar su envío"""
+        with self._archive_batch_lock:
+            self._archive_batch.append((source_path, target_path, cover_info, callback))
+            batch_full = len(self._archive_batch) >= self.ARCHIVE_BATCH_SIZE
+            if not batch_full and self._archive_batch_source is None:
+                self._archive_batch_source = GLib.timeout_add(
+                    self.ARCHIVE_BATCH_DELAY_MS, self._on_archive_batch_timeout
+                )
+
+        if batch_full:
+            self._flush_archive_batch()
+
+    def _on_archive_batch_timeout(self):
+        """Venció la espera: enviar lo que se haya juntado"""
+        with self._archive_batch_lock:
+            self._archive_batch_source = None
+        self._flush_archive_batch()
+        return False
+
+    def _flush_archive_batch(self):
+        """Enviar al pool el lote pendiente de CBR/CB7 como una sola tarea"""
+        with self._archive_batch_lock:
+            batch, self._archive_batch = self._archive_batch, []
+            if self._archive_batch_source is not None:
+                # Lote lleno antes del timeout: cancelarlo
+                GLib.source_remove(self._archive_batch_source)
+                self._archive_batch_source = None
+
+        if batch:
+            tasks = [(source, target, cover_info) for source, target, cover_info, _ in batch]
+            callbacks = [callback for _, _, _, callback in batch]
+            try:
+                future = self.executor.submit(generate_thumbnails_batch, tasks)
+                future.add_done_callback(
+                    lambda f: self._on_thumbnail_batch_generated(f, callbacks)
+                )
+            except Exception as e:
+                print(f"Error enviando lote de thumbnails: {e}")
+                for callback in callbacks:
+                    GLib.idle_add(callback, None)
+
+    def _on_thumbnail_batch_generated(self, future, callbacks):
+        """Repartir los resultados de un lote a cada callback"""
+        try:
+            results = future.result()
+        except Exception as e:
+            print(f"Excepción en worker (lote): {e}")
+            results = [(False, str(e))] * len(callbacks)
+
+        for callback, (success, result) in zip(callbacks, results):
+            GLib.idle_add(callback, result if success else None)
+
     def get_cached_thumbnail_path(self, item_id, item_type):
         """Obtener ruta del thumbnail en caché"""
         return self.cache_dir / item_type / f"{item_id}.jpg"
@@ -32,6 +32,16 @@ except ImportError:
     SEVEN_ZIP_AVAILABLE = False
     print("py7zr no disponible en worker")
 
+try:
+    from helpers.archive_tools import (
+        get_archive_format, get_archive_tool, list_archive_members,
+        read_archive_member, read_archive_members_batch
+    )
+    ARCHIVE_TOOLS_AVAILABLE = True
+except ImportError:
+    ARCHIVE_TOOLS_AVAILABLE = False
+    print("helpers.archive_tools no disponible en worker")
+
 
 def generate_thumbnail_task(source_path, target_path, cover_info=None, size=(280, 400)):
     """
@@ -74,6 +84,78 @@ def generate_thumbnail_task(source_path, target_path, cover_info=None, size=(280
         return False, str(e)
 
 
+def generate_thumbnails_batch(tasks, size=(280, 400)):
+    """
+    Generar varios thumbnails en una sola tarea del pool.
+
+    Los CBR/CB7 se resuelven juntos: se listan sin lanzar procesos (rarfile y
+    py7zr leen las cabeceras en Python) y los miembros pedidos se leen con
+    read_archive_members_batch (una invocación de 7z para muchos archivos).
+
+    Args:
+        tasks (list): [(source_path, target_path, cover_info), ...]
+        size (tuple): Tamaño máximo (ancho, alto)
+
+    Returns:
+        list: [(bool success, str path_or_error), ...] en el mismo orden que tasks
+    """
+    if not PIL_AVAILABLE:
+        return [(False, "PIL no instalado")] * len(tasks)
+
+    results = [None] * len(tasks)
+    archive_requests = {}   # source_path -> miembro
+    archive_tasks = []      # (índice, source_path, target_path)
+
+    for index, (source_path, target_path, cover_info) in enumerate(tasks):
+        if not os.path.exists(source_path):
+            results[index] = (False, "Archivo no existe")
+            continue
+
+        if ARCHIVE_TOOLS_AVAILABLE and get_archive_tool(get_archive_format(source_path) or ''):
+            try:
+                member = _get_target_image_name(_list_archive(source_path), cover_info)
+            except Exception as e:
+                member = None
+                print(f"Error listando {source_path}: {e}")
+            if member:
+                archive_requests[source_path] = member
+                archive_tasks.append((index, source_path, target_path))
+                continue
+
+        # ZIP, imágenes sueltas o sin herramienta del sistema: camino normal
+        results[index] = generate_thumbnail_task(source_path, target_path, cover_info, size)
+
+    if archive_requests:
+        contents = read_archive_members_batch(archive_requests)
+        for index, source_path, target_path in archive_tasks:
+            image_data = contents.get(source_path)
+            if not image_data:
+                results[index] = (False, "No se pudo extraer imagen")
+                continue
+            try:
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                if _process_image_data(image_data, target_path, size):
+                    results[index] = (True, target_path)
+                else:
+                    results[index] = (False, "Error procesando imagen")
+            except Exception as e:
+                results[index] = (False, str(e))
+
+    return results
+
+
+def _list_archive(path):
+    """Listar un CBR/CB7 leyendo las cabeceras en Python si es posible"""
+    archive_format = get_archive_format(path)
+    if archive_format == 'rar' and RAR_AVAILABLE:
+        with rarfile.RarFile(path, 'r') as rf:
+            return rf.namelist()
+    if archive_format == '7z' and SEVEN_ZIP_AVAILABLE:
+        with py7zr.SevenZipFile(path, 'r') as zf:
+            return zf.getnames()
+    return list_archive_members(path)
+
+
 def _extract_image_data(source_path, cover_info):
     """Extraer bytes de imagen del archivo fuente"""
     ext = os.path.splitext(source_path)[1].lower()
@@ -147,9 +229,17 @@ def _extract_from_zip(path, cover_info):
 
 
 def _extract_from_rar(path, cover_info):
-    if not RAR_AVAILABLE:
-        return None
     try:
+        if ARCHIVE_TOOLS_AVAILABLE and get_archive_tool('rar'):
+            # Listado sin procesos externos y lectura por stdout (unrar p)
+            target_file = _get_target_image_name(_list_archive(path), cover_info)
+            if target_file:
+                data = read_archive_member(path, target_file)
+                if data:
+                    return data
+
+        if not RAR_AVAILABLE:
+            return None
         with rarfile.RarFile(path, 'r') as rf:
             target_file = _get_target_image_name(rf.namelist(), cover_info)
             if target_file and target_file in rf.namelist():
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+tiled_page_view.py - Vista de página por tiles para zoom alto en el lector
+
+En lugar de materializar un único pixbuf escalado (que a 400% sobre una
+doble página puede ocupar cientos de MB), escala solo los tiles de tamaño
+fijo que caen en la región visible más un margen, y los guarda en un cache
+LRU de texturas. La memoria queda acotada por el tamaño del cache,
+independientemente del nivel de zoom.
+"""
+
+import gi
+from collections import OrderedDict
+
+gi.require_version('Gtk', '4.0')
+gi.require_version('Graphene', '1.0')
+
+from gi.repository import Gtk, Gdk, GdkPixbuf, GLib, Graphene
+
+
+class TiledPageView(Gtk.Widget):
+    """
+    Widget que dibuja una página escalada por tiles.
+
+    Se coloca dentro de un Gtk.ScrolledWindow; usa sus adjustments para
+    saber qué región está en pantalla y solo genera esos tiles.
+    """
+
+    # Lado de cada tile en píxeles de la imagen escalada
+    TILE_SIZE = 512
+
+    def __init__(self, max_tiles=48, margin_tiles=1):
+        """
+        Args:
+            max_tiles: Cantidad máxima de tiles en el cache LRU
+                       (48 tiles de 512x512 RGBA son ~48 MB). Si la región
+                       visible más el margen necesita más, el cache crece a
+                       ese tamaño (ver _get_capacity)
+            margin_tiles: Tiles extra alrededor de la región visible a precargar
+        """
+        super().__init__()
+
+        self.max_tiles = max_tiles
+        self.margin_tiles = margin_tiles
+
+        self._pixbuf = None
+        self._scale = 1.0
+        self._interp_type = GdkPixbuf.InterpType.NEAREST
+        self._scaled_width = 0
+        self._scaled_height = 0
+
+        # (tile_x, tile_y) -> Gdk.Texture, en orden de uso (LRU)
+        self._tiles = OrderedDict()
+        self._prefetch_source = None
+
+        self._hadjustment = None
+        self._vadjustment = None
+        self._adjustment_handlers = []
+
+        self.set_overflow(Gtk.Overflow.HIDDEN)
+
+    def set_adjustments(self, hadjustment, vadjustment):
+        """Conectar los adjustments del ScrolledWindow contenedor"""
+        if hadjustment is self._hadjustment and vadjustment is self._vadjustment:
+            return
+
+        for adjustment, handler_id in self._adjustment_handlers:
+            adjustment.disconnect(handler_id)
+        self._adjustment_handlers = []
+
+        self._hadjustment = hadjustment
+        self._vadjustment = vadjustment
+
+        for adjustment in (hadjustment, vadjustment):
+            if adjustment is not None:
+                handler_id = adjustment.connect("value-changed", self._on_adjustment_changed)
+                self._adjustment_handlers.append((adjustment, handler_id))
+
+    def set_page(self, pixbuf, scale, interp_type):
+        """Mostrar un pixbuf original con el factor de escala indicado"""
+        if (pixbuf is self._pixbuf and abs(scale - self._scale) < 1e-6
+                and interp_type == self._interp_type):
+            return
+
+        self._pixbuf = pixbuf
+        self._scale = scale
+        self._interp_type = interp_type
+        self._scaled_width = max(1, int(pixbuf.get_width() * scale))
+        self._scaled_height = max(1, int(pixbuf.get_height() * scale))
+        self.clear_tiles()
+
+        self.queue_resize()
+        self.queue_draw()
+
+    def clear_tiles(self):
+        """Liberar todos los tiles del cache"""
+        self._tiles.clear()
+        if self._prefetch_source:
+            GLib.source_remove(self._prefetch_source)
+            self._prefetch_source = None
+
+    def get_scaled_size(self):
+        """Tamaño de la página escalada (ancho, alto)"""
+        return self._scaled_width, self._scaled_height
+
+    def get_cache_stats(self):
+        """Estadísticas del cache de tiles"""
+        return {
+            'tiles': len(self._tiles),
+            'max_tiles': self.max_tiles,
+            'capacity': self._get_capacity(),
+            'tile_size': self.TILE_SIZE,
+        }
+
+    def do_measure(self, orientation, for_size):
+        """El tamaño natural es el de la página escalada completa"""
+        if orientation == Gtk.Orientation.HORIZONTAL:
+            size = self._scaled_width
+        else:
+            size = self._scaled_height
+        return size, size, -1, -1
+
+    def do_snapshot(self, snapshot):
+        """Dibujar solo los tiles que intersectan la región visible"""
+        if not self._pixbuf:
+            return
+
+        for tile_x, tile_y in self._get_tile_range(margin=0):
+            texture = self._get_tile(tile_x, tile_y)
+            if texture is None:
+                continue
+
+            rect = Graphene.Rect()
+            rect.init(
+                tile_x * self.TILE_SIZE,
+                tile_y * self.TILE_SIZE,
+                texture.get_width(),
+                texture.get_height()
+            )
+            snapshot.append_texture(texture, rect)
+
+        # Precargar los tiles del margen cuando el loop quede libre
+        if self.margin_tiles > 0 and self._prefetch_source is None:
+            self._prefetch_source = GLib.idle_add(self._prefetch_margin_tiles)
+
+    def _on_adjustment_changed(self, adjustment):
+        """Redibujar al hacer scroll (solo se generan los tiles nuevos)"""
+        self.queue_draw()
+
+    def _get_visible_region(self):
+        """Región visible (x, y, ancho, alto) en coordenadas del widget"""
+        width = self._scaled_width
+        height = self._scaled_height
+
+        x, visible_width = 0, width
+        if self._hadjustment is not None and self._hadjustment.get_page_size() > 0:
+            x = self._hadjustment.get_value()
+            visible_width = self._hadjustment.get_page_size()
+
+        y, visible_height = 0, height
+        if self._vadjustment is not None and self._vadjustment.get_page_size() > 0:
+            y = self._vadjustment.get_value()
+            visible_height = self._vadjustment.get_page_size()
+
+        return x, y, visible_width, visible_height
+
+    def _get_tile_range(self, margin):
+        """Coordenadas de los tiles visibles, ampliadas en `margin` tiles"""
+        x, y, width, height = self._get_visible_region()
+
+        columns = (self._scaled_width + self.TILE_SIZE - 1) // self.TILE_SIZE
+        rows = (self._scaled_height + self.TILE_SIZE - 1) // self.TILE_SIZE
+
+        first_column = max(0, int(x) // self.TILE_SIZE - margin)
+        last_column = min(columns - 1, int(x + width) // self.TILE_SIZE + margin)
+        first_row = max(0, int(y) // self.TILE_SIZE - margin)
+        last_row = min(rows - 1, int(y + height) // self.TILE_SIZE + margin)
+
+        return [
+            (tile_x, tile_y)
+            for tile_y in range(first_row, last_row + 1)
+            for tile_x in range(first_column, last_column + 1)
+        ]
+
+    def _get_capacity(self):
+        """Tiles que entran en el cache: max_tiles, o los visibles + margen si son más"""
+        return max(self.max_tiles, len(self._get_tile_range(margin=self.margin_tiles)))
+
+    def _get_tile(self, tile_x, tile_y):
+        """Obtener un tile del cache o escalarlo desde el pixbuf original"""
+        key = (tile_x, tile_y)
+        texture = self._tiles.get(key)
+        if texture is not None:
+            self._tiles.move_to_end(key)
+            return texture
+
+        texture = self._render_tile(tile_x, tile_y)
+        if texture is None:
+            return None
+
+        self._tiles[key] = texture
+        self._evict()
+        return texture
+
+    def _evict(self):
+        """
+        Desalojar los tiles menos usados por encima de la capacidad
+
+        Los tiles en pantalla nunca se desalojan: si no, en una ventana grande
+        do_snapshot volvería a escalar los mismos tiles en cada frame.
+        """
+        excess = len(self._tiles) - self._get_capacity()
+        if excess <= 0:
+            return
+
+        visible = set(self._get_tile_range(margin=0))
+        for key in [key for key in self._tiles if key not in visible][:excess]:
+            del self._tiles[key]
+
+    def _render_tile(self, tile_x, tile_y):
+        """Escalar únicamente la porción del original que cubre este tile"""
+        dest_x = tile_x * self.TILE_SIZE
+        dest_y = tile_y * self.TILE_SIZE
+        tile_width = min(self.TILE_SIZE, self._scaled_width - dest_x)
+        tile_height = min(self.TILE_SIZE, self._scaled_height - dest_y)
+        if tile_width <= 0 or tile_height <= 0:
+            return None
+
+        try:
+            tile = GdkPixbuf.Pixbuf.new(
+                GdkPixbuf.Colorspace.RGB,
+                self._pixbuf.get_has_alpha(),
+                8,
+                tile_width,
+                tile_height
+            )
+            # El offset negativo desplaza la imagen escalada para que
+            # (dest_x, dest_y) caiga en el origen del tile
+            self._pixbuf.scale(
+                tile, 0, 0, tile_width, tile_height,
+                -dest_x, -dest_y, self._scale, self._scale,
+                self._interp_type
+            )
+            return Gdk.Texture.new_for_pixbuf(tile)
+        except Exception as e:
+            print(f"Error generando tile ({tile_x}, {tile_y}): {e}")
+            return None
+
+    def _prefetch_margin_tiles(self):
+        """Generar un tile del margen por iteración para no trabar el scroll"""
+        if not self._pixbuf:
+            self._prefetch_source = None
+            return False
+
+        for tile_x, tile_y in self._get_tile_range(margin=self.margin_tiles):
+            if (tile_x, tile_y) not in self._tiles:
+                # No desalojar tiles visibles para precargar el margen
+                if len(self._tiles) >= self._get_capacity():
+                    break
+                self._get_tile(tile_x, tile_y)
+                return True  # Seguir en la próxima iteración
+
+        self._prefetch_source = None
+        return False
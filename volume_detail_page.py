@@ -1944,6 +1944,7 @@ def perform_comicvine_update(volume, session, main_window, tab_view):
                         return False
                         
                     changes_made = False
+                    updated_covers = []
                     for item in results_list:
                         url = item.get('url')
                         embedding_json = item.get('embedding')
@@ -1962,14 +1963,23 @@ def perform_comicvine_update(volume, session, main_window, tab_view):
                             comic_info.portadas.append(cover_record)
                             changes_made = True
                         
-                        # Actualizar embedding si existe y es nuevo
+                        # Actualizar embedding si existe y es nuevo; el modelo se etiqueta
+                        # aunque el vector no cambie (filas viejas sin modelo o con otro)
                         if embedding_json:
-                            if cover_record.embedding != embedding_json:
+                            if (cover_record.embedding != embedding_json
+                                    or cover_record.embedding_model != item.get('embedding_model')):
                                 cover_record.embedding = embedding_json
+                                cover_record.embedding_model = item.get('embedding_model')
+                                updated_covers.append(cover_record)
                                 changes_made = True
                                 
                     if changes_made:
                         session.commit()
+                        # Mantener al día el índice de covers en disco (si existe)
+                        from helpers.cover_ann_index import add_cover_embedding
+                        for cover_record in updated_covers:
+                            add_cover_embedding(cover_record.id_cover, cover_record.id_comicbook_info,
+                                                cover_record.embedding, cover_record.embedding_model)
                         # print(f"💾 Guardado en DB issue #{issue_num}")
                         
                     return False # Retornar False para que GLib no lo vuelva a llamar
@@ -2196,6 +2206,7 @@ def download_issue_cover(issue_data, volume, session, force_redownload=False):
                         if existing_cover and downloaded_this:
                             try:
                                 existing_cover.embedding = None
+                                existing_cover.embedding_model = None
                                 session.commit()
                                 print(f"DEBUG: Embedding invalidado para: {nombre_archivo}")
                             except Exception as e: